@@ -0,0 +1,142 @@
+import typing as t
+
+import os
+import time
+
+from core import deadline
+from core import metrics
+from core.aiodatabase import AsyncDatabase
+from core.exceptions import TimeoutException
+from core.exceptions import ValidationException
+from core.aiosingleflight import AsyncSingleFlight
+
+from endpoint import metrics as endpoint_metrics
+from endpoint.errors import handler404
+from endpoint.errors import handler_error
+from endpoint.errors import timeout_error
+from endpoint.errors import validation_error
+
+import app as flask_app
+
+if t.TYPE_CHECKING:
+    from quart import Quart
+
+
+def init_db(app: "Quart") -> AsyncDatabase:
+    database = AsyncDatabase(
+        max_size=app.config["DATABASE_POOL_MAX_SIZE"],
+        **flask_app.get_database_kwargs(app),
+    )
+
+    flask_app.init_schema(app, database.sync)
+
+    app.database = database
+
+    return database
+
+
+def init_deadline(app: "Quart") -> None:
+    """
+
+    Time out database queries of requests past REQUEST_DEADLINE seconds.
+    """
+    budget = app.config["REQUEST_DEADLINE"]
+
+    @app.before_request
+    async def start_deadline():
+        deadline.DEADLINE.set(time.monotonic() + budget)
+
+
+def init_metrics(app: "Quart") -> None:
+    """
+
+    Record requests metrics, served at /metrics.
+    """
+    from quart import request
+
+    metrics.REGISTRY.configure(
+        app.config["METRICS_DIR"],
+        flush_interval=app.config["METRICS_FLUSH_INTERVAL"],
+    )
+    metrics.REGISTRY.add_collector(
+        "cache", endpoint_metrics.cache_collector(app.database.sync)
+    )
+    metrics.REGISTRY.add_collector("pool", app.database.collect_pool_metrics)
+
+    # hooks are coroutines, Quart runs functions in threads.
+    @app.before_request
+    async def start_request():
+        endpoint_metrics.start_request()
+
+    @app.after_request
+    async def end_request(response):
+        endpoint_metrics.end_request(
+            request.url_rule and request.url_rule.rule,
+            request.method,
+            response.status_code,
+        )
+
+        return response
+
+    @app.route("/metrics")
+    async def render():
+        return endpoint_metrics.render()
+
+
+def create_app(config_file: t.Optional[str] = None) -> "Quart":
+    """
+
+    Create the asyncio app, serving the Flask app endpoints.
+    Requires quart, and an ASGI server eg: hypercorn.
+    """
+    try:
+        from quart import Quart
+    except ImportError:
+        raise ImportError(
+            "Asyncio app requires quart, `pip install quart hypercorn`.",
+        )
+
+    from endpoint.aioroutes import endpoint
+
+    app = Quart(__name__)
+
+    app.config.from_object("endpoint.config.base")
+    if os.environ.get(flask_app.config_variable_name):
+        app.config.from_envvar(flask_app.config_variable_name)
+
+    if config_file:
+        app.config.from_pyfile(config_file)
+
+    # instantiate database
+    init_db(app)
+
+    if app.config["ROAS_SERVING"]:
+        flask_app.init_roas_server(app, app.database.sync)
+
+    if app.config["ROAS_SNAPSHOT"]:
+        from shared.snapshot import SnapshotFile
+
+        app.roas_snapshot = SnapshotFile(app.config["ROAS_SNAPSHOT"])
+
+    flask_app.init_search_flight(app, AsyncSingleFlight)
+
+    if app.config["REQUEST_DEADLINE"]:
+        init_deadline(app)
+
+    if app.config["METRICS"]:
+        init_metrics(app)
+
+    @app.after_serving
+    async def close_db():
+        app.database.close()
+
+    # register blueprint endpoint.
+    app.register_blueprint(endpoint)
+
+    # decorate error handlers.
+    app.errorhandler(404)(handler404)
+    app.errorhandler(Exception)(handler_error)
+    app.errorhandler(ValidationException)(validation_error)
+    app.errorhandler(TimeoutException)(timeout_error)
+
+    return app
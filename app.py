@@ -1,44 +1,256 @@
 import typing as t
 
 import os
+import time
 
 from flask import Flask
+from flask import g
+from flask import request
 
 from core.database import Database
 from core.database import create_table
+from core.database import get_schema_version
+from core.database import read_schema_version
+from core.database import validate_schema
+from core.database import write_schema_version
+from core import deadline
+from core import metrics
+from core.admission import Limiter
+from core.exceptions import OverloadedException
+from core.exceptions import SchemaException
+from core.exceptions import TimeoutException
 from core.exceptions import ValidationException
+from core.singleflight import FileLockBackend
+from core.singleflight import SingleFlight
 
 from shared.models import AdGroup
 from shared.models import Campaign
 from shared.models import SearchTerm
+from shared.models import RoasRanking
+from shared.models import CampaignRollup
+from shared.models import DataGeneration
 
+from endpoint import metrics as endpoint_metrics
 from endpoint.routes import endpoint
 from endpoint.errors import handler404
 from endpoint.errors import handler_error
+from endpoint.errors import overloaded_error
+from endpoint.errors import timeout_error
 from endpoint.errors import validation_error
 
 
+if t.TYPE_CHECKING:
+    from endpoint.serving import RoasServer
+
+
 config_variable_name = "FLASK_CONFIG_PATH"
 
+# models of the endpoint tables.
+MODELS = (
+    AdGroup,
+    Campaign,
+    SearchTerm,
+    RoasRanking,
+    CampaignRollup,
+    DataGeneration,
+)
+
+
+def get_database_kwargs(app: Flask) -> t.Dict[str, t.Any]:
+    return {
+        "host": app.config["DATABASE_HOST"],
+        "database": app.config["DATABASE_NAME"],
+        "user": app.config["DATABASE_USER"],
+        "password": app.config["DATABASE_PASSWORD"],
+        "port": int(app.config["DATABASE_PORT"]),
+    }
+
+
+def get_routing_kwargs(app: Flask) -> t.Dict[str, t.Any]:
+    """
+
+    Get Database replicas and pooling kwargs, see Database.route.
+    """
+    return {
+        "replicas": app.config["DATABASE_REPLICAS"],
+        "pool_size": app.config["DATABASE_POOL_SIZE"],
+        "balancing": app.config["DATABASE_BALANCING"],
+        "max_lag": app.config["DATABASE_MAX_REPLICA_LAG"],
+        "lag_check_interval": app.config["DATABASE_LAG_CHECK_INTERVAL"],
+        "read_your_writes": app.config["DATABASE_READ_YOUR_WRITES"],
+    }
+
+
+def create_tables(database: Database) -> None:
+    for model in MODELS:
+        create_table(database, model)
+
+
+def init_schema(app: Flask, database: Database) -> None:
+    """
+
+    Prepare endpoint tables according to DATABASE_SCHEMA.
+    """
+    mode = app.config["DATABASE_SCHEMA"]
+
+    if mode == "validate":
+        missing = validate_schema(database, MODELS)
+        if missing:
+            missing = ", ".join(missing)
+            raise SchemaException(f"Missing tables or columns: {missing}")
+
+    elif mode == "version":
+        version = get_schema_version(MODELS)
+        if read_schema_version(database) != version:
+            create_tables(database)
+            write_schema_version(database, version)
+
+    elif mode == "create":
+        create_tables(database)
+
+    else:
+        raise ValueError(f"Unexpected DATABASE_SCHEMA {mode}.")
+
 
 def init_db(app: Flask) -> Database:
-    database = Database(
-        host=app.config["DATABASE_HOST"],
-        database=app.config["DATABASE_NAME"],
-        user=app.config["DATABASE_USER"],
-        password=app.config["DATABASE_PASSWORD"],
-        port=int(app.config["DATABASE_PORT"]),
-    )
+    database = Database(**get_database_kwargs(app), **get_routing_kwargs(app))
 
-    create_table(database, AdGroup)
-    create_table(database, Campaign)
-    create_table(database, SearchTerm)
+    init_schema(app, database)
 
     app.database = database
 
     return database
 
 
+def init_roas_server(
+    app: Flask,
+    database: t.Optional[Database] = None,
+) -> "RoasServer":
+    from endpoint.serving import RoasServer
+
+    roas_server = RoasServer(
+        database or app.database,
+        limit=app.config["ROAS_SEARCH_LIMIT"],
+        poll_interval=app.config["ROAS_SERVING_POLL_INTERVAL"],
+    )
+    roas_server.start()
+
+    app.roas_server = roas_server
+
+    return roas_server
+
+
+def init_search_flight(
+    app: Flask,
+    flight_class: t.Type[SingleFlight] = SingleFlight,
+) -> t.Optional[SingleFlight]:
+    app.search_flight = None
+    if app.config["SEARCH_COALESCING"]:
+        coalescing_dir = app.config["SEARCH_COALESCING_DIR"]
+        app.search_flight = flight_class(
+            FileLockBackend(coalescing_dir) if coalescing_dir else None
+        )
+
+    return app.search_flight
+
+
+def init_admission(app: Flask) -> Limiter:
+    """
+
+    Cap concurrent database transactions of the worker,
+    see DATABASE_MAX_CONCURRENCY.
+    """
+    limiter = Limiter(
+        app.config["DATABASE_MAX_CONCURRENCY"],
+        max_queue=app.config["DATABASE_MAX_QUEUE"],
+        timeout=app.config["DATABASE_QUEUE_TIMEOUT"],
+        retry_after=app.config["DATABASE_RETRY_AFTER"],
+    )
+    app.database.limiter = limiter
+
+    metrics.REGISTRY.add_collector("admission", limiter.collect_metrics)
+
+    return limiter
+
+
+def init_deadline(app: Flask) -> None:
+    """
+
+    Time out database queries of requests past REQUEST_DEADLINE seconds.
+    """
+    budget = app.config["REQUEST_DEADLINE"]
+
+    @app.before_request
+    def start_deadline():
+        deadline.DEADLINE.set(time.monotonic() + budget)
+
+    @app.teardown_request
+    def end_deadline(exception=None):
+        deadline.DEADLINE.set(None)
+
+
+def init_metrics(app: Flask) -> None:
+    """
+
+    Record requests metrics, served at /metrics.
+    """
+    metrics.REGISTRY.configure(
+        app.config["METRICS_DIR"],
+        flush_interval=app.config["METRICS_FLUSH_INTERVAL"],
+    )
+    metrics.REGISTRY.add_collector(
+        "cache", endpoint_metrics.cache_collector(app.database)
+    )
+
+    app.before_request(endpoint_metrics.start_request)
+
+    @app.after_request
+    def end_request(response):
+        endpoint_metrics.end_request(
+            request.url_rule and request.url_rule.rule,
+            request.method,
+            response.status_code,
+        )
+
+        return response
+
+    app.add_url_rule("/metrics", "metrics", endpoint_metrics.render)
+
+
+def init_profiling(app: Flask) -> None:
+    """
+
+    Profile requests, see endpoint.profiling.Profiler.
+    """
+    from endpoint.profiling import Profiler
+
+    profiler = Profiler(
+        app.config["PROFILING_DIR"],
+        header=app.config["PROFILING_HEADER"],
+        sample_rate=app.config["PROFILING_SAMPLE_RATE"],
+    )
+
+    @app.before_request
+    def start_profile():
+        g.profile = profiler.start(request.headers)
+
+    @app.after_request
+    def stop_profile(response):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profiler.stop(
+                profile,
+                route=request.url_rule and request.url_rule.rule,
+                method=request.method,
+                path=request.full_path,
+                status=response.status_code,
+            )
+
+        return response
+
+    app.profiler = profiler
+
+
 def create_app(config_file: t.Optional[str] = None) -> Flask:
     app = Flask(__name__)
 
@@ -52,6 +264,29 @@ def create_app(config_file: t.Optional[str] = None) -> Flask:
     # instantiate database
     init_db(app)
 
+    if app.config["ROAS_SERVING"]:
+        init_roas_server(app)
+
+    if app.config["ROAS_SNAPSHOT"]:
+        from shared.snapshot import SnapshotFile
+
+        app.roas_snapshot = SnapshotFile(app.config["ROAS_SNAPSHOT"])
+
+    init_search_flight(app)
+
+    if app.config["DATABASE_MAX_CONCURRENCY"]:
+        init_admission(app)
+
+    if app.config["REQUEST_DEADLINE"]:
+        init_deadline(app)
+
+    if app.config["METRICS"]:
+        init_metrics(app)
+
+    # after metrics, to share their timings.
+    if app.config["PROFILING"]:
+        init_profiling(app)
+
     # register blueprint endpoint.
     app.register_blueprint(endpoint)
 
@@ -59,5 +294,7 @@ def create_app(config_file: t.Optional[str] = None) -> Flask:
     app.errorhandler(404)(handler404)
     app.errorhandler(Exception)(handler_error)
     app.errorhandler(ValidationException)(validation_error)
+    app.errorhandler(TimeoutException)(timeout_error)
+    app.errorhandler(OverloadedException)(overloaded_error)
 
     return app
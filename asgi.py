@@ -0,0 +1,3 @@
+from aioapp import create_app
+
+app = create_app()
@@ -0,0 +1,119 @@
+import typing as t
+
+import time
+import asyncio
+import urllib.parse
+
+
+class Response(t.NamedTuple):
+    status: int
+    body: bytes
+
+
+class Connection:
+    """
+
+    Minimal keep-alive HTTP/1.1 client connection, for benchmarks:
+    GET requests, responses with a content-length.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+
+        self.reader: t.Optional[asyncio.StreamReader] = None
+        self.writer: t.Optional[asyncio.StreamWriter] = None
+
+    async def get(self, path: str) -> Response:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode("latin-1")
+        )
+
+        try:
+            status_line = await self.reader.readuntil(b"\r\n")
+            headers = await self.reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.close()
+            raise ConnectionError("Connection closed by server.")
+
+        length, close = 0, False
+        for line in headers.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection":
+                close = value.strip().lower() == "close"
+
+        body = await self.reader.readexactly(length)
+        if close:
+            self.close()
+
+        return Response(int(status_line.split()[1]), body)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def parse_url(url: str) -> t.Tuple[str, int]:
+    parsed = urllib.parse.urlsplit(url)
+
+    return parsed.hostname, parsed.port or 80
+
+
+async def run_clients(
+    url: str,
+    paths: t.Sequence[str],
+    concurrency: int,
+    duration: float,
+) -> t.Dict[str, t.Any]:
+    """
+
+    Request paths in turn from concurrency keep-alive clients for duration
+    seconds, returns requests per second and responses by status.
+    """
+    host, port = parse_url(url)
+    deadline = time.monotonic() + duration
+    statuses: t.Dict[str, int] = {}
+    errors = 0
+
+    async def client(offset: int) -> None:
+        nonlocal errors
+
+        connection = Connection(host, port)
+        position = offset
+        try:
+            while time.monotonic() < deadline:
+                path = paths[position % len(paths)]
+                position += 1
+                try:
+                    response = await connection.get(path)
+                except (OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    connection.close()
+                    await asyncio.sleep(0.01)
+                    continue
+
+                status = str(response.status)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            connection.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(_) for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": sum(statuses.values()),
+        "rps": sum(statuses.values()) / elapsed,
+        "statuses": statuses,
+        "errors": errors,
+    }
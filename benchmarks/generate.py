@@ -0,0 +1,257 @@
+import typing as t
+
+import os
+import gzip
+import random
+import bisect
+import logging
+import argparse
+import datetime
+import itertools
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+SYLLABLES = (
+    "ba be bi bo bu da de di do du fa fe fi fo ka ke ki ko ku la le li lo lu "
+    "ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so "
+    "su ta te ti to tu va ve vi vo za ze zi zo"
+).split()
+
+COUNTRIES = ("gb", "us", "de", "fr", "es", "it", "nl", "au", "ca", "jp")
+
+# statuses and their weights.
+STATUSES = (("ENABLED", 80), ("PAUSED", 15), ("REMOVED", 5))
+
+# search terms rows per campaign, adgroup, brand and vocabulary word,
+# keys cardinalities grow with the rows.
+ROWS_PER_CAMPAIGN = 2_000
+ROWS_PER_ADGROUP = 100
+ROWS_PER_BRAND = 10_000
+ROWS_PER_WORD = 50
+
+HEADERS = {
+    "campaigns": ("campaign_id", "structure_value", "status"),
+    "adgroups": ("ad_group_id", "campaign_id", "alias", "status"),
+    "search_terms": (
+        "date",
+        "ad_group_id",
+        "campaign_id",
+        "clicks",
+        "cost",
+        "conversion_value",
+        "conversions",
+        "search_term",
+    ),
+}
+
+
+def make_word(index: int) -> str:
+    """
+
+    Get a distinct pronounceable word of each index.
+    """
+    syllables = []
+    while True:
+        index, syllable = divmod(index, len(SYLLABLES))
+        syllables.append(SYLLABLES[syllable])
+        if not index:
+            break
+        index -= 1
+
+    return "".join(syllables)
+
+
+def zipf_weights(count: int, s: float) -> t.List[float]:
+    """
+
+    Get cumulative weights of count ranks, rank k weighting 1 / k ** s.
+    """
+    return list(itertools.accumulate(1 / rank**s for rank in range(1, count + 1)))
+
+
+def choose(
+    rng: random.Random,
+    cum_weights: t.List[float],
+    k: int,
+) -> t.List[int]:
+    total = cum_weights[-1]
+    last = len(cum_weights) - 1
+
+    return [
+        min(bisect.bisect(cum_weights, rng.random() * total), last) for _ in range(k)
+    ]
+
+
+def open_output(path: str, compress: bool) -> t.TextIO:
+    if compress:
+        return gzip.open(path + ".gz", "wt", encoding="utf-8", compresslevel=1)
+
+    return open(path, "w", encoding="utf-8", buffering=1024 * 1024)
+
+
+def generate(
+    directory: str,
+    rows: int,
+    *,
+    days: int = 90,
+    start: datetime.date = datetime.date(2021, 1, 1),
+    s: float = 1.1,
+    seed: t.Optional[int] = None,
+    compress: bool = False,
+) -> t.Dict[str, int]:
+    """
+
+    Write campaigns.csv, adgroups.csv and search_terms.csv to directory,
+    about rows search terms over days from start, returns rows by file.
+
+    Brands, campaigns, adgroups and search terms words follow
+    a Zipf distribution of exponent s: a few brands hold most campaigns
+    and a few adgroups most search terms. Search terms are streamed day
+    by day, unique by date, adgroup and search term.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    statuses, status_weights = zip(*STATUSES)
+    campaigns_count = max(1, rows // ROWS_PER_CAMPAIGN)
+    adgroups_count = max(campaigns_count, rows // ROWS_PER_ADGROUP)
+    brands_count = max(1, rows // ROWS_PER_BRAND)
+    # at least a word per search term of a day, for any adgroup to get them all.
+    words_count = max(100, rows // ROWS_PER_WORD, rows // days + 1)
+
+    brands = [make_word(_) for _ in range(brands_count)]
+    rng.shuffle(brands)
+
+    path = os.path.join(directory, "campaigns.csv")
+    brand_weights = zipf_weights(brands_count, s)
+    campaign_brands = [brands[_] for _ in choose(rng, brand_weights, campaigns_count)]
+
+    with open_output(path, compress) as file:
+        file.write(",".join(HEADERS["campaigns"]) + "\n")
+        for campaign_id, brand in enumerate(campaign_brands, 1):
+            status = rng.choices(statuses, status_weights)[0]
+            file.write(f"{campaign_id},{brand},{status}\n")
+
+    path = os.path.join(directory, "adgroups.csv")
+    campaign_weights = zipf_weights(campaigns_count, s)
+    adgroup_campaigns = [
+        _ + 1 for _ in choose(rng, campaign_weights, adgroups_count - campaigns_count)
+    ]
+    # every campaign has at least an adgroup.
+    adgroup_campaigns = [*range(1, campaigns_count + 1), *adgroup_campaigns]
+
+    with open_output(path, compress) as file:
+        file.write(",".join(HEADERS["adgroups"]) + "\n")
+        for ad_group_id, campaign_id in enumerate(adgroup_campaigns, 1):
+            brand = campaign_brands[campaign_id - 1]
+            country = rng.choice(COUNTRIES)
+            status = rng.choices(statuses, status_weights)[0]
+            file.write(f"{ad_group_id},{campaign_id},{brand} - {country},{status}\n")
+
+    path = os.path.join(directory, "search_terms.csv")
+    adgroup_weights = zipf_weights(adgroups_count, s)
+    adgroup_order = list(range(1, adgroups_count + 1))
+    rng.shuffle(adgroup_order)
+    word_weights = zipf_weights(words_count, s)
+
+    written = 0
+    with open_output(path, compress) as file:
+        file.write(",".join(HEADERS["search_terms"]) + "\n")
+
+        for day in range(days):
+            date = (start + datetime.timedelta(days=day)).isoformat()
+            count = rows * (day + 1) // days - written
+
+            seen = set()
+            lines = []
+            adgroups = choose(rng, adgroup_weights, count)
+            words = choose(rng, word_weights, count)
+
+            for adgroup, word in zip(adgroups, words):
+                ad_group_id = adgroup_order[adgroup]
+
+                # next less searched words of an already searched one.
+                while (ad_group_id, word) in seen:
+                    word = (word + 1) % words_count
+                seen.add((ad_group_id, word))
+
+                campaign_id = adgroup_campaigns[ad_group_id - 1]
+                brand = campaign_brands[campaign_id - 1]
+
+                clicks = int(rng.expovariate(0.2))
+                cost = clicks * rng.uniform(0.05, 2.0)
+                conversions = int(clicks * rng.random() * 0.1)
+                value = conversions * rng.uniform(5.0, 150.0)
+
+                lines.append(
+                    f"{date},{ad_group_id},{campaign_id},{clicks},{cost:.2f},"
+                    f"{value:.2f},{conversions},{brand} {make_word(word)}\n"
+                )
+
+            file.writelines(lines)
+            written += count
+
+    return {
+        "campaigns": campaigns_count,
+        "adgroups": adgroups_count,
+        "search_terms": written,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic campaigns, adgroups and search terms."
+    )
+    parser.add_argument("directory", help="output directory")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=100_000,
+        help="search terms rows, eg: 10000 to 100000000 (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=90,
+        help="days of search terms (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.date.fromisoformat,
+        default=datetime.date(2021, 1, 1),
+        help="first day of search terms (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--zipf-s",
+        type=float,
+        default=1.1,
+        help="Zipf exponent of keys skew (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--gzip", action="store_true", help="gzip files")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    counts = generate(
+        args.directory,
+        args.rows,
+        days=args.days,
+        start=args.start,
+        s=args.zipf_s,
+        seed=args.seed,
+        compress=args.gzip,
+    )
+    logging.info(
+        "Generated %s campaigns, %s adgroups and %s search terms in %s",
+        counts["campaigns"],
+        counts["adgroups"],
+        counts["search_terms"],
+        args.directory,
+    )
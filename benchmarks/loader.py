@@ -0,0 +1,327 @@
+import typing as t
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import multiprocessing
+
+from core import database as db
+from core import dataframe
+from loader import dataloader
+from loader import scheduler
+from loader.checkpoint import LoadCheckpoint
+from shared import models
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+# stages of a load, each timed over a pass running it and the previous ones:
+# read lines, parse them into dicts, coerce dicts into models
+# and write them with DataLoader.
+STAGES = ("read", "parse", "coerce", "write")
+
+# end to end load.py run, scheduling, indexing, rankings and rollup included.
+LOAD = "load"
+
+# stages writing to the database, its loaded tables are emptied before.
+DATABASE_STAGES = ("write", LOAD)
+
+# tables emptied before the database stages.
+LOADED_MODELS = (
+    models.Campaign,
+    models.AdGroup,
+    models.SearchTerm,
+    models.RoasRanking,
+    models.CampaignRollup,
+    LoadCheckpoint,
+)
+
+
+def get_files(directory: str) -> t.List[t.Tuple[str, t.Type[dataloader.DataLoader]]]:
+    """
+
+    Get files of directory and their loaders, dimensions first.
+    """
+    files = scheduler.find_files([directory], None)
+
+    return sorted(files, key=lambda _: not _[1].dimension)
+
+
+def reset_tables() -> None:
+    dataloader.init_loader()
+
+    tables = [db.Manager(None, _).get_table_name() for _ in LOADED_MODELS]
+    dataloader.init_db().execute(f"TRUNCATE {', '.join(tables)}")
+
+
+def run_pass(
+    stage: str,
+    filename: str,
+    loader_class: t.Type[dataloader.DataLoader],
+) -> int:
+    """
+
+    Run stages of a file up to stage, returns rows.
+    """
+    rows = 0
+
+    if stage == "read":
+        for _ in dataframe.CSVLoader(filename).readfile():
+            rows += 1
+
+        # without the header.
+        return rows - 1
+
+    loader = loader_class(filename)
+
+    if stage == "write":
+        loader.load()
+        return 0
+
+    for data in loader.get_data():
+        if stage == "coerce":
+            loader.model(**data)
+        rows += 1
+
+    return rows
+
+
+def peak_rss() -> int:
+    """
+
+    Get peak resident memory in bytes of the process and its waited children.
+    """
+    return 1024 * max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+def measure(stage: str, directory: str) -> t.Dict[str, t.Any]:
+    """
+
+    Time stage over files of directory.
+    """
+    if stage in DATABASE_STAGES:
+        reset_tables()
+
+    started = time.perf_counter()
+    rows = 0
+    files = {}
+
+    if stage == LOAD:
+        import load
+
+        for _ in load.main([directory]):
+            pass
+
+    else:
+        for filename, loader_class in get_files(directory):
+            file_started = time.perf_counter()
+            rows += run_pass(stage, filename, loader_class)
+            files[os.path.basename(filename)] = time.perf_counter() - file_started
+
+    return {
+        "rows": rows,
+        "seconds": time.perf_counter() - started,
+        "files": files,
+        "peak_rss": peak_rss(),
+    }
+
+
+def _measure(connection: t.Any, stage: str, directory: str) -> None:
+    try:
+        connection.send(measure(stage, directory))
+    except BaseException as ex:
+        connection.send(ex)
+        raise
+    finally:
+        connection.close()
+
+
+def measure_process(stage: str, directory: str) -> t.Dict[str, t.Any]:
+    """
+
+    Time stage in a fresh interpreter, for its own peak memory.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+
+    process = context.Process(target=_measure, args=(sender, stage, directory))
+    process.start()
+    sender.close()
+
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = RuntimeError(f"{stage} stage exited with {process.exitcode}.")
+    finally:
+        process.join()
+
+    if isinstance(result, BaseException):
+        raise result
+
+    return result
+
+
+def benchmark(
+    directory: str,
+    stages: t.Sequence[str] = (*STAGES, LOAD),
+) -> t.Dict[str, t.Any]:
+    """
+
+    Benchmark stages of loading files of directory,
+    the loaded tables are emptied before database stages.
+    """
+    results = {}
+    for stage in stages:
+        logging.info("Benchmarking %s", stage)
+        results[stage] = measure_process(stage, directory)
+
+    # rows are counted by the passes not writing.
+    rows = next((_["rows"] for _ in results.values() if _["rows"]), None)
+    if rows is None:
+        rows = sum(run_pass("read", *_) for _ in get_files(directory))
+
+    for result in results.values():
+        result["rows"] = rows
+        result["rows_per_sec"] = rows / result["seconds"] if result["seconds"] else 0.0
+
+    # time of a stage alone, its pass time less the previous stage pass time.
+    previous = 0.0
+    for stage in STAGES:
+        result = results.get(stage)
+        if result is not None and previous is not None:
+            result["stage_seconds"] = max(0.0, result["seconds"] - previous)
+
+        previous = result and result["seconds"]
+
+    return {
+        "directory": directory,
+        "files": {
+            os.path.basename(filename): os.path.getsize(filename)
+            for filename, _ in get_files(directory)
+        },
+        "rows": rows,
+        "stages": results,
+    }
+
+
+def compare(
+    result: t.Dict[str, t.Any],
+    baseline: t.Dict[str, t.Any],
+    tolerance: float,
+) -> t.List[str]:
+    """
+
+    Get regressions of result stages from baseline beyond tolerance,
+    a share, eg: 0.1 for 10%.
+    """
+    regressions = []
+
+    for stage, stage_result in result["stages"].items():
+        baseline_result = baseline["stages"].get(stage)
+        if baseline_result is None:
+            continue
+
+        rate = baseline_result["rows_per_sec"] * (1 - tolerance)
+        if stage_result["rows_per_sec"] < rate:
+            regressions.append(
+                f"{stage} {stage_result['rows_per_sec']:.0f} rows/s "
+                f"< baseline {baseline_result['rows_per_sec']:.0f} rows/s"
+            )
+
+        rss = baseline_result["peak_rss"] * (1 + tolerance)
+        if stage_result["peak_rss"] > rss:
+            regressions.append(
+                f"{stage} peak RSS {stage_result['peak_rss'] / 2**20:.1f} MiB "
+                f"> baseline {baseline_result['peak_rss'] / 2**20:.1f} MiB"
+            )
+
+    return regressions
+
+
+def main(
+    directory: str,
+    stages: t.Sequence[str] = (*STAGES, LOAD),
+    output: t.Optional[str] = None,
+    baseline: t.Optional[str] = None,
+    tolerance: float = 0.1,
+) -> t.Dict[str, t.Any]:
+    result = benchmark(directory, stages)
+
+    for stage, stage_result in result["stages"].items():
+        logging.info(
+            "%s: %.2f s, %.0f rows/s, peak RSS %.1f MiB",
+            stage,
+            stage_result["seconds"],
+            stage_result["rows_per_sec"],
+            stage_result["peak_rss"] / 2**20,
+        )
+
+    if baseline:
+        with open(baseline) as file:
+            result["regressions"] = compare(result, json.load(file), tolerance)
+
+        for regression in result["regressions"]:
+            logging.error("Regression: %s", regression)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading CSV files, by stage and end to end. "
+        "Loaded tables are emptied, run against a scratch database."
+    )
+    parser.add_argument(
+        "directory",
+        help="directory of campaigns, adgroups and search terms files, "
+        "see benchmarks.generate",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=(*STAGES, LOAD),
+        default=(*STAGES, LOAD),
+        help="stages benchmarked (default: all)",
+    )
+    parser.add_argument("--output", help="json result file")
+    parser.add_argument(
+        "--baseline",
+        help="json result file of a previous run, regressions exit with 1",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="share of a baseline value regressing (default: %(default)s)",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = main(
+        args.directory,
+        stages=args.stages,
+        output=args.output,
+        baseline=args.baseline,
+        tolerance=args.tolerance,
+    )
+    json.dump(result, sys.stdout, indent=2)
+
+    if result.get("regressions"):
+        sys.exit(1)
@@ -0,0 +1,464 @@
+import typing as t
+
+import abc
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import http.client
+import urllib.parse
+
+from core.metrics import DEFAULT_BUCKETS
+from loader.dataloader import init_db
+from shared.models import AdGroup
+from shared.models import Campaign
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+# searched fields and the dimension holding their values.
+SEARCH_FIELDS = {
+    "structure_value": Campaign,
+    "alias": AdGroup,
+}
+
+# parameters of /search, term and value are required.
+SEARCH_PARAMETERS = ("term", "value", "from", "to", "group")
+
+
+def read_log_entry(line: str) -> t.Optional[str]:
+    """
+
+    Get search path of a request log line, None if it is not a search.
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+
+    if not isinstance(entry, dict):
+        return None
+
+    if set(entry) == {"path"}:
+        path = entry["path"]
+        if isinstance(path, str) and path.startswith("/search?"):
+            return path
+
+        return None
+
+    if (
+        entry.get("term")
+        and entry.get("value")
+        and set(entry) <= set(SEARCH_PARAMETERS)
+        and all(isinstance(_, str) for _ in entry.values())
+    ):
+        return "/search?" + urllib.parse.urlencode(entry)
+
+    return None
+
+
+def read_log(filename: str) -> t.List[str]:
+    """
+
+    Read search paths of a JSONL request log, a JSON object per line:
+    either a "path" of /search,
+    eg: {"path": "/search?term=alias&value=nike"},
+    or /search parameters, strings of SEARCH_PARAMETERS with term and value,
+    eg: {"term": "alias", "value": "nike", "from": "2021-01-01"}.
+    Blank lines are ignored, other lines are skipped with a warning.
+    """
+    paths = []
+    skipped = 0
+
+    with open(filename) as file:
+        for line in file:
+            if not line.strip():
+                continue
+
+            path = read_log_entry(line)
+            if path is None:
+                skipped += 1
+            else:
+                paths.append(path)
+
+    if skipped:
+        logging.warning("Skipped %s lines of %s not searches.", skipped, filename)
+
+    if not paths:
+        raise ValueError(f"No searches in {filename}.")
+
+    return paths
+
+
+def load_keys() -> t.Dict[str, t.List[str]]:
+    """
+
+    Get searchable values of each search field, from the database.
+    """
+    database = init_db()
+
+    return {
+        term: sorted({value for (value,) in model.manager(database).values_list(term)})
+        for term, model in SEARCH_FIELDS.items()
+    }
+
+
+def zipf_paths(
+    keys: t.Dict[str, t.List[str]],
+    count: int,
+    s: float = 1.1,
+    seed: t.Optional[int] = None,
+) -> t.List[str]:
+    """
+
+    Generate count searches of keys, a few values searched most:
+    the value of rank k of a field is searched with a weight of 1 / k ** s.
+    Values are ranked in a random order.
+    """
+    rng = random.Random(seed)
+
+    population = []
+    weights = []
+    for term, values in keys.items():
+        values = list(values)
+        rng.shuffle(values)
+
+        for rank, value in enumerate(values, 1):
+            query = urllib.parse.urlencode({"term": term, "value": value})
+            population.append(f"/search?{query}")
+            weights.append(1 / rank**s)
+
+    if not population:
+        raise ValueError("No keys to search.")
+
+    return rng.choices(population, weights=weights, k=count)
+
+
+class Target(abc.ABC):
+    """
+
+    Requests sender of a worker, returns response status codes.
+    """
+
+    @abc.abstractmethod
+    def get(self, path: str) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class AppTarget(Target):
+    def __init__(self, app: t.Any) -> None:
+        self.client = app.test_client()
+
+    def get(self, path: str) -> int:
+        return self.client.get(path).status_code
+
+
+class HTTPTarget(Target):
+    def __init__(self, url: str) -> None:
+        parsed = urllib.parse.urlsplit(url)
+        self.connection = http.client.HTTPConnection(
+            parsed.hostname,
+            parsed.port or 80,
+            timeout=30,
+        )
+
+    def get(self, path: str) -> int:
+        try:
+            self.connection.request("GET", path)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # reconnect on the next request.
+            self.connection.close()
+            raise
+
+        return response.status
+
+
+def percentile(values: t.Sequence[float], rank: float) -> float:
+    """
+
+    Get nearest rank percentile of sorted values.
+    """
+    if not values:
+        return 0.0
+
+    index = max(0, min(len(values) - 1, int(-(-rank * len(values) // 100)) - 1))
+
+    return values[index]
+
+
+def replay(
+    paths: t.Sequence[str],
+    make_target: t.Callable[[], Target],
+    *,
+    requests: int,
+    concurrency: int,
+    rate: t.Optional[float] = None,
+) -> t.Dict[str, t.Any]:
+    """
+
+    Send requests paths in turn from concurrency workers,
+    at most rate requests per second overall if given.
+
+    With a rate, latencies are measured from when requests were due,
+    including the time waiting for a free worker.
+    """
+    lock = threading.Lock()
+    position = 0
+    latencies: t.List[float] = []
+    statuses: t.Dict[str, int] = {}
+    errors = 0
+
+    started = time.perf_counter()
+
+    def worker() -> None:
+        nonlocal position, errors
+
+        target = make_target()
+        try:
+            while True:
+                with lock:
+                    index = position
+                    position += 1
+                if index >= requests:
+                    return
+
+                due = time.perf_counter()
+                if rate:
+                    due = started + index / rate
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                try:
+                    status = str(target.get(paths[index % len(paths)]))
+                except Exception:
+                    status = None
+
+                latency = time.perf_counter() - due
+
+                with lock:
+                    if status is None:
+                        errors += 1
+                    else:
+                        statuses[status] = statuses.get(status, 0) + 1
+                        latencies.append(latency)
+        finally:
+            target.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    histogram = {str(_): 0 for _ in DEFAULT_BUCKETS}
+    histogram["+Inf"] = 0
+    for latency in latencies:
+        bucket = next((str(_) for _ in DEFAULT_BUCKETS if latency <= _), "+Inf")
+        histogram[bucket] += 1
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "rate": rate,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        },
+        "histogram": histogram,
+    }
+
+
+def compare(
+    result: t.Dict[str, t.Any],
+    baseline: t.Dict[str, t.Any],
+    tolerance: float,
+) -> t.List[str]:
+    """
+
+    Get regressions of result from baseline beyond tolerance,
+    a share, eg: 0.1 for 10%.
+    """
+    regressions = []
+
+    # throughputs of rate limited runs are their rates.
+    throughput = baseline["throughput"] * (1 - tolerance)
+    if not (result["rate"] or baseline["rate"]) and result["throughput"] < throughput:
+        regressions.append(
+            f"throughput {result['throughput']:.1f} "
+            f"< baseline {baseline['throughput']:.1f}"
+        )
+
+    for name, value in result["latency_ms"].items():
+        if name == "max":
+            continue
+
+        baseline_value = baseline["latency_ms"][name]
+        if value > baseline_value * (1 + tolerance):
+            regressions.append(
+                f"{name} {value:.2f} ms > baseline {baseline_value:.2f} ms"
+            )
+
+    return regressions
+
+
+def main(
+    log: t.Optional[str] = None,
+    url: t.Optional[str] = None,
+    requests: t.Optional[int] = None,
+    concurrency: int = 10,
+    rate: t.Optional[float] = None,
+    zipf_s: float = 1.1,
+    seed: t.Optional[int] = None,
+    output: t.Optional[str] = None,
+    baseline: t.Optional[str] = None,
+    tolerance: float = 0.1,
+) -> t.Dict[str, t.Any]:
+    """
+
+    Replay a request log, or a Zipfian mix of searches of the database
+    keys, against a running server at url or an in-process app.
+    """
+    if log:
+        paths = read_log(log)
+    else:
+        paths = zipf_paths(load_keys(), requests or 10_000, s=zipf_s, seed=seed)
+
+    if url:
+        target_name = url
+
+        def make_target() -> Target:
+            return HTTPTarget(url)
+
+    else:
+        from app import create_app
+
+        app = create_app()
+        target_name = "app"
+
+        def make_target() -> Target:
+            return AppTarget(app)
+
+    result = replay(
+        paths,
+        make_target,
+        requests=requests or len(paths),
+        concurrency=concurrency,
+        rate=rate,
+    )
+    result.update(
+        {
+            "target": target_name,
+            "source": log or f"zipf(s={zipf_s}, seed={seed})",
+        }
+    )
+
+    logging.info(
+        "%s requests, %.1f/s, p50 %.2f ms, p95 %.2f ms, p99 %.2f ms, max %.2f ms",
+        result["requests"],
+        result["throughput"],
+        *result["latency_ms"].values(),
+    )
+
+    if baseline:
+        with open(baseline) as file:
+            result["regressions"] = compare(result, json.load(file), tolerance)
+
+        for regression in result["regressions"]:
+            logging.error("Regression: %s", regression)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay searches against the endpoint and report latencies."
+    )
+    parser.add_argument(
+        "--log",
+        help="JSONL request log replayed, else a Zipfian mix of database keys",
+    )
+    parser.add_argument(
+        "--url",
+        help="running server, eg: http://localhost:8000, else an in-process app",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        help="requests sent, the log cycled (default: log length or 10000)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="concurrent workers (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="requests per second overall (default: as fast as possible)",
+    )
+    parser.add_argument(
+        "--zipf-s",
+        type=float,
+        default=1.1,
+        help="Zipf exponent of the generated mix (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, help="seed of the generated mix")
+    parser.add_argument("--output", help="json result file")
+    parser.add_argument(
+        "--baseline",
+        help="json result file of a previous run, regressions exit with 1",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="share of a baseline value regressing (default: %(default)s)",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = main(
+        log=args.log,
+        url=args.url,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        zipf_s=args.zipf_s,
+        seed=args.seed,
+        output=args.output,
+        baseline=args.baseline,
+        tolerance=args.tolerance,
+    )
+    json.dump(result, sys.stdout, indent=2)
+
+    if result.get("regressions"):
+        sys.exit(1)
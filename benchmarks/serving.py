@@ -0,0 +1,188 @@
+import typing as t
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import resource
+import subprocess
+
+from benchmarks.client import run_clients
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# servers of the Flask and asyncio apps, formatted with workers, threads, port.
+SERVERS = {
+    "sync": "gunicorn --workers {workers} --threads {threads} "
+    "--bind 127.0.0.1:{port} wsgi:app",
+    "async": "hypercorn --workers {workers} --bind 127.0.0.1:{port} asgi:app",
+}
+
+
+def wait_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def benchmark(
+    server: str,
+    paths: t.Sequence[str],
+    concurrencies: t.Sequence[int],
+    *,
+    duration: float,
+    workers: int,
+    threads: int,
+    port: int,
+) -> t.List[t.Dict[str, t.Any]]:
+    """
+
+    Start server, then run clients at each concurrency against it.
+    """
+    command = SERVERS[server].format(workers=workers, threads=threads, port=port)
+    process = subprocess.Popen(command.split(), cwd=ROOT)
+    try:
+        wait_port(port)
+
+        results = []
+        for concurrency in concurrencies:
+            result = asyncio.run(
+                run_clients(f"http://127.0.0.1:{port}", paths, concurrency, duration)
+            )
+            result["server"] = server
+            results.append(result)
+
+            logging.info(
+                "%s %s clients: %.1f rps, statuses %s, errors %s",
+                server,
+                concurrency,
+                result["rps"],
+                result["statuses"],
+                result["errors"],
+            )
+
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(
+    paths: t.Sequence[str],
+    concurrencies: t.Sequence[int] = (10, 100, 1000),
+    servers: t.Sequence[str] = ("sync", "async"),
+    duration: float = 10,
+    workers: int = 1,
+    threads: int = 8,
+    port: int = 8100,
+    output: t.Optional[str] = None,
+) -> t.List[t.Dict[str, t.Any]]:
+    """
+
+    Compare requests per second of the Flask app under gunicorn
+    and the asyncio app under hypercorn, same workers for both.
+    """
+    # one file descriptor per client, and as many for the server.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 2 * max(concurrencies) + 64
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    results = []
+    for server in servers:
+        results.extend(
+            benchmark(
+                server,
+                paths,
+                concurrencies,
+                duration=duration,
+                workers=workers,
+                threads=threads,
+                port=port,
+            )
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark Flask and asyncio apps searches throughput."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["/search?term=structure_value&value=nike"],
+        help="requested paths, in turn (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="concurrent keep-alive clients (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--server",
+        choices=SERVERS,
+        nargs="+",
+        default=list(SERVERS),
+        help="servers benchmarked (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=10,
+        help="seconds per concurrency (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="server worker processes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="gunicorn threads per worker (default: %(default)s)",
+    )
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--output", help="json results file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = main(
+        args.paths,
+        concurrencies=args.concurrency,
+        servers=args.server,
+        duration=args.duration,
+        workers=args.workers,
+        threads=args.threads,
+        port=args.port,
+        output=args.output,
+    )
+    json.dump(results, sys.stdout, indent=2)
@@ -0,0 +1,170 @@
+import typing as t
+
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks.serving import ROOT
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+# timed in a fresh interpreter, as a booting worker.
+STARTUP = """
+import json, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{module}.create_app()
+created = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+}}))
+"""
+
+MODULES = {
+    "sync": "app",
+    "async": "aioapp",
+}
+
+
+def measure(app: str, schema: str) -> t.Dict[str, float]:
+    with tempfile.NamedTemporaryFile("w", suffix=".cfg") as config:
+        config.write(f"DATABASE_SCHEMA = {schema!r}\n")
+        config.flush()
+
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP.format(module=MODULES[app])],
+            cwd=ROOT,
+            env={**os.environ, "FLASK_CONFIG_PATH": config.name},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+def get_import_times(module: str, top: int) -> t.List[t.Tuple[str, int]]:
+    """
+
+    Get modules of the slowest cumulative import times in microseconds.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        times.append((name.strip(), int(cumulative)))
+
+    return sorted(times, key=lambda _: -_[1])[:top]
+
+
+def main(
+    apps: t.Sequence[str] = ("sync",),
+    schemas: t.Sequence[str] = ("create", "validate", "version"),
+    runs: int = 10,
+    top: int = 10,
+    output: t.Optional[str] = None,
+) -> t.Dict[str, t.Any]:
+    """
+
+    Time app module import and create_app of fresh interpreters
+    for each DATABASE_SCHEMA mode.
+    """
+    results: t.Dict[str, t.Any] = {"startup": [], "imports": {}}
+
+    for app in apps:
+        results["imports"][app] = get_import_times(MODULES[app], top)
+
+        for schema in schemas:
+            # first run writes the schema version marker, untimed.
+            measure(app, schema)
+            timings = [measure(app, schema) for _ in range(runs)]
+
+            result = {"app": app, "schema": schema, "runs": runs}
+            for name in ("import_ms", "create_app_ms"):
+                values = [_[name] for _ in timings]
+                result[name] = {
+                    "median": statistics.median(values),
+                    "min": min(values),
+                    "max": max(values),
+                }
+            results["startup"].append(result)
+
+            logging.info(
+                "%s %s: import %.1f ms, create_app %.1f ms (medians)",
+                app,
+                schema,
+                result["import_ms"]["median"],
+                result["create_app_ms"]["median"],
+            )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark apps startup time.")
+    parser.add_argument(
+        "--app",
+        choices=MODULES,
+        nargs="+",
+        default=["sync"],
+        help="apps benchmarked (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--schema",
+        choices=("create", "validate", "version"),
+        nargs="+",
+        default=["create", "validate", "version"],
+        help="DATABASE_SCHEMA modes (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="interpreters started per mode (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="slowest imports reported (default: %(default)s)",
+    )
+    parser.add_argument("--output", help="json results file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = main(
+        apps=args.app,
+        schemas=args.schema,
+        runs=args.runs,
+        top=args.top,
+        output=args.output,
+    )
+    json.dump(results, sys.stdout, indent=2)
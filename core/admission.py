@@ -0,0 +1,114 @@
+import typing as t
+
+import time
+import threading
+
+from contextlib import contextmanager
+
+from core import deadline
+from core import metrics
+from core.exceptions import OverloadedException
+
+
+ADMISSION_WAIT = metrics.REGISTRY.histogram(
+    "db_admission_wait_seconds",
+    "Seconds database transactions waited for a slot, rejected ones included.",
+    ["outcome"],
+)
+ADMISSION_SLOTS = metrics.REGISTRY.gauge(
+    "db_admission_slots",
+    "Database transactions admitted and waiting by state.",
+    ["state"],
+)
+
+
+class Limiter:
+    """
+
+    Admission control of database transactions of a process:
+    at most max_concurrency run at once, at most max_queue more wait
+    for a slot, up to timeout seconds or the ongoing deadline.
+    Others are rejected right away with OverloadedException,
+    for clients to retry after retry_after seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int = 0,
+        timeout: float = 0.1,
+        retry_after: int = 1,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+        self._condition = threading.Condition()
+
+    def _reject(self, started: float, message: str) -> OverloadedException:
+        self.rejected += 1
+        ADMISSION_WAIT.observe(time.perf_counter() - started, outcome="rejected")
+
+        return OverloadedException(message, retry_after=self.retry_after)
+
+    @contextmanager
+    def acquire(self) -> t.Generator[None, None, None]:
+        started = time.perf_counter()
+
+        with self._condition:
+            if self.in_flight >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    raise self._reject(started, "Database is saturated.")
+
+                timeout = self.timeout
+                remaining = deadline.get_remaining()
+                if remaining is not None:
+                    timeout = max(0.0, min(timeout, remaining))
+
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.in_flight < self.max_concurrency,
+                        timeout,
+                    )
+                finally:
+                    self.waiting -= 1
+
+                if not admitted:
+                    raise self._reject(started, "Database is saturated.")
+
+            self.in_flight += 1
+            self.admitted += 1
+
+        ADMISSION_WAIT.observe(time.perf_counter() - started, outcome="admitted")
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def get_stats(self) -> t.Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def collect_metrics(self) -> None:
+        """
+
+        Set admission gauges, a metrics collector.
+        """
+        ADMISSION_SLOTS.set(self.in_flight, state="in_flight")
+        ADMISSION_SLOTS.set(self.waiting, state="waiting")
@@ -0,0 +1,427 @@
+import typing as t
+
+import time
+import asyncio
+import collections
+import functools
+
+from contextlib import asynccontextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from psycopg2.errors import QueryCanceled
+from psycopg2.extras import RealDictCursor
+
+from core import deadline as core_deadline
+from core import metrics
+from core.database import DB_TRANSACTIONS
+from core.database import Database
+from core.database import Manager
+from core.database import Model
+from core.exceptions import TimeoutException
+
+
+DB_POOL = metrics.REGISTRY.gauge(
+    "db_pool_connections",
+    "Asynchronous database pool connections by state.",
+    ["state"],
+)
+
+
+async def wait(connection: t.Any) -> None:
+    """
+
+    Wait for an asynchronous connection operation to complete.
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        state = connection.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+
+        future = loop.create_future()
+        fileno = connection.fileno()
+
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fileno, future.set_result, None)
+            try:
+                await future
+            finally:
+                loop.remove_reader(fileno)
+
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fileno, future.set_result, None)
+            try:
+                await future
+            finally:
+                loop.remove_writer(fileno)
+
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state {state}.")
+
+
+class Pool:
+    """
+
+    Pool of asynchronous connections, at most max_size open.
+    Connections are opened on demand and reused,
+    acquirers wait for a released connection when all are in use.
+    """
+
+    def __init__(self, *args, max_size: int = 10, **kwargs) -> None:
+        self.args = args
+        self.kwargs = kwargs
+        self.max_size = max_size
+
+        self.size = 0
+        self._idle: t.List[t.Any] = []
+        self._waiters: t.Deque[asyncio.Future] = collections.deque()
+
+    async def _connect(self) -> t.Any:
+        connection = psycopg2.connect(*self.args, async_=True, **self.kwargs)
+        await wait(connection)
+
+        return connection
+
+    async def acquire(self) -> t.Any:
+        while True:
+            if self._idle:
+                return self._idle.pop()
+
+            if self.size < self.max_size:
+                self.size += 1
+                try:
+                    return await self._connect()
+                except BaseException:
+                    self.size -= 1
+                    raise
+
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                connection = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release(future.result())
+                raise
+
+            # None wakes a waiter up to open a connection.
+            if connection is not None:
+                return connection
+
+    def release(self, connection: t.Any) -> None:
+        """
+
+        Release connection, closed connections are dropped.
+        """
+        if connection.closed:
+            self.size -= 1
+            connection = None
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return
+
+        if connection is not None:
+            self._idle.append(connection)
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+            self.size -= 1
+
+    def get_stats(self) -> t.Dict[str, int]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.size - len(self._idle),
+            "waiting": len(self._waiters),
+            "max_size": self.max_size,
+        }
+
+
+class Cursor:
+    """
+
+    Cursor of an asynchronous connection, execute is awaited.
+    """
+
+    def __init__(self, connection: t.Any) -> None:
+        self.connection = connection
+        self.cursor = connection.cursor(cursor_factory=RealDictCursor)
+
+    async def execute(
+        self,
+        query: str,
+        args: t.Union[t.Dict[str, t.Any], t.Sequence[t.Any], None] = None,
+    ) -> None:
+        self.cursor.execute(query, args)
+        await wait(self.connection)
+
+    def fetchone(self) -> t.Optional[t.Dict[str, t.Any]]:
+        return self.cursor.fetchone()
+
+    def fetchall(self) -> t.List[t.Dict[str, t.Any]]:
+        return self.cursor.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+
+class AsyncDatabase:
+    """
+
+    Postgres database asynchronous wrapper, with a connection pool.
+    """
+
+    def __init__(self, *args, max_size: int = 10, **kwargs) -> None:
+        """
+
+        args & kwargs are directly passed to psycopg2.connect.
+        """
+        self.args = args
+        self.kwargs = kwargs
+
+        self.pool = Pool(*args, max_size=max_size, **kwargs)
+
+        self._sync = None
+
+    @property
+    def sync(self) -> Database:
+        """
+
+        Blocking database of the same connection parameters,
+        eg: to run in a thread.
+        """
+        if self._sync is None:
+            self._sync = Database(*self.args, **self.kwargs)
+
+        return self._sync
+
+    @property
+    def caches(self) -> t.Dict[str, t.Any]:
+        # tables caches are loaded through the blocking database.
+        return self.sync.caches
+
+    @asynccontextmanager
+    async def transact(
+        self,
+        deadline: t.Optional[float] = None,
+        read_only: bool = False,
+    ) -> t.AsyncGenerator[Cursor, None]:
+        """
+
+        Context manager to create a database transaction.
+        Connections of interrupted queries are closed.
+        deadline is the time.monotonic() time by which it must be done,
+        the ongoing core.deadline.DEADLINE by default, statements time out
+        with a statement_timeout and raise TimeoutException.
+        read_only transactions are started READ ONLY, there are no
+        replicas to route them to, see Database.transact.
+        """
+        if deadline is None:
+            deadline = core_deadline.DEADLINE.get()
+
+        if deadline is not None and core_deadline.get_remaining(deadline) <= 0:
+            raise TimeoutException("Deadline exceeded before the query.")
+
+        started = time.perf_counter()
+        connection = await self.pool.acquire()
+        try:
+            cursor = Cursor(connection)
+            await cursor.execute("BEGIN READ ONLY" if read_only else "BEGIN")
+
+            try:
+                if deadline is not None:
+                    remaining = core_deadline.get_remaining(deadline)
+                    if remaining <= 0:
+                        raise TimeoutException("Deadline exceeded before the query.")
+
+                    await cursor.execute(
+                        "SET LOCAL statement_timeout = %s",
+                        (max(1, int(remaining * 1000)),),
+                    )
+
+                yield cursor
+            except BaseException:
+                if connection.isexecuting():
+                    connection.close()
+                elif not connection.closed:
+                    await cursor.execute("ROLLBACK")
+                raise
+
+            await cursor.execute("COMMIT")
+        except asyncio.CancelledError:
+            connection.close()
+            raise
+        except QueryCanceled as ex:
+            raise TimeoutException("Query exceeded its deadline.") from ex
+        except psycopg2.Error:
+            if (
+                not connection.closed
+                and connection.get_transaction_status()
+                != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            ):
+                connection.close()
+            raise
+        finally:
+            self.pool.release(connection)
+
+            elapsed = time.perf_counter() - started
+            DB_TRANSACTIONS.observe(elapsed)
+            metrics.add_timing("db", elapsed)
+
+    async def execute(
+        self,
+        query: str,
+        args: t.Union[t.Dict[str, t.Any], t.Sequence[t.Any], None] = None,
+    ) -> None:
+        async with self.transact() as cursor:
+            await cursor.execute(query, args)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def collect_pool_metrics(self) -> None:
+        """
+
+        Set pool gauges, a metrics collector.
+        """
+        stats = self.pool.get_stats()
+        for state in ("in_use", "idle", "waiting", "max_size"):
+            DB_POOL.set(stats[state], state=state)
+
+
+class _WriteMethod:
+    """
+
+    Manager write method hidden from read only managers,
+    getting it raises AttributeError.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: t.Any, owner: t.Optional[type] = None) -> t.NoReturn:
+        raise AttributeError(
+            f"{(owner or type(instance)).__name__} is read only, "
+            f"it has no {self.name}."
+        )
+
+
+class AsyncManager(Manager):
+    """
+
+    Read only orm driver of an AsyncDatabase,
+    fetching methods are coroutines.
+    Write methods are hidden, Meta.manager writes going through
+    _transact, eg: refresh, raise AttributeError.
+    """
+
+    _transact = _WriteMethod()
+    save = _WriteMethod()
+    update = _WriteMethod()
+    upsert_many = _WriteMethod()
+    copy_many = _WriteMethod()
+    copy_from = _WriteMethod()
+    delete_duplicates = _WriteMethod()
+    create_partitions = _WriteMethod()
+    drop_partitions = _WriteMethod()
+
+    async def query(
+        self,
+        query: str,
+        args: t.Union[t.Dict[str, t.Any], t.Sequence[t.Any], None] = None,
+    ) -> t.List[Model]:
+        """
+
+        Execute a read only query.
+        """
+        return [self._modelize(**r) for r in await self.query_rows(query, args)]
+
+    async def query_rows(
+        self,
+        query: str,
+        args: t.Union[t.Dict[str, t.Any], t.Sequence[t.Any], None] = None,
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+
+        Execute a read only query, returns rows as dicts.
+        """
+        async with self.database.transact(read_only=True) as cursor:
+            await cursor.execute(query, args)
+
+            return cursor.fetchall()
+
+    async def find(self, **kwargs) -> t.List[Model]:
+        """
+
+        Fetch items in database table.
+        Keyword arguments are converted into a where query clause.
+        Cached models are found in memory, loaded in a thread when stale.
+        """
+        if self.get_cache():
+            manager = Manager(self.database.sync, self.model, self.table_name)
+            if manager.is_cache_current():
+                return manager.find(**kwargs)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                functools.partial(manager.find, **kwargs),
+            )
+
+        where_clause, where_args = self._where(kwargs)
+
+        return await self.query(
+            f"SELECT * FROM {self.get_table_name()} {where_clause}",
+            where_args,
+        )
+
+    async def get(self, **kwargs) -> t.Optional[Model]:
+        results = await self.find(**kwargs)
+
+        return results and results[0]
+
+    async def values_list(self, *fields: str, **kwargs) -> t.List[t.Tuple]:
+        where_clause, where_args = self._where(kwargs)
+
+        async with self.database.transact(read_only=True) as cursor:
+            await cursor.execute(
+                f"SELECT {', '.join(fields)} "
+                f"FROM {self.get_table_name()} {where_clause}",
+                where_args,
+            )
+
+            return [tuple(_[f] for f in fields) for _ in cursor.fetchall()]
+
+
+# asynchronous variants of managers classes.
+ASYNC_MANAGERS: t.Dict[t.Type[Manager], t.Type[AsyncManager]] = {}
+
+
+def async_manager(
+    model: t.Type[Model],
+    database: AsyncDatabase,
+    table_name: t.Optional[str] = None,
+) -> AsyncManager:
+    """
+
+    Get asynchronous manager of model, its Meta.manager queries
+    returning self.query results are awaited.
+    """
+    manager_class = getattr(model.Meta, "manager", None) or Manager
+
+    if manager_class not in ASYNC_MANAGERS:
+        ASYNC_MANAGERS[manager_class] = type(
+            f"Async{manager_class.__name__}",
+            (AsyncManager, manager_class),
+            {},
+        )
+
+    return ASYNC_MANAGERS[manager_class](database, model, table_name=table_name)
@@ -0,0 +1,74 @@
+import typing as t
+
+import asyncio
+import contextvars
+
+from core import deadline as core_deadline
+from core.singleflight import SingleFlight
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+
+    SingleFlight of coroutines, callers of a key in flight await its call.
+    Shared calls block on file locks so are run in a thread.
+    """
+
+    async def do(  # type: ignore[override]
+        self,
+        key: t.Hashable,
+        function: t.Callable[[], t.Awaitable[t.Any]],
+    ) -> t.Any:
+        self.requests += 1
+
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                # followers cancellation must not cancel the call.
+                return await asyncio.wait_for(
+                    asyncio.shield(future),
+                    core_deadline.get_remaining(),
+                )
+            except asyncio.TimeoutError:
+                # the call waited for outlived the deadline.
+                self.calls += 1
+
+                return await function()
+
+        future = self._calls[key] = asyncio.ensure_future(self._call(key, function))
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                del self._calls[key]
+            else:
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+    async def _call(  # type: ignore[override]
+        self,
+        key: t.Hashable,
+        function: t.Callable[[], t.Awaitable[t.Any]],
+    ) -> t.Any:
+        if self.shared is None:
+            self.calls += 1
+
+            return await function()
+
+        loop = asyncio.get_running_loop()
+        # the thread waits on file locks until the ongoing deadline.
+        context = contextvars.copy_context()
+        result, shared = await loop.run_in_executor(
+            None,
+            context.run,
+            self.shared.do,
+            key,
+            lambda: asyncio.run_coroutine_threadsafe(function(), loop).result(),
+        )
+
+        if shared:
+            self.shared_coalesced += 1
+        else:
+            self.calls += 1
+
+        return result
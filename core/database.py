@@ -1,21 +1,283 @@
 import typing as t
 
+import io
+import os
+import csv
+import hashlib
+import functools
+import time
+import logging
 import datetime
 import decimal
+import operator
+import random
+import itertools
+import threading
+import contextvars
 
 from contextlib import contextmanager
 from contextlib import closing
+from contextlib import nullcontext
 from dataclasses import dataclass
+from dataclasses import field
 from dataclasses import _MISSING_TYPE
 from collections import OrderedDict
 
+from psycopg2 import Error
+from psycopg2 import OperationalError
 from psycopg2 import connect
+from psycopg2.errors import QueryCanceled
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extensions import adapt
 from psycopg2.extensions import cursor
 from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
 
 
+from core import deadline as core_deadline
+from core import metrics
+from core.exceptions import TimeoutException
 from core.utils import iter_to_str
 
+if t.TYPE_CHECKING:
+    from core.admission import Limiter
+
+
+DB_TRANSACTIONS = metrics.REGISTRY.histogram(
+    "db_transaction_duration_seconds",
+    "Database transactions duration, connection included.",
+)
+DB_CONNECTIONS = metrics.REGISTRY.gauge(
+    "db_connections_in_use",
+    "Database connections open by transactions.",
+)
+DB_ROUTED = metrics.REGISTRY.counter(
+    "db_transactions_routed_total",
+    "Database transactions by server they were routed to.",
+    ["node"],
+)
+DB_REPLICA_LAG = metrics.REGISTRY.gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of database replicas at their last check, -1 if unreachable.",
+    ["node"],
+)
+
+# time.monotonic() time of the last write transaction of the ongoing
+# context, eg: a request thread, see Database read_your_writes.
+LAST_WRITE: contextvars.ContextVar[t.Optional[float]] = contextvars.ContextVar(
+    "last_write",
+    default=None,
+)
+
+# replicas balancing policies of read only transactions, see Database.route.
+BALANCING = ("round_robin", "random", "least_busy")
+
+# replay lag of a replica, 0 once it replayed all it received, eg: while the
+# primary is idle, and on a primary.
+LAG_QUERY = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Pool:
+    """
+
+    Pool of connections, at most max_size open, the blocking
+    counterpart of core.aiodatabase.Pool.
+    Connections are opened on demand and reused,
+    acquirers wait for a released connection when all are in use.
+    """
+
+    def __init__(self, *args, max_size: int = 10, **kwargs) -> None:
+        self.args = args
+        self.kwargs = kwargs
+        self.max_size = max_size
+
+        self.size = 0
+        self.waiting = 0
+        self._idle: t.List[t.Any] = []
+        self._condition = threading.Condition()
+        self._pid = os.getpid()
+
+    def _check_fork(self) -> None:
+        # connections of a parent process are left to it,
+        # closing them would end its sessions.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self.size = 0
+
+    def acquire(self, timeout: t.Optional[float] = None) -> t.Any:
+        """
+
+        Get a connection, waiting up to timeout seconds for one,
+        TimeoutException past it.
+        """
+        with self._condition:
+            self._check_fork()
+
+            self.waiting += 1
+            try:
+                available = self._condition.wait_for(
+                    lambda: self._idle or self.size < self.max_size,
+                    timeout,
+                )
+            finally:
+                self.waiting -= 1
+
+            if not available:
+                raise TimeoutException("No database connection before the deadline.")
+
+            if self._idle:
+                return self._idle.pop()
+
+            self.size += 1
+
+        try:
+            return connect(*self.args, **self.kwargs)
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection: t.Any) -> None:
+        """
+
+        Release connection, closed connections are dropped.
+        """
+        with self._condition:
+            self._check_fork()
+
+            if connection.closed:
+                self.size = max(0, self.size - 1)
+            else:
+                self._idle.append(connection)
+
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            while self._idle:
+                self._idle.pop().close()
+                self.size -= 1
+
+    def get_stats(self) -> t.Dict[str, int]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.size - len(self._idle),
+            "waiting": self.waiting,
+            "max_size": self.max_size,
+        }
+
+
+class Node:
+    """
+
+    Server of a Database, its primary or a read replica.
+    Connections are pooled if pool_size is given,
+    else opened and closed by each transaction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        args: t.Tuple[t.Any, ...],
+        kwargs: t.Dict[str, t.Any],
+        pool_size: t.Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.pool = Pool(*args, max_size=pool_size, **kwargs) if pool_size else None
+
+        self.in_use = 0
+        self.transactions = 0
+
+        # replication lag seconds at the last check, None if unreachable.
+        self.lag: t.Optional[float] = 0.0
+        self.checked_at = 0.0
+        self.ejected = False
+
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+
+    def _open(self, timeout: t.Optional[float] = None) -> t.Any:
+        if self.pool is None:
+            return connect(*self.args, **self.kwargs)
+
+        return self.pool.acquire(timeout)
+
+    def _close(self, connection: t.Any) -> None:
+        if self.pool is None:
+            connection.close()
+            return
+
+        # transactions left open are rolled back.
+        if (
+            not connection.closed
+            and connection.get_transaction_status() != TRANSACTION_STATUS_IDLE
+        ):
+            try:
+                connection.rollback()
+            except Error:
+                connection.close()
+
+        self.pool.release(connection)
+
+    def acquire(self, timeout: t.Optional[float] = None) -> t.Any:
+        """
+
+        Get a connection for a transaction, waiting up to timeout seconds
+        for a pooled one.
+        """
+        connection = self._open(timeout)
+
+        with self._lock:
+            self.in_use += 1
+            self.transactions += 1
+
+        return connection
+
+    def release(self, connection: t.Any) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+        self._close(connection)
+
+    def get_lag(self, timeout: t.Optional[float] = None) -> float:
+        """
+
+        Get replication lag seconds, 0 on a primary.
+        """
+        connection = self._open(timeout)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(LAG_QUERY)
+            lag = cursor.fetchone()[0]
+            connection.commit()
+        finally:
+            self._close(connection)
+
+        return float(lag or 0)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+    def get_stats(self) -> t.Dict[str, t.Any]:
+        return {
+            "name": self.name,
+            "in_use": self.in_use,
+            "transactions": self.transactions,
+            "lag": self.lag,
+            "ejected": self.ejected,
+            "pool": self.pool and self.pool.get_stats(),
+        }
+
 
 class Database:
     """
@@ -23,32 +285,269 @@ class Database:
     Postgres database wrapper.
     """
 
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(
+        self,
+        *args,
+        replicas: t.Sequence[t.Union[str, t.Dict[str, t.Any]]] = (),
+        pool_size: t.Optional[int] = None,
+        balancing: str = "round_robin",
+        max_lag: t.Optional[float] = None,
+        lag_check_interval: float = 5.0,
+        read_your_writes: float = 0.0,
+        **kwargs,
+    ) -> None:
         """
 
         args & kwargs are directly passed to  psycopg2.connect
+
+        replicas are DSNs, or psycopg2.connect kwargs over the primary ones,
+        of read replicas serving read_only transactions, see route.
+        pool_size pools at most pool_size connections to each server,
+        else each transaction opens its own connection.
         """
+        if balancing not in BALANCING:
+            raise ValueError(f"Unexpected balancing {balancing}.")
+
         self.args = args
         self.kwargs = kwargs
 
         self._connection = None
 
+        self.primary = Node("primary", args, kwargs, pool_size)
+        self.replicas = [
+            Node(
+                f"replica{index}",
+                *(
+                    ((replica,), {})
+                    if isinstance(replica, str)
+                    else (args, {**kwargs, **replica})
+                ),
+                pool_size,
+            )
+            for index, replica in enumerate(replicas)
+        ]
+        self.balancing = balancing
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.read_your_writes = read_your_writes
+
+        self._round_robin = itertools.count()
+
+        # callbacks of ongoing transactions by connection, see on_commit.
+        self._on_commit: t.Dict[int, t.List[t.Callable[[], None]]] = {}
+
+        # tables of cached models by table name, see Cache.
+        self.caches: t.Dict[str, "TableCache"] = {}
+
+        # admission control of transactions, eg: of an endpoint worker.
+        self.limiter: t.Optional["Limiter"] = None
+
     @property
     def connection(self) -> t.Any:
         self._connection = connect(*self.args, **self.kwargs)
 
         return self._connection
 
+    def route(self, read_only: bool = False) -> Node:
+        """
+
+        Get the server of a transaction. read_only ones go to a replica
+        chosen by balancing among those not ejected, see check_replica,
+        others, eg: writes and DDL, and reads without replica go to the primary.
+        With read_your_writes, reads of a context less than read_your_writes
+        seconds after its last write go to the primary.
+        """
+        if not read_only or not self.replicas:
+            return self.primary
+
+        if self.read_your_writes:
+            written = LAST_WRITE.get()
+            if (
+                written is not None
+                and time.monotonic() - written < self.read_your_writes
+            ):
+                return self.primary
+
+        replicas = [_ for _ in self.replicas if self.check_replica(_)]
+        if not replicas:
+            return self.primary
+
+        if self.balancing == "random":
+            return random.choice(replicas)
+
+        if self.balancing == "least_busy":
+            return min(replicas, key=lambda _: _.in_use)
+
+        return replicas[next(self._round_robin) % len(replicas)]
+
+    def check_replica(self, replica: Node) -> bool:
+        """
+
+        Check replica lag every lag_check_interval seconds, replicas lagging
+        over max_lag seconds or unreachable are ejected until a check passes.
+        Other threads route by the last check while one checks.
+        """
+        now = time.monotonic()
+        if now - replica.checked_at >= self.lag_check_interval:
+            if replica._check_lock.acquire(blocking=False):
+                try:
+                    replica.checked_at = now
+                    replica.lag = replica.get_lag(core_deadline.get_remaining())
+                except (Error, TimeoutException) as ex:
+                    logging.warning("%s lag check failed: %r", replica.name, ex)
+                    replica.lag = None
+                finally:
+                    replica._check_lock.release()
+
+                self._set_ejected(replica)
+
+        return not replica.ejected
+
+    def _set_ejected(self, replica: Node) -> None:
+        lag = replica.lag
+        ejected = lag is None or (self.max_lag is not None and lag > self.max_lag)
+
+        if ejected != replica.ejected:
+            if ejected:
+                logging.warning("%s ejected, lag %s seconds.", replica.name, lag)
+            else:
+                logging.info("%s restored, lag %s seconds.", replica.name, lag)
+
+        replica.ejected = ejected
+        DB_REPLICA_LAG.set(-1 if lag is None else lag, node=replica.name)
+
+    def _acquire(
+        self,
+        node: Node,
+        deadline: t.Optional[float],
+    ) -> t.Tuple[Node, t.Any]:
+        """
+
+        Get a connection of node, of the primary if node is an unreachable
+        replica, then ejected until its next check.
+        """
+        try:
+            return node, node.acquire(core_deadline.get_remaining(deadline))
+        except OperationalError as ex:
+            if node is self.primary:
+                raise
+
+            logging.warning("%s connection failed: %r", node.name, ex)
+            node.lag = None
+            node.checked_at = time.monotonic()
+            self._set_ejected(node)
+
+        return self.primary, self.primary.acquire(core_deadline.get_remaining(deadline))
+
+    @contextmanager
+    def transact(
+        self,
+        deadline: t.Optional[float] = None,
+        read_only: bool = False,
+    ) -> t.Generator[t.Any, None, None]:
+        """
+
+        Context manager to create a database transaction.
+        deadline is the time.monotonic() time by which it must be done,
+        the ongoing core.deadline.DEADLINE by default, see deadline.
+        Transactions are admitted by limiter if set, see core.admission.
+        read_only transactions may run on a replica, see route.
+        """
+        if deadline is None:
+            deadline = core_deadline.DEADLINE.get()
+
+        if deadline is not None and core_deadline.get_remaining(deadline) <= 0:
+            raise TimeoutException("Deadline exceeded before the query.")
+
+        # admission control, waiting transactions are not connected.
+        with self.limiter.acquire() if self.limiter else nullcontext():
+            started = time.perf_counter()
+            DB_CONNECTIONS.inc()
+            try:
+                node, connection = self._acquire(self.route(read_only), deadline)
+                DB_ROUTED.inc(node=node.name)
+                callbacks = self._on_commit[id(connection)] = []
+                try:
+                    cursor = connection.cursor(cursor_factory=RealDictCursor)
+
+                    if deadline is None:
+                        yield cursor
+                        connection.commit()
+                    else:
+                        with self.deadline(connection, cursor, deadline):
+                            yield cursor
+                            connection.commit()
+                finally:
+                    del self._on_commit[id(connection)]
+                    node.release(connection)
+
+                if not read_only and self.read_your_writes:
+                    LAST_WRITE.set(time.monotonic())
+
+                for callback in callbacks:
+                    callback()
+            finally:
+                DB_CONNECTIONS.dec()
+                elapsed = time.perf_counter() - started
+                DB_TRANSACTIONS.observe(elapsed)
+                metrics.add_timing("db", elapsed)
+
+    def on_commit(self, cursor: t.Any, callback: t.Callable[[], None]) -> None:
+        """
+
+        Call callback once the transaction of cursor is committed,
+        dropped if it is rolled back, called right away for cursors
+        outside of transact, eg: autocommit.
+        """
+        callbacks = self._on_commit.get(id(cursor.connection))
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    @contextmanager
+    def deadline(
+        self,
+        connection: t.Any,
+        cursor: t.Any,
+        deadline: float,
+    ) -> t.Generator[None, None, None]:
+        """
+
+        Time out statements of the transaction at deadline: each statement
+        with a statement_timeout, and the statement running at deadline
+        is cancelled from the client, eg: past the timeout of statements
+        run before it. Cancelled statements raise TimeoutException.
+        """
+        try:
+            remaining = core_deadline.get_remaining(deadline)
+            if remaining <= 0:
+                raise TimeoutException("Deadline exceeded before the query.")
+
+            cursor.execute(
+                "SET LOCAL statement_timeout = %s",
+                (max(1, int(remaining * 1000)),),
+            )
+
+            entry = core_deadline.WATCHDOG.arm(deadline, connection.cancel)
+            try:
+                yield
+            finally:
+                core_deadline.WATCHDOG.disarm(entry)
+
+        except QueryCanceled as ex:
+            raise TimeoutException("Query exceeded its deadline.") from ex
+
     @contextmanager
-    def transact(self) -> t.Generator[t.Any, None, None]:
+    def autocommit(self) -> t.Generator[t.Any, None, None]:
         """
 
-        Context manager to create a database transaction
+        Context manager to execute statements outside of a transaction,
+        eg: CREATE INDEX CONCURRENTLY.
         """
         with closing(self.connection) as connection:
-            cursor = connection.cursor(cursor_factory=RealDictCursor)
-            yield cursor
-            connection.commit()
+            connection.autocommit = True
+            yield connection.cursor(cursor_factory=RealDictCursor)
 
     def execute(
         self,
@@ -78,6 +577,20 @@ class Database:
 
             return cursor
 
+    def close(self) -> None:
+        """
+
+        Close idle pooled connections.
+        """
+        for node in (self.primary, *self.replicas):
+            node.close()
+
+    def get_stats(self) -> t.Dict[str, t.Any]:
+        return {
+            "primary": self.primary.get_stats(),
+            "replicas": [_.get_stats() for _ in self.replicas],
+        }
+
     def table_exist(self, table_name: str) -> bool:
         query = "SELECT to_regclass(%s);"
         query_args = (table_name,)
@@ -89,6 +602,70 @@ class Database:
             return bool(result)
 
 
+@contextmanager
+def savepoint(cursor: cursor) -> t.Generator[None, None, None]:
+    """
+
+    Run statements of the block in a savepoint of the cursor transaction,
+    rolled back to it on error, for the transaction to go on.
+    """
+    cursor.execute("SAVEPOINT block")
+    try:
+        yield
+    except BaseException:
+        if not cursor.connection.closed:
+            cursor.execute("ROLLBACK TO SAVEPOINT block")
+        raise
+
+    cursor.execute("RELEASE SAVEPOINT block")
+
+
+@dataclass
+class Cache:
+    """
+
+    Model Meta.cache, the model table is cached whole in memory
+    by its managers, eg: for small and rarely changing tables.
+
+    lookups are fields indexed in memory for finds by their value.
+    ttl is the seconds a loaded table is served before reloading it.
+    generation, if given, gets a data generation of the database,
+    checked every check_interval seconds and reloading the table on change.
+    """
+
+    lookups: t.Tuple[str, ...] = ()
+    ttl: float = 300
+    generation: t.Optional[t.Callable[["Database"], int]] = None
+    check_interval: float = 5
+
+
+@dataclass
+class TableCache:
+    """
+
+    Rows of a cached table with their lookups indexes and hit counts.
+    """
+
+    rows: t.List[t.Any] = field(default_factory=list)
+    indexes: t.Dict[str, t.Dict[t.Any, t.List[t.Any]]] = field(default_factory=dict)
+    generation: t.Optional[int] = None
+    loaded_at: float = 0
+    checked_at: float = 0
+    hits: int = 0
+    misses: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get_stats(self) -> t.Dict[str, t.Any]:
+        lookups = self.hits + self.misses
+
+        return {
+            "rows": len(self.rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
 class ModelMeta(type):
     """
 
@@ -118,6 +695,15 @@ class Model(metaclass=ModelMeta):
         database = None
         fields_database_types = {}
         manager = None
+        # fields uniquely identifying a row, used for upserts.
+        natural_key = ()
+        # fields tuples to create secondary indexes on.
+        indexes = ()
+        # (field, interval) to range partition the table on,
+        # interval is one of PARTITION_INTERVALS.
+        partition_by = None
+        # Cache to serve finds from memory.
+        cache = None
 
     model_registry = OrderedDict()
 
@@ -127,14 +713,61 @@ class Model(metaclass=ModelMeta):
         Model.model_registry.setdefault(cls.__name__, cls)
 
     @classmethod
-    def manager(cls, database=None):
+    def manager(cls, database=None, table_name=None):
         _manager = getattr(cls.Meta, "manager")
         return (_manager or Manager)(
             database or cls.Meta.database,
             cls,
+            table_name=table_name,
         )
 
 
+# partition range intervals and their partition name suffix format.
+PARTITION_INTERVALS = {
+    "day": "%Y%m%d",
+    "month": "%Y%m",
+    "year": "%Y",
+}
+
+
+def to_date(value: t.Any) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+
+    if isinstance(value, datetime.date):
+        return value
+
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def partition_bounds(
+    value: t.Any,
+    interval: str,
+) -> t.Tuple[datetime.date, datetime.date]:
+    """
+
+    Get lower inclusive and upper exclusive dates
+    of the interval partition holding value.
+    """
+    date = to_date(value)
+
+    if interval == "day":
+        return date, date + datetime.timedelta(days=1)
+
+    if interval == "month":
+        start = date.replace(day=1)
+        if start.month == 12:
+            return start, start.replace(year=start.year + 1, month=1)
+
+        return start, start.replace(month=start.month + 1)
+
+    if interval == "year":
+        start = date.replace(month=1, day=1)
+        return start, start.replace(year=start.year + 1)
+
+    raise ValueError(f"Unexpected interval {interval}.")
+
+
 PYTHON_POSTGRES_TYPES_MAPPING = {
     None: ("NULL",),
     bool: ("bool",),
@@ -150,19 +783,112 @@ PYTHON_POSTGRES_TYPES_MAPPING = {
 }
 
 
+# coercions of values compared to fields of a type, see Manager._find_cached.
+LOOKUP_COERCIONS = {
+    int: int,
+    str: str,
+    float: float,
+    decimal.Decimal: decimal.Decimal,
+    datetime.date: to_date,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_model_types(model: t.Type[Model]) -> t.Dict[str, t.Any]:
+    """
+
+    Get model fields types, string annotations resolved.
+    """
+    fields = vars(model)["__dataclass_fields__"]
+    if not any(isinstance(_.type, str) for _ in fields.values()):
+        return {name: model_field.type for name, model_field in fields.items()}
+
+    type_hints = t.get_type_hints(model)
+
+    return {_: type_hints[_] for _ in fields}
+
+
+@functools.lru_cache(maxsize=None)
+def get_model_columns(model: t.Type[Model]) -> t.Tuple[str, ...]:
+    """
+
+    Get model fields columns creation expressions,
+    compiled on first use then cached.
+    """
+    custom_types = model.Meta.fields_database_types
+    fields = vars(model)["__dataclass_fields__"]
+
+    # string annotations are resolved in the model module namespace.
+    type_hints = None
+    if any(isinstance(_.type, str) for _ in fields.values()):
+        type_hints = t.get_type_hints(model)
+
+    columns = []
+    for field_name, model_field in fields.items():
+        if field_name in custom_types:
+            _type, *_type_arg = custom_types[field_name]
+        else:
+            field_type = type_hints[field_name] if type_hints else model_field.type
+            _type, *_type_arg = PYTHON_POSTGRES_TYPES_MAPPING[field_type]
+
+        if _type_arg:
+            _data_type = f"{_type}({iter_to_str(_type_arg)})"
+        else:
+            _data_type = f"{_type}"
+
+        if isinstance(model_field.default, _MISSING_TYPE):
+            default = "NOT NULL"
+        else:
+            adapted = adapt(model_field.default)
+            if hasattr(adapted, "encoding"):
+                adapted.encoding = "utf8"
+            default = f"DEFAULT {adapted.getquoted().decode()}"
+
+        columns.append(f"{field_name} {_data_type} {default}")
+
+    return tuple(columns)
+
+
 class Manager:
     """
 
     Orm driver.
     """
 
+    # partitions known to exist by table name, None for tables not
+    # partitioned despite their model partition_by, shared by managers
+    # as loaders get one per batch, see create_partitions.
+    known_partitions: t.Dict[str, t.Optional[t.Set[str]]] = {}
+
     def __init__(
         self,
         database: Database,
         model: t.Type[Model],
+        table_name: t.Optional[str] = None,
     ) -> None:
+        """
+
+        table_name overrides the model table, eg: for a staging table.
+        """
         self.database = database
         self.model = model
+        self.table_name = table_name
+
+    @contextmanager
+    def _transact(
+        self,
+        cursor: t.Optional[cursor] = None,
+    ) -> t.Generator[t.Any, None, None]:
+        """
+
+        Reuse cursor of an ongoing transaction if given
+        else create a new transaction.
+        """
+        if cursor is not None:
+            yield cursor
+        else:
+            with self.database.transact() as cursor:
+                yield cursor
 
     @classmethod
     def _where(cls, kwargs):
@@ -187,6 +913,9 @@ class Manager:
         return model
 
     def get_table_name(self) -> str:
+        if self.table_name:
+            return self.table_name
+
         return getattr(
             self.model.Meta,
             "table_name",
@@ -211,75 +940,218 @@ class Manager:
         Get related model fields and as a translated
         as database columns.
         """
-        cursor = self.database.connection.cursor()
-
-        def get_type_default_arg(field):
-            custom_types = self.model.Meta.fields_database_types
-
-            if field.name in custom_types:
-                typ, *arg = custom_types[field.name]
-            else:
-                try:
-                    typ, *arg = PYTHON_POSTGRES_TYPES_MAPPING[field.type]
-                except KeyError:
-                    typ, *arg = PYTHON_POSTGRES_TYPES_MAPPING[eval(field.type)]
+        return list(get_model_columns(self.model))
 
-            return typ, arg
+    def get_models_fields_names(self):
+        """
 
-        def get_default_value(field):
-            default = field.default
+        Get database columns creation expressions.
+        """
+        fields = self.get_model_fields()
 
-            if isinstance(default, _MISSING_TYPE):
-                return "NOT NULL"
+        return ", ".join(f"{_}" for _ in fields.keys())
 
-            return cursor.mogrify(
-                "DEFAULT %s",
-                (default,),
-            ).decode()
+    def get_natural_key(self) -> t.Tuple[str, ...]:
+        return tuple(getattr(self.model.Meta, "natural_key", ()))
 
-        columns = []
-        model_fields = self.get_model_fields().items()
+    def get_indexes(self) -> t.List[t.Tuple[str, bool, t.Tuple[str, ...]]]:
+        """
 
-        for field_name, field in model_fields:
-            _type, _type_arg = get_type_default_arg(field)
-            if _type_arg:
-                _data_type = f"{_type}({iter_to_str(_type_arg)})"
-            else:
-                _data_type = f"{_type}"
+        Get name, uniqueness and fields of the model indexes.
+        """
+        table_name = self.get_table_name()
+        indexes = []
 
-            default = get_default_value(field)
+        natural_key = self.get_natural_key()
+        if natural_key:
+            indexes.append(
+                (f"{table_name}_{'_'.join(natural_key)}_key", True, natural_key)
+            )
 
-            column = f"{field_name} {_data_type} {default}"
-            columns.append(column)
+        for fields in getattr(self.model.Meta, "indexes", ()):
+            indexes.append(
+                (f"{table_name}_{'_'.join(fields)}_idx", False, tuple(fields))
+            )
 
-        return columns
+        return indexes
 
-    def get_models_fields_names(self):
+    def get_indexes_expressions(self) -> t.List[str]:
         """
 
-        Get database columns creation expressions.
+        Get INDEX creation expressions.
         """
-        fields = self.get_model_fields()
+        table_name = self.get_table_name()
 
-        return ", ".join(f"{_}" for _ in fields.keys())
+        return [
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+            f"ON {table_name} ({iter_to_str(fields)})"
+            for name, unique, fields in self.get_indexes()
+        ]
 
     def get_pk_column(self) -> str:
         """
 
         Get PRIMARY KEY creation expression
         """
+        if self.get_partition_by():
+            # primary keys of partitioned tables must include the partition key.
+            return "id serial,"
+
         return "id serial PRIMARY KEY,"
 
-    def save(self, model) -> Model:
+    def get_partition_by(self) -> t.Optional[t.Tuple[str, str]]:
+        return getattr(self.model.Meta, "partition_by", None)
+
+    def get_partition_name(self, start: datetime.date) -> str:
+        _, interval = self.get_partition_by()
+        suffix = start.strftime(PARTITION_INTERVALS[interval])
+
+        return f"{self.get_table_name()}_{suffix}"
+
+    def get_partitions(self) -> t.Optional[t.Dict[str, datetime.date]]:
+        """
+
+        Get partitions names and lower bounds,
+        None if the table is not partitioned.
+        Partitions not named by get_partition_name are left out.
+        """
+        partition_by = self.get_partition_by()
+        if not partition_by:
+            return None
+
+        table_name = self.get_table_name()
+        name_format = PARTITION_INTERVALS[partition_by[1]]
+
+        with self.database.transact() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(%s)",
+                (table_name,),
+            )
+            if not cursor.fetchone():
+                return None
+
+            names = get_partitions_names(cursor, table_name)
+
+        partitions = {}
+        for name in names:
+            try:
+                partitions[name] = datetime.datetime.strptime(
+                    name[len(table_name) + 1 :],
+                    name_format,
+                ).date()
+            except ValueError:
+                continue
+
+        return partitions
+
+    def create_partitions(
+        self,
+        values: t.Iterable[t.Any],
+        *,
+        unlogged: bool = False,
+    ) -> None:
+        """
+
+        Create missing partitions holding values of the partition field.
+        Partitions are created in their own transaction,
+        serialized by an advisory lock between concurrent loaders.
+        Tables created before partitioning was declared are left as is,
+        a full reload migrates them.
+
+        unlogged creates UNLOGGED partitions, eg: for staging.
+        """
+        partition_by = self.get_partition_by()
+        if not partition_by:
+            return
+
+        _, interval = partition_by
+        bounds = {
+            partition_bounds(value, interval) for value in values if value is not None
+        }
+        partitions = {self.get_partition_name(_[0]): _ for _ in bounds}
+
+        table_name = self.get_table_name()
+        known = self.known_partitions.get(table_name, set())
+        if known is None:
+            return
+
+        if not partitions.keys() <= known:
+            existing = self.get_partitions()
+            if existing is None:
+                logging.warning(
+                    "%s is not partitioned, a full reload migrates it.",
+                    table_name,
+                )
+                self.known_partitions[table_name] = None
+                return
+
+            known = self.known_partitions[table_name] = set(existing)
+
+        missing = sorted(partitions.keys() - known)
+        if not missing:
+            return
+
+        table = "UNLOGGED TABLE" if unlogged else "TABLE"
+
+        with self.database.transact() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (table_name,))
+
+            for name in missing:
+                cursor.execute(
+                    f"CREATE {table} IF NOT EXISTS {name} "
+                    f"PARTITION OF {table_name} FOR VALUES FROM (%s) TO (%s)",
+                    partitions[name],
+                )
+
+        known.update(missing)
+
+    def drop_partitions(self, before: t.Any) -> t.List[str]:
+        """
+
+        Drop partitions whose rows are all dated before, for retention.
+        Returns dropped partitions names.
+        """
+        partition_by = self.get_partition_by()
+        partitions = self.get_partitions()
+        if not partitions:
+            return []
+
+        before = to_date(before)
+        dropped = sorted(
+            name
+            for name, start in partitions.items()
+            if partition_bounds(start, partition_by[1])[1] <= before
+        )
+
+        with self.database.transact() as cursor:
+            for name in dropped:
+                cursor.execute(f"DROP TABLE {name}")
+
+        known = self.known_partitions.get(self.get_table_name())
+        if known is not None:
+            known.difference_update(dropped)
+
+        return dropped
+
+    def _create_models_partitions(self, models: t.Iterable[Model]) -> None:
+        partition_by = self.get_partition_by()
+        if partition_by:
+            self.create_partitions(getattr(_, partition_by[0]) for _ in models)
+
+    def save(self, model, cursor: t.Optional[cursor] = None) -> Model:
         """
 
         Insert into DB.
+        If cursor is given insert is done in its transaction.
         """
         model_data = model.__dict__
 
         if model_data.get("id") is not None:
             raise ValueError("object already exist")
 
+        self._create_models_partitions((model,))
+
         model_values = list(model.__dict__.values())
         model_values_placeholder = ", ".join(_ for _ in ("%s",) * len(model_values))
 
@@ -290,12 +1162,162 @@ class Manager:
             "RETURNING id;"
         )
 
-        with self.database.transact() as cursor:
+        with self._transact(cursor) as cursor:
             cursor.execute(query, model_values)
             model.id = cursor.fetchone()["id"]
+            self.database.on_commit(cursor, self.invalidate_cache)
 
         return model
 
+    def update(self, model, cursor: t.Optional[cursor] = None) -> Model:
+        """
+
+        Update saved model in DB.
+        If cursor is given update is done in its transaction.
+        """
+        if getattr(model, "id", None) is None:
+            raise ValueError("object does not exist")
+
+        fields = self.get_model_fields().keys()
+        model_values = [getattr(model, _) for _ in fields]
+        set_clause = ", ".join(f"{_}=%s" for _ in fields)
+
+        query = f"UPDATE {self.get_table_name()} SET {set_clause} WHERE id=%s;"
+
+        with self._transact(cursor) as cursor:
+            cursor.execute(query, (*model_values, model.id))
+            self.database.on_commit(cursor, self.invalidate_cache)
+
+        return model
+
+    def upsert_many(
+        self,
+        models: t.List[Model],
+        cursor: t.Optional[cursor] = None,
+        *,
+        keep: t.Iterable[str] = (),
+    ) -> None:
+        """
+
+        Bulk insert into DB, rows with an existing natural key are updated.
+        Within models, the last one of a natural key wins.
+        If cursor is given upsert is done in its transaction.
+        keep fields are left as they are on updated rows.
+        """
+        natural_key = self.get_natural_key()
+        if not natural_key:
+            raise ValueError(f"{self.model.__name__} has no natural key")
+
+        fields = list(self.get_model_fields().keys())
+        key_getter = operator.attrgetter(*natural_key)
+
+        rows = {}
+        for model in models:
+            rows[key_getter(model)] = [getattr(model, _) for _ in fields]
+
+        if not rows:
+            return
+
+        self._create_models_partitions(models)
+
+        updates = [_ for _ in fields if _ not in natural_key and _ not in keep]
+        if updates:
+            set_clause = ", ".join(f"{_}=EXCLUDED.{_}" for _ in updates)
+            conflict_action = f"DO UPDATE SET {set_clause}"
+        else:
+            conflict_action = "DO NOTHING"
+
+        query = (
+            f"INSERT INTO {self.get_table_name()} "
+            f"({self.get_models_fields_names()}) VALUES %s "
+            f"ON CONFLICT ({iter_to_str(natural_key)}) {conflict_action}"
+        )
+
+        with self._transact(cursor) as cursor:
+            execute_values(cursor, query, list(rows.values()), page_size=len(rows))
+            self.database.on_commit(cursor, self.invalidate_cache)
+
+    def copy_many(
+        self,
+        models: t.List[Model],
+        cursor: t.Optional[cursor] = None,
+    ) -> None:
+        """
+
+        Bulk insert into DB with COPY.
+        If cursor is given copy is done in its transaction.
+        """
+        self._create_models_partitions(models)
+
+        fields = list(self.get_model_fields().keys())
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [getattr(model, _) for _ in fields] for model in models
+        )
+        buffer.seek(0)
+
+        self.copy_from(buffer, fields, cursor=cursor)
+
+    def copy_from(
+        self,
+        file: t.IO,
+        columns: t.List[str],
+        cursor: t.Optional[cursor] = None,
+    ) -> None:
+        """
+
+        Bulk insert csv formatted file, without header, with COPY.
+        If cursor is given copy is done in its transaction.
+        Partitions of the rows must exist, see create_partitions.
+        """
+        query = (
+            f"COPY {self.get_table_name()} ({iter_to_str(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+
+        with self._transact(cursor) as cursor:
+            cursor.copy_expert(query, file)
+            self.database.on_commit(cursor, self.invalidate_cache)
+
+    def delete_duplicates(self, cursor: t.Optional[cursor] = None) -> None:
+        """
+
+        Delete rows sharing a natural key, keeping the last inserted.
+        """
+        natural_key = self.get_natural_key()
+        if not natural_key:
+            return
+
+        table_name = self.get_table_name()
+        same_key = " AND ".join(f"a.{_}=b.{_}" for _ in natural_key)
+
+        query = (
+            f"DELETE FROM {table_name} a USING {table_name} b "
+            f"WHERE {same_key} AND a.id < b.id"
+        )
+
+        with self._transact(cursor) as cursor:
+            cursor.execute(query)
+
+    def values_list(self, *fields: str, **kwargs) -> t.List[t.Tuple]:
+        """
+
+        Fetch fields values of items in database table, as tuples.
+        Keyword arguments are converted into a where query clause.
+        """
+        where_clause, where_args = self._where(kwargs)
+
+        with self.database.transact(read_only=True) as cursor:
+            query = (
+                f"SELECT {iter_to_str(fields)} "
+                f"FROM {self.get_table_name()} {where_clause}"
+            )
+
+            cursor.execute(query, where_args)
+
+            return [tuple(_[f] for f in fields) for _ in cursor.fetchall()]
+
     def get(self, **kwargs) -> t.Optional[Model]:
         """
 
@@ -311,11 +1333,15 @@ class Manager:
 
         Fetch first one item in database table.
         Keyword arguments are converted into a where query clause.
+        Cached models are found in memory, see Cache, and are shared
+        between finds so must not be modified.
         """
+        if self.get_cache():
+            return self._find_cached(**kwargs)
 
         where_clause, where_args = self._where(kwargs)
 
-        with self.database.transact() as cursor:
+        with self.database.transact(read_only=True) as cursor:
             query = f"SELECT * FROM {self.get_table_name()} {where_clause}"
 
             cursor.execute(query, where_args)
@@ -323,6 +1349,135 @@ class Manager:
 
             return [self._modelize(**r) for r in results]
 
+    def get_cache(self) -> t.Optional[Cache]:
+        return getattr(self.model.Meta, "cache", None)
+
+    def get_table_cache(self) -> TableCache:
+        """
+
+        Get table cache, loaded or reloaded if stale.
+        While a table is reloaded, other threads are served its previous rows.
+        """
+        cache = self.get_cache()
+        table_name = self.get_table_name()
+        table_cache = self.database.caches.setdefault(table_name, TableCache())
+
+        now = time.monotonic()
+        stale = not table_cache.loaded_at or now - table_cache.loaded_at > cache.ttl
+
+        if (
+            not stale
+            and cache.generation
+            and (now - table_cache.checked_at > cache.check_interval)
+        ):
+            table_cache.checked_at = now
+            try:
+                stale = cache.generation(self.database) != table_cache.generation
+            except Error as ex:
+                logging.warning("%s generation check failed: %r", table_name, ex)
+
+        if not stale:
+            table_cache.hits += 1
+            return table_cache
+
+        table_cache.misses += 1
+
+        loaded_at = table_cache.loaded_at
+        if not table_cache.lock.acquire(blocking=not loaded_at):
+            return table_cache
+
+        try:
+            # loaded by another thread while waiting for the lock.
+            if table_cache.loaded_at == loaded_at:
+                self._load_table_cache(table_cache)
+        finally:
+            table_cache.lock.release()
+
+        return table_cache
+
+    def is_cache_current(self) -> bool:
+        """
+
+        Check if the table cache is loaded, within its ttl and generation
+        check interval, so finds are served without querying the database.
+        """
+        cache = self.get_cache()
+        table_cache = self.database.caches.get(self.get_table_name())
+        if table_cache is None or not table_cache.loaded_at:
+            return False
+
+        now = time.monotonic()
+
+        return now - table_cache.loaded_at <= cache.ttl and not (
+            cache.generation and now - table_cache.checked_at > cache.check_interval
+        )
+
+    def _load_table_cache(self, table_cache: TableCache) -> None:
+        cache = self.get_cache()
+
+        generation = None
+        if cache.generation:
+            try:
+                generation = cache.generation(self.database)
+            except Error as ex:
+                logging.warning("%r generation failed: %r", self.model, ex)
+
+        with self.database.transact(read_only=True) as cursor:
+            cursor.execute(f"SELECT * FROM {self.get_table_name()}")
+            rows = [self._modelize(**r) for r in cursor.fetchall()]
+
+        indexes = {_: {} for _ in cache.lookups}
+        for row in rows:
+            for lookup, index in indexes.items():
+                index.setdefault(getattr(row, lookup), []).append(row)
+
+        # swapped together, readers see either table.
+        table_cache.rows, table_cache.indexes = rows, indexes
+        table_cache.generation = generation
+        table_cache.loaded_at = table_cache.checked_at = time.monotonic()
+
+    def _find_cached(self, **kwargs) -> t.List[Model]:
+        """
+
+        Find in the table cache, lookups values are coerced to their field
+        type as the database would, eg: "1" matches 1 of an int field.
+        """
+        types = get_model_types(self.model)
+        for name, value in kwargs.items():
+            coerce = LOOKUP_COERCIONS.get(types.get(name))
+            if coerce and value is not None and not isinstance(value, types[name]):
+                kwargs[name] = coerce(value)
+
+        table_cache = self.get_table_cache()
+        rows, indexes = table_cache.rows, table_cache.indexes
+
+        lookup = next((_ for _ in kwargs if _ in indexes), None)
+        if lookup is not None:
+            rows = indexes[lookup].get(kwargs.pop(lookup), [])
+
+        return [
+            row for row in rows if all(getattr(row, k) == v for k, v in kwargs.items())
+        ]
+
+    def get_cache_stats(self) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+
+        Get rows count, hits, misses and hit rate of the table cache.
+        """
+        table_cache = self.database.caches.get(self.get_table_name())
+
+        return table_cache and table_cache.get_stats()
+
+    def invalidate_cache(self) -> None:
+        """
+
+        Reload cached table on next find, eg: after a write is committed,
+        see Database.on_commit.
+        """
+        table_cache = self.database.caches.get(self.get_table_name())
+        if table_cache is not None:
+            table_cache.loaded_at = 0
+
     def query(
         self,
         query: str,
@@ -330,25 +1485,388 @@ class Manager:
     ):
         """
 
-        Execute a query.
+        Execute a read only query, see Database.route.
         """
-        with self.database.transact() as cursor:
+        with self.database.transact(read_only=True) as cursor:
             cursor.execute(query, args)
             results = cursor.fetchall()
 
             return [self._modelize(**r) for r in results]
 
+    def query_rows(
+        self,
+        query: str,
+        args: t.Union[t.Dict[str, str], t.List[str], None] = None,
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+
+        Execute a read only query, returns rows as dicts, eg: of joins.
+        """
+        with self.database.transact(read_only=True) as cursor:
+            cursor.execute(query, args)
 
-def create_table(database: Database, model: t.Type[Model]) -> None:
+            return cursor.fetchall()
+
+
+def create_table(
+    database: Database,
+    model: t.Type[Model],
+    *,
+    table_name: t.Optional[str] = None,
+    unlogged: bool = False,
+    indexes: bool = True,
+) -> None:
     """
 
     Create schema table.
+    Model fields missing from an existing table are added as columns.
+
+    table_name creates a shadow table of model, eg: for staging.
+    unlogged creates an UNLOGGED table, skipping WAL writes.
+    indexes set to False skips creating the model indexes.
+
+    Models with a Meta.partition_by get a range partitioned table,
+    partitions are created on write, see Manager.create_partitions.
+    An existing unpartitioned table is kept, a full reload rebuilds it.
+    Partitioned tables can not be unlogged, their partitions are.
     """
-    manager = Manager(database, model)
+    manager = Manager(database, model, table_name=table_name)
 
     table_name = manager.get_table_name()
+    Manager.known_partitions.pop(table_name, None)
     pk_column = manager.get_pk_column()
-    columns = ", ".join(manager.get_model_columns())
+    model_columns = manager.get_model_columns()
+    columns = ", ".join(model_columns)
+    table = "UNLOGGED TABLE" if unlogged else "TABLE"
+    partition_clause = ""
+
+    partition_by = manager.get_partition_by()
+    if partition_by:
+        partition_field, interval = partition_by
+        if interval not in PARTITION_INTERVALS:
+            raise ValueError(f"Unexpected interval {interval}.")
+
+        natural_key = manager.get_natural_key()
+        if natural_key and partition_field not in natural_key:
+            raise ValueError(
+                f"{model.__name__} natural key must include {partition_field}."
+            )
+
+        table = "TABLE"
+        partition_clause = f" PARTITION BY RANGE ({partition_field})"
+
+    query = (
+        f"CREATE {table} IF NOT EXISTS {table_name} "
+        f"({pk_column} {columns}){partition_clause}"
+    )
+
+    with database.transact() as cursor:
+        cursor.execute(query)
+
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = %s",
+            (table_name,),
+        )
+        table_columns = {_["column_name"] for _ in cursor.fetchall()}
+
+        missing_columns = [
+            column
+            for field_name, column in zip(manager.get_model_fields(), model_columns)
+            if field_name not in table_columns
+        ]
+        if missing_columns:
+            add_columns = ", ".join(f"ADD COLUMN {_}" for _ in missing_columns)
+            cursor.execute(f"ALTER TABLE {table_name} {add_columns}")
+
+        if indexes:
+            delete_key_duplicates(manager, cursor)
+            for index_expression in manager.get_indexes_expressions():
+                cursor.execute(index_expression)
+
+
+# table of the schema version marker, see write_schema_version.
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+def get_schema_version(models: t.Iterable[t.Type[Model]]) -> str:
+    """
+
+    Get version of models tables definitions,
+    changing with their columns, indexes or partitioning.
+    """
+    digest = hashlib.sha1()
+
+    for model in models:
+        manager = Manager(None, model)
+        definition = (
+            manager.get_table_name(),
+            manager.get_pk_column(),
+            get_model_columns(model),
+            manager.get_indexes(),
+            manager.get_partition_by(),
+        )
+        digest.update(repr(definition).encode())
+
+    return digest.hexdigest()
+
+
+def read_schema_version(database: Database) -> t.Optional[str]:
+    """
+
+    Get schema version marker, None if never written.
+    """
+    with database.transact() as cursor:
+        cursor.execute("SELECT to_regclass(%s) AS name", (SCHEMA_VERSION_TABLE,))
+        if cursor.fetchone()["name"] is None:
+            return None
+
+        cursor.execute(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")
+        row = cursor.fetchone()
 
-    query = f"CREATE TABLE IF NOT EXISTS {table_name} ({pk_column} {columns})"
-    database.execute(query)
+        return row and row["version"]
+
+
+def write_schema_version(database: Database, version: str) -> None:
+    """
+
+    Write schema version marker, eg: once tables of version are created.
+    """
+    with database.transact() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} "
+            "(version varchar(40) NOT NULL)"
+        )
+        cursor.execute(f"LOCK TABLE {SCHEMA_VERSION_TABLE}")
+        cursor.execute(f"DELETE FROM {SCHEMA_VERSION_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SCHEMA_VERSION_TABLE} VALUES (%s)",
+            (version,),
+        )
+
+
+def validate_schema(
+    database: Database,
+    models: t.Iterable[t.Type[Model]],
+) -> t.List[str]:
+    """
+
+    Check models tables and columns exist with one catalog query,
+    returns the missing ones.
+    """
+    tables = {}
+    for model in models:
+        manager = Manager(None, model)
+        tables[manager.get_table_name()] = ["id", *manager.get_model_fields()]
+
+    with database.transact() as cursor:
+        cursor.execute(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = ANY(%s)",
+            (list(tables),),
+        )
+        table_columns: t.Dict[str, t.Set[str]] = {}
+        for row in cursor.fetchall():
+            table_columns.setdefault(row["table_name"], set()).add(row["column_name"])
+
+    missing = []
+    for table_name, columns in tables.items():
+        if table_name not in table_columns:
+            missing.append(table_name)
+            continue
+
+        missing.extend(
+            f"{table_name}.{_}" for _ in columns if _ not in table_columns[table_name]
+        )
+
+    return missing
+
+
+def create_indexes(
+    database: Database,
+    model: t.Type[Model],
+    *,
+    table_name: t.Optional[str] = None,
+    concurrently: bool = False,
+) -> None:
+    """
+
+    Create model indexes, eg: after a bulk load.
+
+    concurrently builds indexes without blocking writes, one statement
+    at a time. Indexes of partitioned tables are built on each partition
+    and attached to an index created ON ONLY the partitioned table.
+    Invalid indexes left by an interrupted build are rebuilt.
+    """
+    manager = Manager(database, model, table_name=table_name)
+
+    if not concurrently:
+        with database.transact() as cursor:
+            delete_key_duplicates(manager, cursor)
+            for index_expression in manager.get_indexes_expressions():
+                cursor.execute(index_expression)
+
+        return
+
+    table_name = manager.get_table_name()
+
+    with database.autocommit() as cursor:
+        delete_key_duplicates(manager, cursor)
+        partitions = get_partitions_names(cursor, table_name)
+
+        for name, unique, fields in manager.get_indexes():
+            columns = iter_to_str(fields)
+            unique = "UNIQUE " if unique else ""
+
+            valid = get_index_validity(cursor, name)
+            if valid:
+                continue
+
+            if not manager.get_partition_by():
+                if valid is not None:
+                    cursor.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+                cursor.execute(
+                    f"CREATE {unique}INDEX CONCURRENTLY {name} "
+                    f"ON {table_name} ({columns})"
+                )
+                continue
+
+            cursor.execute(
+                f"CREATE {unique}INDEX IF NOT EXISTS {name} "
+                f"ON ONLY {table_name} ({columns})"
+            )
+            for partition_name in partitions:
+                partition_index_name = partition_name + name[len(table_name) :]
+
+                if get_index_validity(cursor, partition_index_name) is False:
+                    cursor.execute(f"DROP INDEX CONCURRENTLY {partition_index_name}")
+
+                cursor.execute(
+                    f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS "
+                    f"{partition_index_name} ON {partition_name} ({columns})"
+                )
+                cursor.execute(
+                    f"ALTER INDEX {name} ATTACH PARTITION {partition_index_name}"
+                )
+
+
+def drop_indexes(
+    database: Database,
+    model: t.Type[Model],
+    *,
+    table_name: t.Optional[str] = None,
+) -> t.List[str]:
+    """
+
+    Drop model secondary indexes, eg: before a bulk load.
+    The natural key index is kept for upserts.
+    Returns dropped indexes names.
+    """
+    manager = Manager(database, model, table_name=table_name)
+    names = [name for name, unique, _ in manager.get_indexes() if not unique]
+
+    with database.transact() as cursor:
+        for name in names:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+    return names
+
+
+def delete_key_duplicates(manager: Manager, cursor: cursor) -> None:
+    """
+
+    Delete natural key duplicates, keeping the last inserted,
+    when its unique index is not built yet, eg: in a table
+    loaded repeatedly before the natural key was declared.
+    """
+    natural_key_indexes = [name for name, unique, _ in manager.get_indexes() if unique]
+    if not natural_key_indexes:
+        return
+
+    if get_index_validity(cursor, natural_key_indexes[0]) is not None:
+        return
+
+    manager.delete_duplicates(cursor)
+    if cursor.rowcount > 0:
+        logging.warning(
+            "%s natural key duplicates deleted: %s.",
+            manager.get_table_name(),
+            cursor.rowcount,
+        )
+
+
+def get_index_validity(cursor: cursor, index_name: str) -> t.Optional[bool]:
+    """
+
+    Get whether index is valid, None if it does not exist.
+    """
+    cursor.execute(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+        (index_name,),
+    )
+    result = cursor.fetchone()
+
+    return None if result is None else result["indisvalid"]
+
+
+def get_partitions_names(cursor: cursor, table_name: str) -> t.List[str]:
+    cursor.execute(
+        "SELECT inhrelid::regclass::text AS name FROM pg_inherits "
+        "WHERE inhparent = to_regclass(%s) ORDER BY 1",
+        (table_name,),
+    )
+
+    return [_["name"] for _ in cursor.fetchall()]
+
+
+def swap_tables(
+    database: Database,
+    tables: t.Dict[str, str],
+    cursor: t.Optional[cursor] = None,
+) -> None:
+    """
+
+    Replace live tables by their shadow table in a single transaction.
+    tables maps a live table name to its shadow table name,
+    shadow partitions, indexes and id sequence are renamed
+    after the live table.
+    """
+    with nullcontext(cursor) if cursor else database.transact() as cursor:
+        for live_name, shadow_name in tables.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {live_name}")
+            cursor.execute(f"ALTER TABLE {shadow_name} RENAME TO {live_name}")
+            database.caches.pop(live_name, None)
+            Manager.known_partitions.pop(live_name, None)
+            Manager.known_partitions.pop(shadow_name, None)
+
+            renamed_tables = [live_name]
+            for partition_name in get_partitions_names(cursor, live_name):
+                if partition_name.startswith(shadow_name):
+                    new_partition_name = live_name + partition_name[len(shadow_name) :]
+                    cursor.execute(
+                        f"ALTER TABLE {partition_name} "
+                        f"RENAME TO {new_partition_name}"
+                    )
+                    renamed_tables.append(new_partition_name)
+
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = ANY(%s)",
+                (renamed_tables,),
+            )
+            for index_name in [_["indexname"] for _ in cursor.fetchall()]:
+                if index_name.startswith(shadow_name):
+                    new_index_name = live_name + index_name[len(shadow_name) :]
+                    cursor.execute(
+                        f"ALTER INDEX {index_name} RENAME TO {new_index_name}"
+                    )
+
+            cursor.execute(
+                "SELECT pg_get_serial_sequence(%s, 'id') AS sequence_name",
+                (live_name,),
+            )
+            sequence_name = cursor.fetchone()["sequence_name"]
+            if sequence_name:
+                cursor.execute(
+                    f"ALTER SEQUENCE {sequence_name} RENAME TO {live_name}_id_seq"
+                )
@@ -1,36 +1,209 @@
 import typing as t
 
+import io
+import os
 import sys
+import bz2
+import gzip
+import lzma
+import zlib
 import logging
 
 
+# read buffer size for files and decompression streams.
+BUFFER_SIZE = 1024 * 1024
+
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".lzma": "xz",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+PLAIN_EXTENSIONS = (".csv", ".txt")
+
+COLUMNAR_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+# rows per record batch read from columnar files.
+COLUMNAR_BATCH_SIZE = 64 * 1024
+
+COMPRESSION_MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+def get_compression(filename: str) -> t.Optional[str]:
+    """
+
+    Detect file compression from its extension,
+    or its magic bytes for unknown extensions.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension in COMPRESSION_EXTENSIONS:
+        return COMPRESSION_EXTENSIONS[extension]
+
+    if extension in PLAIN_EXTENSIONS:
+        return None
+
+    try:
+        with open(filename, "rb") as file:
+            magic = file.read(6)
+    except OSError:
+        return None
+
+    for magic_bytes, compression in COMPRESSION_MAGIC_BYTES:
+        if magic.startswith(magic_bytes):
+            return compression
+
+    return None
+
+
+def get_columnar_format(filename: str) -> t.Optional[str]:
+    extension = os.path.splitext(filename)[1].lower()
+
+    return COLUMNAR_EXTENSIONS.get(extension)
+
+
+def import_pyarrow() -> t.Any:
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as ex:
+        raise ImportError("pyarrow is required to read columnar files") from ex
+
+    return pyarrow
+
+
+def open_binary(filename: str) -> t.BinaryIO:
+    """
+
+    Open file as a stream of decompressed bytes.
+    """
+    compression = get_compression(filename)
+    file = open(filename, "rb", buffering=BUFFER_SIZE)
+
+    if compression is None:
+        return file
+
+    if compression == "gzip":
+        stream = gzip.GzipFile(fileobj=file)
+    elif compression == "bz2":
+        stream = bz2.BZ2File(file)
+    elif compression == "xz":
+        stream = lzma.LZMAFile(file)
+    else:
+        try:
+            import zstandard
+        except ImportError as ex:
+            file.close()
+            raise ImportError(f"zstandard is required to read {filename}") from ex
+
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            file,
+            read_size=BUFFER_SIZE,
+            closefd=True,
+        )
+
+    return io.BufferedReader(stream, buffer_size=BUFFER_SIZE)
+
+
 class CSVLoader:
     """
 
     Service for loading large csv files
     """
 
-    def __init__(self, filename: str, /) -> None:
+    encoding = "utf-8"
+
+    def __init__(
+        self,
+        filename: str,
+        /,
+        offset: int = 0,
+        end: t.Optional[int] = None,
+    ) -> None:
         """
 
         filename as the path to the file.
+        offset is the byte position to resume reading rows from,
+        the header line is always read first.
+        end is the byte position to stop reading rows at,
+        offset and end must be at the start of a line.
         """
         self.filename = filename
+        self.offset = offset
+        self.end = end
+
+        # byte position right after the last line yielded.
+        self.position = 0
 
     def readfile(self) -> t.Iterator[str]:
         """
 
         stream file data
         """
-        file = open(self.filename, "r")
+        if get_compression(self.filename) is None:
+            file = open(
+                self.filename,
+                "r",
+                encoding=self.encoding,
+                newline="",
+                buffering=BUFFER_SIZE,
+            )
+        else:
+            file = io.TextIOWrapper(
+                open_binary(self.filename),
+                encoding=self.encoding,
+                newline="",
+            )
 
         line = file.readline()
         while line:
+            self.position += len(line.encode(self.encoding))
             yield line.strip()
+
+            if self.offset > self.position:
+                self.skip(file, self.offset)
+
+            if self.end is not None and self.position >= self.end:
+                break
+
             line = file.readline()
 
         file.close()
 
+    def skip(self, file: t.TextIO, offset: int) -> None:
+        """
+
+        Move file to byte offset, decompression streams are read through.
+        """
+        if file.seekable():
+            file.seek(offset)
+            self.position = offset
+            return
+
+        while self.position < offset:
+            line = file.readline()
+            if not line:
+                break
+
+            self.position += len(line.encode(self.encoding))
+
     @property
     def data(self) -> t.Tuple[t.List[t.Any], t.Iterator[t.List[t.Any]]]:
         """
@@ -53,12 +226,25 @@ class CSVLoader:
 
 
 class CSVFrame:
-    def __init__(self, filename: str) -> None:
+    def __init__(
+        self,
+        filename: str,
+        offset: int = 0,
+        end: t.Optional[int] = None,
+    ) -> None:
         self.filename = filename
 
-        self.loader = CSVLoader(self.filename)
+        self.loader = CSVLoader(self.filename, offset=offset, end=end)
         self.headers, self.data = self.loader.data
 
+    @property
+    def position(self) -> int:
+        """
+
+        Byte position in file after the last row returned.
+        """
+        return self.loader.position
+
     def __iter__(self):
         return self
 
@@ -69,3 +255,277 @@ class CSVFrame:
         except FileNotFoundError as ex:
             logging.error("File %s does not exist.", self.filename)
             raise ex
+
+
+def read_segments(filename: str) -> t.Iterator[t.Tuple[int, int, int, t.Callable]]:
+    """
+
+    Iterate parquet row groups or arrow record batches as
+    first row number, number of rows, size in bytes and a reader.
+    """
+    pyarrow = import_pyarrow()
+    first_row = 0
+
+    if get_columnar_format(filename) == "parquet":
+        file = pyarrow.parquet.ParquetFile(filename)
+
+        for index in range(file.num_row_groups):
+            metadata = file.metadata.row_group(index)
+
+            yield (
+                first_row,
+                metadata.num_rows,
+                metadata.total_byte_size,
+                lambda index=index, columns=None: file.read_row_group(
+                    index,
+                    columns=columns,
+                ),
+            )
+            first_row += metadata.num_rows
+
+        return
+
+    # memory map is left open as record batches point into it.
+    reader = pyarrow.ipc.open_file(pyarrow.memory_map(filename))
+
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+
+        yield (
+            first_row,
+            batch.num_rows,
+            batch.nbytes,
+            lambda batch=batch, columns=None: pyarrow.Table.from_batches(
+                [batch.select(columns) if columns else batch]
+            ),
+        )
+        first_row += batch.num_rows
+
+
+class ColumnarFrame:
+    """
+
+    Parquet or Arrow IPC file with the interface of CSVFrame.
+    Positions are row numbers instead of byte positions.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        offset: int = 0,
+        end: t.Optional[int] = None,
+        columns: t.Optional[t.List[str]] = None,
+    ) -> None:
+        """
+
+        offset and end are the row numbers to read rows from and to.
+        columns projects the file columns, missing ones are ignored.
+        """
+        self.filename = filename
+        self.offset = offset
+        self.end = end
+
+        # row number after the last row returned.
+        self.position = offset
+
+        names = self.schema().names
+        if columns:
+            self.headers = [_ for _ in columns if _ in names]
+        else:
+            self.headers = names
+
+        self.data = self.rows()
+
+    def schema(self) -> t.Any:
+        pyarrow = import_pyarrow()
+
+        if get_columnar_format(self.filename) == "parquet":
+            return pyarrow.parquet.read_schema(self.filename)
+
+        return pyarrow.ipc.open_file(pyarrow.memory_map(self.filename)).schema
+
+    def batches(
+        self,
+        batch_size: int = COLUMNAR_BATCH_SIZE,
+    ) -> t.Iterator[t.Any]:
+        """
+
+        Iterate projected rows as pyarrow record batches, without copying.
+        """
+        for first_row, num_rows, _, read in read_segments(self.filename):
+            if first_row + num_rows <= self.position:
+                continue
+
+            if self.end is not None and first_row >= self.end:
+                break
+
+            start = self.position - first_row
+            stop = num_rows if self.end is None else min(num_rows, self.end - first_row)
+
+            data = read(columns=self.headers).slice(start, stop - start)
+            for batch in data.to_batches(max_chunksize=batch_size):
+                self.position += batch.num_rows
+                yield batch
+
+    def rows(self) -> t.Iterator[t.List[t.Any]]:
+        for batch in self.batches():
+            position = self.position - batch.num_rows
+
+            for row in zip(*(_.to_pylist() for _ in batch.columns)):
+                position += 1
+                self.position = position
+                yield list(row)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.data)
+
+    @classmethod
+    def split(cls, filename: str, chunk_size: int) -> t.List[t.Tuple[int, int]]:
+        """
+
+        Split file rows into row ranges of about chunk_size bytes,
+        each range is a whole number of row groups or record batches.
+        """
+        ranges = []
+        start = end = size = 0
+
+        for first_row, num_rows, nbytes, _ in read_segments(filename):
+            end = first_row + num_rows
+            size += nbytes
+
+            if size >= chunk_size:
+                ranges.append((start, end))
+                start, size = end, 0
+
+        if start < end:
+            ranges.append((start, end))
+
+        return ranges
+
+    @staticmethod
+    def to_csv(batch: t.Any) -> io.BytesIO:
+        """
+
+        Encode record batch as csv, without header, for COPY.
+        """
+        pyarrow = import_pyarrow()
+
+        buffer = io.BytesIO()
+        pyarrow.csv.write_csv(
+            batch,
+            buffer,
+            write_options=pyarrow.csv.WriteOptions(include_header=False),
+        )
+        buffer.seek(0)
+
+        return buffer
+
+
+def open_frame(
+    filename: str,
+    offset: int = 0,
+    end: t.Optional[int] = None,
+    columns: t.Optional[t.List[str]] = None,
+) -> t.Union[CSVFrame, ColumnarFrame]:
+    """
+
+    Open csv or columnar file frame, columns only projects columnar files.
+    """
+    if get_columnar_format(filename):
+        return ColumnarFrame(filename, offset=offset, end=end, columns=columns)
+
+    return CSVFrame(filename, offset=offset, end=end)
+
+
+def split(filename: str, chunk_size: int) -> t.List[t.Tuple[int, int]]:
+    """
+
+    Split csv file rows into byte ranges of about chunk_size,
+    each range starts and ends on a line boundary.
+    Columnar files are split into row ranges, see ColumnarFrame.split.
+    """
+    if get_columnar_format(filename):
+        return ColumnarFrame.split(filename, chunk_size)
+
+    with open(filename, "rb") as file:
+        file.readline()
+        start = file.tell()
+
+        file.seek(0, 2)
+        size = file.tell()
+
+        ranges = []
+        while start < size:
+            file.seek(start + chunk_size)
+            file.readline()
+            end = min(file.tell(), size)
+
+            ranges.append((start, end))
+            start = end
+
+    return ranges
+
+
+def get_decompressor(compression: str) -> t.Any:
+    """
+
+    Get an incremental decompressor with a decompress method.
+    """
+    if compression == "gzip":
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+
+    if compression == "xz":
+        return lzma.LZMADecompressor()
+
+    try:
+        import zstandard
+    except ImportError as ex:
+        raise ImportError("zstandard is required to read zstd files") from ex
+
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def estimate_rows(filename: str, start: int = 0, end: t.Optional[int] = None) -> int:
+    """
+
+    Estimate rows of a file range, see split,
+    from the line length of its first BUFFER_SIZE bytes.
+    Compressed files are estimated from their compression ratio.
+    Columnar files row count is read from their metadata.
+    """
+    if get_columnar_format(filename):
+        if end is not None:
+            return end - start
+
+        return sum(_[1] for _ in read_segments(filename))
+
+    size = os.path.getsize(filename)
+    end = size if end is None else end
+    compression = get_compression(filename)
+
+    with open(filename, "rb") as file:
+        file.seek(start)
+        sample = file.read(min(BUFFER_SIZE, end - start))
+
+    if not sample:
+        return 0
+
+    sample_size = len(sample)
+    if compression:
+        try:
+            sample = get_decompressor(compression).decompress(sample)
+        except (OSError, EOFError, ValueError, zlib.error, lzma.LZMAError):
+            return 0
+
+    lines = sample.count(b"\n")
+    if start == 0:
+        # header line.
+        lines -= 1
+
+    return max(lines, 0) * (end - start) // sample_size
@@ -0,0 +1,114 @@
+import typing as t
+
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+import contextvars
+
+# time.monotonic() time by which the ongoing work must be done,
+# eg: set by the app for each request.
+DEADLINE: contextvars.ContextVar[t.Optional[float]] = contextvars.ContextVar(
+    "deadline",
+    default=None,
+)
+
+
+def get_remaining(deadline: t.Optional[float] = None) -> t.Optional[float]:
+    """
+
+    Get seconds left until deadline, the ongoing DEADLINE by default,
+    None without deadline.
+    """
+    if deadline is None:
+        deadline = DEADLINE.get()
+
+    if deadline is None:
+        return None
+
+    return deadline - time.monotonic()
+
+
+class Watchdog:
+    """
+
+    Call callbacks at their deadline from a single thread,
+    unless disarmed before, eg: to cancel queries running past it.
+    Callbacks run outside of the lock, disarm waits for a running one,
+    eg: for its connection to be reused once the cancel is sent.
+    """
+
+    def __init__(self) -> None:
+        # [deadline, order, callback] entries, disarmed without callback.
+        self._heap: t.List[t.List[t.Any]] = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        # notified when the running callback returns, see disarm.
+        self._done = threading.Condition(self._condition)
+        self._running: t.Optional[t.List[t.Any]] = None
+        self._pid: t.Optional[int] = None
+
+    def arm(self, deadline: float, callback: t.Callable[[], None]) -> t.List[t.Any]:
+        """
+
+        Call callback at the time.monotonic() time deadline,
+        returns an entry to disarm.
+        """
+        entry = [deadline, next(self._order), callback]
+
+        with self._condition:
+            # threads do not survive a fork, started per process.
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True).start()
+
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+        return entry
+
+    def disarm(self, entry: t.List[t.Any]) -> None:
+        """
+
+        Cancel the callback of entry, or wait for it to return if running.
+        """
+        with self._condition:
+            entry[2] = None
+
+            while self._running is entry:
+                self._done.wait()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                timeout = self._heap[0][0] - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+                entry = heapq.heappop(self._heap)
+                callback, entry[2] = entry[2], None
+                self._running = entry
+
+            try:
+                callback()
+            except Exception:
+                logging.exception("Deadline callback failed")
+            finally:
+                with self._condition:
+                    self._running = None
+                    self._done.notify_all()
+
+
+# watchdog of the process.
+WATCHDOG = Watchdog()
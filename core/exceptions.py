@@ -4,3 +4,19 @@ class BaseException(Exception):
 
 class ValidationException(BaseException):
     ...
+
+
+class SchemaException(BaseException):
+    ...
+
+
+class TimeoutException(BaseException):
+    ...
+
+
+class OverloadedException(BaseException):
+    def __init__(self, *args, retry_after: int = 1) -> None:
+        super().__init__(*args)
+
+        # seconds for clients to retry after.
+        self.retry_after = retry_after
@@ -0,0 +1,426 @@
+import typing as t
+
+import os
+import json
+import time
+import logging
+import bisect
+import atexit
+import tempfile
+import threading
+import contextvars
+
+from contextlib import contextmanager
+
+# seconds, latencies of fast lookups up to slow searches.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Metric:
+    """
+
+    Metric values by labels values, updated under a lock per metric.
+    """
+
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._lock = threading.Lock()
+        self._values: t.Dict[t.Tuple[str, ...], t.Any] = {}
+
+    def _key(self, labels: t.Dict[str, t.Any]) -> t.Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}.")
+
+        return tuple(str(labels[_]) for _ in self.labelnames)
+
+    def get_values(self) -> t.Dict[t.Tuple[str, ...], t.Any]:
+        with self._lock:
+            return {k: self._copy(v) for k, v in self._values.items()}
+
+    def _copy(self, value: t.Any) -> t.Any:
+        return value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: t.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: t.Any) -> None:
+        """
+
+        Set the process total, for totals counted elsewhere,
+        eg: by a collector.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(Metric):
+    """
+
+    Current value of a process, gauges of exited processes are dropped.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: t.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: t.Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: t.Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+
+    Observations counts by bucket upper bound, then their sum and count.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: t.Sequence[str] = (),
+        buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: t.Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                # a bucket per bound then +Inf, sum and count.
+                values = self._values[key] = [0] * (len(self.buckets) + 3)
+
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def _copy(self, value: t.List[float]) -> t.List[float]:
+        return list(value)
+
+    @contextmanager
+    def time(self, **labels: t.Any) -> t.Generator[None, None, None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class Registry:
+    """
+
+    Metrics of a process, rendered in the Prometheus text format.
+
+    Given a directory, processes write their metrics to a file per pid
+    every flush_interval seconds from a thread, and any process renders
+    the metrics of all: counters and histograms summed over all files,
+    gauges over files of running processes. The directory must be
+    emptied before the processes start, eg: on deployment.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: t.Dict[str, Metric] = {}
+        self.collectors: t.Dict[str, t.Callable[[], None]] = {}
+
+        self.directory: t.Optional[str] = None
+        self.flush_interval = 1.0
+        self._flush_lock = threading.Lock()
+        self._atexit = False
+        self._pid: t.Optional[int] = None
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered.")
+
+        self.metrics[metric.name] = metric
+
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def add_collector(self, name: str, collector: t.Callable[[], None]) -> None:
+        """
+
+        Add a function updating metrics before they are read,
+        eg: gauges of a pool state. It replaces a collector of the same name.
+        """
+        self.collectors[name] = collector
+
+    def configure(
+        self,
+        directory: t.Optional[str] = None,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+            if not self._atexit:
+                self._atexit = True
+                atexit.register(self.flush)
+
+    def collect(self) -> t.Dict[str, t.Dict[t.Tuple[str, ...], t.Any]]:
+        """
+
+        Get metrics values of the process.
+        """
+        for collector in list(self.collectors.values()):
+            collector()
+
+        return {name: metric.get_values() for name, metric in self.metrics.items()}
+
+    def start(self) -> None:
+        """
+
+        Start flushing every flush_interval seconds in the current process,
+        if a directory is configured. Threads do not survive a fork,
+        forked workers start theirs on their first request.
+        """
+        if not self.directory or self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+
+        thread = threading.Thread(target=self._flush_loop, daemon=True)
+        thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Metrics flush failed")
+
+    def flush(self) -> None:
+        if self.directory:
+            with self._flush_lock:
+                self._flush()
+
+    def _flush(self) -> None:
+        values = {
+            name: [[list(k), v] for k, v in metric_values.items()]
+            for name, metric_values in self.collect().items()
+        }
+
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=self.directory,
+            prefix=".",
+            delete=False,
+        ) as file:
+            json.dump(values, file)
+
+        os.replace(file.name, self.get_path(os.getpid()))
+
+    def get_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def collect_all(self) -> t.Dict[str, t.Dict[t.Tuple[str, ...], t.Any]]:
+        """
+
+        Get metrics values aggregated over processes of the directory.
+        """
+        if not self.directory:
+            return self.collect()
+
+        self.flush()
+
+        merged: t.Dict[str, t.Dict[t.Tuple[str, ...], t.Any]] = {
+            name: {} for name in self.metrics
+        }
+        for filename in os.listdir(self.directory):
+            pid, extension = os.path.splitext(filename)
+            if extension != ".json" or not pid.isdigit():
+                continue
+
+            try:
+                with open(os.path.join(self.directory, filename)) as file:
+                    values = json.load(file)
+            except (OSError, ValueError):
+                continue
+
+            running = is_running(int(pid))
+
+            for name, metric_values in values.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.type == "gauge" and not running):
+                    continue
+
+                for key, value in metric_values:
+                    key = tuple(key)
+                    current = merged[name].get(key)
+
+                    if current is None:
+                        merged[name][key] = value
+                    elif metric.type == "histogram":
+                        merged[name][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        merged[name][key] = current + value
+
+        return merged
+
+    def render(self) -> str:
+        """
+
+        Render metrics of all processes in the Prometheus text format.
+        """
+        lines = []
+
+        for name, metric_values in self.collect_all().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {escape(metric.documentation, help=True)}")
+            lines.append(f"# TYPE {name} {metric.type}")
+
+            for key, value in sorted(metric_values.items()):
+                labels = list(zip(metric.labelnames, key))
+
+                if metric.type != "histogram":
+                    lines.append(f"{name}{format_labels(labels)} {float(value)}")
+                    continue
+
+                cumulative = 0
+                bounds = [*(repr(float(_)) for _ in metric.buckets), "+Inf"]
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    bucket_labels = format_labels([*labels, ("le", bound)])
+                    lines.append(f"{name}_bucket{bucket_labels} {float(cumulative)}")
+
+                lines.append(f"{name}_sum{format_labels(labels)} {float(value[-2])}")
+                lines.append(f"{name}_count{format_labels(labels)} {float(value[-1])}")
+
+        return "\n".join(lines) + "\n"
+
+
+def is_running(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def escape(value: str, help: bool = False) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    if not help:
+        value = value.replace('"', '\\"')
+
+    return value
+
+
+def format_labels(labels: t.Sequence[t.Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+# metrics of the process.
+REGISTRY = Registry()
+
+# CONTENT_TYPE of the rendered metrics.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Timings:
+    """
+
+    Seconds spent by phase, eg: of a request.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: t.Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def get_elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+# timings of the ongoing request, set by the app.
+TIMINGS: contextvars.ContextVar[t.Optional[Timings]] = contextvars.ContextVar(
+    "timings",
+    default=None,
+)
+
+
+def add_timing(phase: str, seconds: float) -> None:
+    timings = TIMINGS.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def timed(phase: str) -> t.Generator[None, None, None]:
+    """
+
+    Add time spent to phase of the ongoing timings, if any.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(phase, time.perf_counter() - started)
@@ -0,0 +1,275 @@
+import typing as t
+
+import os
+import json
+import fcntl
+import hashlib
+import time
+import tempfile
+import threading
+
+from core import deadline as core_deadline
+
+# seconds between attempts to take a file lock held by another process,
+# while waiting until a deadline.
+LOCK_POLL_INTERVAL = 0.01
+
+
+class FileLockBackend:
+    """
+
+    Coalesce calls across processes of a host with a file lock per key,
+    a local stand-in for a shared lock service.
+
+    The process holding the lock calls, then writes the result to a file.
+    Processes waiting on the lock read that result if it was written
+    after they started waiting, else they call in turn. If the call failed,
+    they call again without waiting for each other. Processes wait until
+    the ongoing deadline at most, then call themselves, see core.deadline.
+    Results must be json serializable.
+
+    Files of keys not called for ttl seconds are removed, see sweep.
+    """
+
+    def __init__(self, directory: str, ttl: float = 60.0) -> None:
+        self.directory = directory
+        self.ttl = ttl
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._swept = time.monotonic()
+
+    def get_path(self, key: t.Hashable) -> str:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+
+        return os.path.join(self.directory, name)
+
+    def do(
+        self,
+        key: t.Hashable,
+        function: t.Callable[[], t.Any],
+    ) -> t.Tuple[t.Any, bool]:
+        """
+
+        Call function or share the result of another process call,
+        returns the result and if it was shared.
+        """
+        if time.monotonic() - self._swept >= self.ttl:
+            self.sweep()
+
+        path = self.get_path(key)
+        # results files are replaced, a new version is written since.
+        version = get_version(path + ".json")
+
+        with open(path + ".lock", "a") as lock_file:
+            if not self._lock(lock_file):
+                # the call waited for outlived the deadline.
+                return function(), False
+
+            try:
+                shared = self._read(path, version)
+                if shared is None:
+                    return self._call(path, function), False
+
+                if "result" in shared:
+                    return shared["result"], True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        # the call waited for failed, waiters call again concurrently.
+        return function(), False
+
+    def _lock(self, lock_file: t.IO) -> bool:
+        """
+
+        Lock lock_file, waiting until the ongoing deadline if any,
+        returns if it is locked.
+        """
+        if core_deadline.get_remaining() is None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return True
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                remaining = core_deadline.get_remaining()
+                if remaining <= 0:
+                    return False
+
+                time.sleep(min(LOCK_POLL_INTERVAL, remaining))
+
+    def _read(
+        self,
+        path: str,
+        version: t.Optional[t.Tuple[int, int]],
+    ) -> t.Optional[t.Dict[str, t.Any]]:
+        try:
+            with open(path + ".json") as file:
+                stat = os.fstat(file.fileno())
+                if (stat.st_ino, stat.st_mtime_ns) == version:
+                    return None
+
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _call(self, path: str, function: t.Callable[[], t.Any]) -> t.Any:
+        try:
+            result = function()
+        except BaseException:
+            self._write(path, {"failed": True})
+            raise
+
+        self._write(path, {"result": result})
+
+        return result
+
+    def _write(self, path: str, data: t.Dict[str, t.Any]) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=self.directory,
+            delete=False,
+        ) as file:
+            json.dump(data, file)
+
+        os.replace(file.name, path + ".json")
+
+    def sweep(self) -> None:
+        """
+
+        Remove files not modified for ttl seconds, lock files held are kept.
+        """
+        self._swept = time.monotonic()
+        expired = time.time() - self.ttl
+
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime >= expired:
+                    continue
+
+                if not entry.name.endswith(".lock"):
+                    os.unlink(entry.path)
+                    continue
+
+                with open(entry.path, "a") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
+
+
+def get_version(path: str) -> t.Optional[t.Tuple[int, int]]:
+    """
+
+    Get inode and modification time of path, None if missing.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.exception: t.Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+
+    Coalesce concurrent calls of a key into a single call,
+    callers of a key in flight wait for and share its result or exception.
+    Callers wait until the ongoing deadline at most, then call themselves,
+    see core.deadline.
+    shared coalesces calls across processes, eg: a FileLockBackend.
+    """
+
+    def __init__(self, shared: t.Optional[FileLockBackend] = None) -> None:
+        self.shared = shared
+
+        self._lock = threading.Lock()
+        self._calls: t.Dict[t.Hashable, Call] = {}
+
+        self.requests = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.shared_coalesced = 0
+
+    def do(self, key: t.Hashable, function: t.Callable[[], t.Any]) -> t.Any:
+        with self._lock:
+            self.requests += 1
+
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(core_deadline.get_remaining()):
+                # the call waited for outlived the deadline.
+                with self._lock:
+                    self.calls += 1
+
+                return function()
+
+            if call.exception is not None:
+                raise call.exception
+
+            return call.result
+
+        try:
+            call.result = self._call(key, function)
+        except BaseException as ex:
+            call.exception = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+    def _call(self, key: t.Hashable, function: t.Callable[[], t.Any]) -> t.Any:
+        if self.shared is None:
+            with self._lock:
+                self.calls += 1
+
+            return function()
+
+        result, shared = self.shared.do(key, function)
+
+        with self._lock:
+            if shared:
+                self.shared_coalesced += 1
+            else:
+                self.calls += 1
+
+        return result
+
+    def get_stats(self) -> t.Dict[str, int]:
+        """
+
+        Get requests count, calls made and requests coalesced
+        in process and across processes.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "shared_coalesced": self.shared_coalesced,
+            }
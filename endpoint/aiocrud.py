@@ -0,0 +1,59 @@
+import typing as t
+
+import datetime
+import inspect
+
+from quart import current_app
+
+from core.aiodatabase import async_manager
+
+from endpoint.crud import Steps
+from endpoint.crud import search_steps
+
+
+async def search(
+    by: str,
+    value: str,
+    date_from: t.Optional[datetime.date] = None,
+    date_to: t.Optional[datetime.date] = None,
+    group: t.Optional[str] = None,
+) -> t.List:
+    """
+
+    Asynchronous endpoint.crud.search, of the asyncio app.
+    """
+    return await run_steps(
+        search_steps(
+            current_app,
+            get_manager,
+            by,
+            value,
+            date_from=date_from,
+            date_to=date_to,
+            group=group,
+        )
+    )
+
+
+def get_manager(model: t.Type) -> t.Any:
+    return async_manager(model, current_app.database)
+
+
+async def run_steps(steps: Steps) -> t.List:
+    """
+
+    Run search steps, awaiting results of asynchronous managers calls,
+    their errors are raised in the steps.
+    """
+    send, value = steps.send, None
+    while True:
+        try:
+            result = send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        try:
+            value = await result if inspect.isawaitable(result) else result
+            send = steps.send
+        except Exception as ex:
+            send, value = steps.throw, ex
@@ -0,0 +1,58 @@
+from quart import Blueprint
+from quart import current_app
+from quart import jsonify
+from quart import request
+
+from core import metrics
+from core.aiodatabase import async_manager
+
+from shared.models import AdGroup
+from shared.models import Campaign
+
+from endpoint import aiocrud
+from endpoint.routes import get_search_key
+from endpoint.routes import serialize_search
+from endpoint.routes import validate_search
+
+
+endpoint = Blueprint("endpoint", __name__)
+
+
+@endpoint.route("/search", methods=["GET"])
+async def search():
+    async def search_results(args, kwargs):
+        return serialize_search(
+            await aiocrud.search(*args, **kwargs),
+            kwargs["group"],
+        )
+
+    with metrics.timed("validate"):
+        args, kwargs = validate_search(request.args)
+
+    search_flight = current_app.search_flight
+    if search_flight is None:
+        results = await search_results(args, kwargs)
+    else:
+        key = get_search_key(args, kwargs)
+        results = await search_flight.do(key, lambda: search_results(args, kwargs))
+
+    with metrics.timed("jsonify"):
+        return jsonify({"results": results})
+
+
+@endpoint.route("/stats", methods=["GET"])
+async def stats():
+    search_flight = current_app.search_flight
+
+    return jsonify(
+        {
+            "search": search_flight and search_flight.get_stats(),
+            "cache": {
+                model.__name__: async_manager(
+                    model, current_app.database
+                ).get_cache_stats()
+                for model in (Campaign, AdGroup)
+            },
+            "pool": current_app.database.pool.get_stats(),
+        }
+    )
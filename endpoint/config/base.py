@@ -9,5 +9,83 @@ DATABASE_USER = os.environ["DATABASE_USER"]
 DATABASE_PASSWORD = os.environ["DATABASE_PASSWORD"]
 DATABASE_PORT = int(os.environ["DATABASE_PORT"])
 
+# endpoint tables preparation on app creation:
+# "create" creates missing tables and columns,
+# "validate" checks tables and columns exist with one catalog query,
+# "version" creates tables only if the schema version marker is outdated.
+DATABASE_SCHEMA = "create"
+
 # ROAS
 ROAS_SEARCH_LIMIT = 10
+
+# read search terms ranked by the loader, for limits up to
+# shared.models.ROAS_RANKING_TOP_K.
+ROAS_RANKING = False
+
+# rank search terms by their structure_value and alias columns,
+# requires data loaded with `load.py --denormalize`.
+ROAS_DENORMALIZED = False
+
+# answer searches from an in-memory index of the top ROAS_SEARCH_LIMIT
+# search terms, rebuilt when the loader data generation changes.
+ROAS_SERVING = False
+ROAS_SERVING_POLL_INTERVAL = 30
+
+# answer searches from a snapshot file written by `export.py`,
+# falling back to the database for keys or limits it does not hold.
+ROAS_SNAPSHOT = None
+
+# features below are off by default, production workers enable them
+# with endpoint.config.production.
+
+# identical concurrent searches of a worker share one search,
+# and of all workers of the host if a directory is given for file locks.
+SEARCH_COALESCING = False
+SEARCH_COALESCING_DIR = None
+
+# seconds of a request before its database queries are cancelled,
+# answering 504, see core.deadline. None disables it.
+REQUEST_DEADLINE = None
+
+# admission control of a worker database transactions, see core.admission:
+# at most DATABASE_MAX_CONCURRENCY at once and DATABASE_MAX_QUEUE more
+# waiting up to DATABASE_QUEUE_TIMEOUT seconds, others answer 503 to retry
+# after DATABASE_RETRY_AFTER seconds. Cached lookups are not limited.
+# None disables it.
+DATABASE_MAX_CONCURRENCY = None
+DATABASE_MAX_QUEUE = 20
+DATABASE_QUEUE_TIMEOUT = 0.1
+DATABASE_RETRY_AFTER = 1
+
+# read replicas of searches, DSNs or connection parameters over the
+# primary ones, eg: {"host": "replica1"}. Reads are balanced over replicas
+# by DATABASE_BALANCING, "round_robin", "random" or "least_busy", replicas
+# lagging over DATABASE_MAX_REPLICA_LAG seconds, checked every
+# DATABASE_LAG_CHECK_INTERVAL seconds, are ejected. Reads less than
+# DATABASE_READ_YOUR_WRITES seconds after a write of the same request thread
+# go to the primary. Each server pools DATABASE_POOL_SIZE connections,
+# None opens one per transaction. See core.database.Database.route.
+DATABASE_REPLICAS = []
+DATABASE_BALANCING = "round_robin"
+DATABASE_MAX_REPLICA_LAG = 30.0
+DATABASE_LAG_CHECK_INTERVAL = 5.0
+DATABASE_READ_YOUR_WRITES = 0.0
+DATABASE_POOL_SIZE = None
+
+# connections of the asyncio app database pool, see aioapp.
+DATABASE_POOL_MAX_SIZE = 10
+
+# serve requests, database and cache metrics at /metrics. Workers of a
+# host aggregate their metrics through files of METRICS_DIR, written
+# at most every METRICS_FLUSH_INTERVAL seconds, emptied on deployment.
+METRICS = False
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 1.0
+
+# profile requests carrying the PROFILING_HEADER header, and a
+# PROFILING_SAMPLE_RATE share of all requests, to PROFILING_DIR,
+# see endpoint.profiling.Profiler. Requests are not hooked if disabled.
+PROFILING = False
+PROFILING_DIR = "profiles"
+PROFILING_HEADER = "X-Profile"
+PROFILING_SAMPLE_RATE = 0.0
@@ -0,0 +1,7 @@
+# settings of production workers, over endpoint.config.base,
+# loaded with FLASK_CONFIG_PATH=endpoint/config/production.py.
+
+SEARCH_COALESCING = True
+REQUEST_DEADLINE = 5.0
+DATABASE_MAX_CONCURRENCY = 10
+METRICS = True
@@ -1,48 +1,209 @@
 import typing as t
 
-from flask import abort
+import datetime
+
 from flask import current_app
+from werkzeug.exceptions import abort
 
+from core import metrics
 
 from shared.models import Campaign
 from shared.models import AdGroup
 from shared.models import SearchTerm
+from shared.models import CampaignRollup
+from shared.models import RoasRanking
+from shared.models import ROAS_RANKING_TOP_K
+
+# steps of a search, a generator yielding its database calls results
+# to its runner and sent back their values, see run_steps.
+Steps = t.Generator[t.Any, t.Any, t.List]
+
+
+def search(
+    by: str,
+    value: str,
+    date_from: t.Optional[datetime.date] = None,
+    date_to: t.Optional[datetime.date] = None,
+    group: t.Optional[str] = None,
+) -> t.List:
+    """
+
+    Search terms with the best ROAS of campaigns or adgroups matching value,
+    between dates if given, see search_steps.
+    """
+    return run_steps(
+        search_steps(
+            current_app,
+            get_manager,
+            by,
+            value,
+            date_from=date_from,
+            date_to=date_to,
+            group=group,
+        )
+    )
+
+
+def get_manager(model: t.Type) -> t.Any:
+    return model.manager(current_app.database)
+
+
+def run_steps(steps: Steps) -> t.List:
+    """
+
+    Run search steps, results of blocking managers calls are their values.
+    """
+    value = None
+    while True:
+        try:
+            value = steps.send(value)
+        except StopIteration as stop:
+            return stop.value
 
 
-def search(by: str, value: str) -> t.List:
+def search_steps(
+    app: t.Any,
+    get_manager: t.Callable[[t.Type], t.Any],
+    by: str,
+    value: str,
+    date_from: t.Optional[datetime.date] = None,
+    date_to: t.Optional[datetime.date] = None,
+    group: t.Optional[str] = None,
+) -> Steps:
+    """
+
+    Steps of a search shared by the flask and asyncio apps,
+    get_manager gets the manager of a model, blocking or asynchronous.
+    group=campaign ranks campaigns totals from the daily rollup,
+    see search_rollup.
+    """
     if by not in ("structure_value", "alias"):
         raise ValueError(f"Unexpected value {by}.")
 
-    search_limit = current_app.config["ROAS_SEARCH_LIMIT"]
+    search_limit = app.config["ROAS_SEARCH_LIMIT"]
 
-    if by == "structure_value":
-        manager = SearchTerm.manager(current_app.database)
-        return manager.get_roas_by_campaign(
-            get_campaigns(value),
-            limit=search_limit,
+    if app.config["ROAS_SERVING"] and not (date_from or date_to or group):
+        with metrics.timed("rank"):
+            search_terms = app.roas_server.search(by, value, search_limit)
+        if search_terms is None:
+            abort(404)
+
+        return search_terms
+
+    if app.config["ROAS_SNAPSHOT"] and not (date_from or date_to or group):
+        with metrics.timed("rank"):
+            search_terms = app.roas_snapshot.search(by, value, search_limit)
+        if search_terms is not None:
+            return search_terms
+
+    if group == "campaign":
+        return (
+            yield from search_rollup(
+                get_manager,
+                value,
+                search_limit,
+                date_from=date_from,
+                date_to=date_to,
+            )
         )
 
-    else:
-        manager = SearchTerm.manager(current_app.database)
-        return manager.get_roas_by_adgroup(
-            get_adgroups(value),
-            limit=search_limit,
+    if date_from or date_to or group:
+        return (
+            yield from search_dated(
+                get_manager,
+                by,
+                value,
+                search_limit,
+                date_from=date_from,
+                date_to=date_to,
+                group=group,
+            )
         )
 
+    if app.config["ROAS_DENORMALIZED"]:
+        return (yield from search_denormalized(get_manager, by, value, search_limit))
 
-def get_campaigns(structure_value: str) -> t.List[Campaign]:
-    campaigns = Campaign.manager(current_app.database).find(
-        structure_value=structure_value,
-    )
-    if not campaigns:
-        abort(404)
+    if app.config["ROAS_RANKING"] and search_limit <= ROAS_RANKING_TOP_K:
+        manager = get_manager(RoasRanking)
+    else:
+        manager = get_manager(SearchTerm)
+
+    if by == "structure_value":
+        campaigns = yield from lookup(get_campaigns, get_manager, value)
+        with metrics.timed("rank"):
+            return (yield manager.get_roas_by_campaign(campaigns, limit=search_limit))
 
-    return campaigns
+    adgroups = yield from lookup(get_adgroups, get_manager, value)
+    with metrics.timed("rank"):
+        return (yield manager.get_roas_by_adgroup(adgroups, limit=search_limit))
 
 
-def get_adgroups(alias: str) -> t.List[AdGroup]:
-    adgroups = AdGroup.manager(current_app.database).find(alias=alias)
-    if not adgroups:
+def search_dated(get_manager, by: str, value: str, limit: int, **kwargs) -> Steps:
+    """
+
+    Search search terms between dates, search terms totals if grouped.
+    """
+    manager = get_manager(SearchTerm)
+
+    if by == "structure_value":
+        campaigns = yield from lookup(get_campaigns, get_manager, value)
+        with metrics.timed("rank"):
+            return (yield manager.get_roas_by_campaign(campaigns, limit, **kwargs))
+
+    adgroups = yield from lookup(get_adgroups, get_manager, value)
+    with metrics.timed("rank"):
+        return (yield manager.get_roas_by_adgroup(adgroups, limit, **kwargs))
+
+
+def search_rollup(get_manager, value: str, limit: int, **kwargs) -> Steps:
+    """
+
+    Search daily rollup for totals of campaigns of structure_value value.
+    """
+    manager = get_manager(CampaignRollup)
+
+    campaigns = yield from lookup(get_campaigns, get_manager, value)
+    with metrics.timed("rank"):
+        return (yield manager.get_roas_by_campaign(campaigns, limit, **kwargs))
+
+
+def search_denormalized(get_manager, by: str, value: str, limit: int) -> Steps:
+    manager = get_manager(SearchTerm)
+
+    if by == "structure_value":
+        with metrics.timed("rank"):
+            search_terms = yield manager.get_roas_by_structure_value(value, limit=limit)
+        if not search_terms:
+            # not found if no campaign matches.
+            yield from lookup(get_campaigns, get_manager, value)
+
+    else:
+        with metrics.timed("rank"):
+            search_terms = yield manager.get_roas_by_alias(value, limit=limit)
+        if not search_terms:
+            # not found if no adgroup matches.
+            yield from lookup(get_adgroups, get_manager, value)
+
+    return search_terms
+
+
+def lookup(get: t.Callable, get_manager, value: str) -> Steps:
+    """
+
+    Get models of a dimension matching value, not found if none,
+    get is get_campaigns or get_adgroups.
+    """
+    with metrics.timed("lookup"):
+        models = yield get(get_manager, value)
+    if not models:
         abort(404)
 
-    return adgroups
+    return models
+
+
+def get_campaigns(get_manager, structure_value: str) -> t.Any:
+    return get_manager(Campaign).find(structure_value=structure_value)
+
+
+def get_adgroups(get_manager, alias: str) -> t.Any:
+    return get_manager(AdGroup).find(alias=alias)
@@ -1,43 +1,69 @@
-from flask import jsonify
+from endpoint.metrics import count_errors
 
+# handlers return dicts, serialized to json by Flask and Quart apps alike.
 
+
+@count_errors
 def handler404(*args):
     return (
-        jsonify(
-            {
-                "error": {
-                    "code": 4004,
-                    "message": "Not Found",
-                }
+        {
+            "error": {
+                "code": 4004,
+                "message": "Not Found",
             }
-        ),
+        },
         404,
     )
 
 
+@count_errors
 def handler_error(exception):
     return (
-        jsonify(
-            {
-                "error": {
-                    "code": 5000,
-                    "message": str(exception),
-                },
+        {
+            "error": {
+                "code": 5000,
+                "message": str(exception),
             },
-        ),
+        },
         500,
     )
 
 
+@count_errors
 def validation_error(exception):
     return (
-        jsonify(
-            {
-                "error": {
-                    "code": 4000,
-                    "message": str(exception),
-                },
+        {
+            "error": {
+                "code": 4000,
+                "message": str(exception),
             },
-        ),
+        },
         400,
     )
+
+
+@count_errors
+def timeout_error(exception):
+    return (
+        {
+            "error": {
+                "code": 5004,
+                "message": str(exception),
+            },
+        },
+        504,
+    )
+
+
+@count_errors
+def overloaded_error(exception):
+    return (
+        {
+            "error": {
+                "code": 5003,
+                "message": str(exception),
+            },
+        },
+        503,
+        {"Retry-After": str(exception.retry_after)},
+    )
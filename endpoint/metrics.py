@@ -0,0 +1,90 @@
+import typing as t
+
+import functools
+
+from core import metrics
+from core.database import Database
+
+
+REQUESTS = metrics.REGISTRY.counter(
+    "http_requests_total",
+    "Requests by route, method and status code.",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = metrics.REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Requests duration by route.",
+    ["route"],
+)
+REQUEST_DB_DURATION = metrics.REGISTRY.histogram(
+    "http_request_db_duration_seconds",
+    "Database transactions duration per request, by route.",
+    ["route"],
+)
+ERRORS = metrics.REGISTRY.counter(
+    "http_errors_total",
+    "Error responses by error handler and status code.",
+    ["handler", "status"],
+)
+SERIALIZE_DURATION = metrics.REGISTRY.histogram(
+    "search_serialize_duration_seconds",
+    "Search results serialization duration by schema.",
+    ["schema"],
+)
+CACHE_HITS = metrics.REGISTRY.counter(
+    "table_cache_hits_total",
+    "Cached tables finds served without reloading.",
+    ["table"],
+)
+CACHE_MISSES = metrics.REGISTRY.counter(
+    "table_cache_misses_total",
+    "Cached tables finds of a stale table.",
+    ["table"],
+)
+
+
+def start_request() -> None:
+    metrics.REGISTRY.start()
+    metrics.TIMINGS.set(metrics.Timings())
+
+
+def end_request(route: t.Optional[str], method: str, status: int) -> None:
+    timings = metrics.TIMINGS.get()
+    if timings is None:
+        return
+
+    metrics.TIMINGS.set(None)
+
+    route = route or "unmatched"
+    REQUESTS.inc(route=route, method=method, status=status)
+    REQUEST_DURATION.observe(timings.get_elapsed(), route=route)
+    REQUEST_DB_DURATION.observe(timings.phases.get("db", 0.0), route=route)
+
+
+def count_errors(handler: t.Callable) -> t.Callable:
+    """
+
+    Count responses of an error handler.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(*args):
+        response = handler(*args)
+        ERRORS.inc(handler=handler.__name__, status=response[1])
+
+        return response
+
+    return wrapper
+
+
+def cache_collector(database: Database) -> t.Callable[[], None]:
+    def collect() -> None:
+        for table_name, table_cache in list(database.caches.items()):
+            CACHE_HITS.set(table_cache.hits, table=table_name)
+            CACHE_MISSES.set(table_cache.misses, table=table_name)
+
+    return collect
+
+
+def render() -> t.Tuple[str, int, t.Dict[str, str]]:
+    return metrics.REGISTRY.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
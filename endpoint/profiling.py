@@ -0,0 +1,125 @@
+import typing as t
+
+import os
+import json
+import time
+import random
+import logging
+import cProfile
+
+from core import metrics
+
+
+class Profile:
+    """
+
+    Profile of a request, its cProfile stats and phases timings.
+    """
+
+    def __init__(self, timings: metrics.Timings, owns_timings: bool) -> None:
+        self.timings = timings
+        self.owns_timings = owns_timings
+
+        self.profile: t.Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # another profiler is active, eg: of a concurrent request.
+            self.profile = None
+
+    def stop(self) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+
+
+class Profiler:
+    """
+
+    Profile requests carrying header, or a sample_rate share of requests,
+    to directory: cProfile stats in a .prof file, loadable by pstats,
+    snakeviz or flameprof, and a .json file of the request phases timings.
+    Phases overlap, eg: "db" time is also "lookup" or "rank" time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        header: t.Optional[str] = None,
+        sample_rate: float = 0.0,
+    ) -> None:
+        self.directory = directory
+        self.header = header
+        self.sample_rate = sample_rate
+
+        os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, headers: t.Mapping[str, str]) -> bool:
+        if self.header and headers.get(self.header):
+            return True
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, headers: t.Mapping[str, str]) -> t.Optional[Profile]:
+        """
+
+        Start profiling the request if it should be profiled.
+        Timings of the request are shared with metrics if recorded.
+        """
+        if not self.should_profile(headers):
+            return None
+
+        timings = metrics.TIMINGS.get()
+        owns_timings = timings is None
+        if owns_timings:
+            timings = metrics.Timings()
+            metrics.TIMINGS.set(timings)
+
+        return Profile(timings, owns_timings)
+
+    def stop(
+        self,
+        profile: Profile,
+        *,
+        route: t.Optional[str],
+        method: str,
+        path: str,
+        status: int,
+    ) -> str:
+        """
+
+        Stop profiling and write the profile files, returns their path
+        without extension.
+        """
+        profile.stop()
+        duration = profile.timings.get_elapsed()
+
+        if profile.owns_timings:
+            metrics.TIMINGS.set(None)
+
+        path_prefix = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.time_ns()}",
+        )
+
+        try:
+            if profile.profile is not None:
+                profile.profile.dump_stats(path_prefix + ".prof")
+
+            with open(path_prefix + ".json", "w") as file:
+                json.dump(
+                    {
+                        "route": route,
+                        "method": method,
+                        "path": path,
+                        "status": status,
+                        "duration": duration,
+                        "phases": profile.timings.phases,
+                        "profiled": profile.profile is not None,
+                    },
+                    file,
+                    indent=2,
+                )
+        except OSError:
+            logging.exception("Writing profile %s failed", path_prefix)
+
+        return path_prefix
@@ -1,42 +1,121 @@
+import datetime
+
 from flask import Blueprint
+from flask import current_app
 from flask import jsonify
 from flask import request
 
+from core import metrics
 from core.exceptions import ValidationException
 
+from shared.models import AdGroup
+from shared.models import Campaign
+
 from endpoint import crud
 from endpoint import schemas
+from endpoint.metrics import SERIALIZE_DURATION
 
 
 endpoint = Blueprint("endpoint", __name__)
 
 
+def validate_search(args):
+
+    # TODO: create schema.Schema.validate
+    # for validation
+    #
+    # SPECS
+    # class Schema:
+    #     def _deserialize(self, ...):
+    #          self._validate() # raise ValidationException
+    #          ...
+    #          return valid_data
+    #
+    #     def validate(self, ...):
+    #          return self._deserialize()
+
+    search_term = args.get("term")
+    search_value = args.get("value")
+
+    if not (search_term and search_value):
+        raise ValidationException("term and value are required.")
+
+    dates = {}
+    for name in ("from", "to"):
+        if args.get(name):
+            try:
+                dates[name] = datetime.date.fromisoformat(args[name])
+            except ValueError:
+                raise ValidationException(f"{name} must be a YYYY-MM-DD date.")
+
+    if "from" in dates and "to" in dates and dates["from"] > dates["to"]:
+        raise ValidationException("from must not be after to.")
+
+    group = args.get("group") or None
+    if group not in (None, "search_term", "campaign"):
+        raise ValidationException("group must be search_term or campaign.")
+
+    if group == "campaign" and search_term != "structure_value":
+        raise ValidationException("group campaign requires term structure_value.")
+
+    return (search_term, search_value), {
+        "date_from": dates.get("from"),
+        "date_to": dates.get("to"),
+        "group": group,
+    }
+
+
+def get_search_key(args, kwargs):
+    return ("search", *args, *(str(_) for _ in kwargs.values()))
+
+
+# result schemas by search group.
+SEARCH_SCHEMAS = {
+    None: schemas.SearchResultSchema,
+    "search_term": schemas.SearchTotalSchema,
+    "campaign": schemas.CampaignTotalSchema,
+}
+
+
+def serialize_search(results, group):
+    schema = SEARCH_SCHEMAS[group]
+
+    with SERIALIZE_DURATION.time(schema=schema.__name__), metrics.timed("serialize"):
+        return schema(results, many=True).data()
+
+
 @endpoint.route("/search", methods=["GET"])
 def search():
-    def validate(args):
+    def search_results(args, kwargs):
+        return serialize_search(crud.search(*args, **kwargs), kwargs["group"])
 
-        # TODO: create schema.Schema.validate
-        # for validation
-        #
-        # SPECS
-        # class Schema:
-        #     def _deserialize(self, ...):
-        #          self._validate() # raise ValidationException
-        #          ...
-        #          return valid_data
-        #
-        #     def validate(self, ...):
-        #          return self._deserialize()
+    with metrics.timed("validate"):
+        args, kwargs = validate_search(request.args)
 
-        search_term = args.get("term")
-        search_value = args.get("value")
+    search_flight = current_app.search_flight
+    if search_flight is None:
+        results = search_results(args, kwargs)
+    else:
+        key = get_search_key(args, kwargs)
+        results = search_flight.do(key, lambda: search_results(args, kwargs))
 
-        if not (search_term and search_value):
-            raise ValidationException("term and value are required.")
+    with metrics.timed("jsonify"):
+        return jsonify({"results": results})
 
-        return search_term, search_value
 
-    results = crud.search(*validate(request.args))
-    results = schemas.SearchResultSchema(results, many=True).data()
+@endpoint.route("/stats", methods=["GET"])
+def stats():
+    search_flight = current_app.search_flight
+    limiter = current_app.database.limiter
 
-    return jsonify({"results": results})
+    return jsonify(
+        {
+            "search": search_flight and search_flight.get_stats(),
+            "admission": limiter and limiter.get_stats(),
+            "database": current_app.database.get_stats(),
+            "cache": {
+                model.__name__: model.manager(current_app.database).get_cache_stats()
+                for model in (Campaign, AdGroup)
+            },
+        }
+    )
@@ -10,3 +10,21 @@ class SearchResultSchema(schema.Schema):
     cost = schema.DecimalField()
     search_term = schema.StringField()
     date = schema.DateField()
+
+
+class CampaignTotalSchema(schema.Schema):
+
+    campaign = schema.IntegerField(name="campaign_id")
+    clicks = schema.IntegerField()
+    conversion_value = schema.DecimalField()
+    cost = schema.DecimalField()
+
+
+class SearchTotalSchema(schema.Schema):
+
+    ad_group = schema.IntegerField(name="ad_group_id")
+    campaign = schema.IntegerField(name="campaign_id")
+    clicks = schema.IntegerField()
+    conversion_value = schema.DecimalField()
+    cost = schema.DecimalField()
+    search_term = schema.StringField()
@@ -0,0 +1,191 @@
+import typing as t
+
+import os
+import sys
+import array
+import logging
+import datetime
+import threading
+
+from core.database import Database
+
+from shared.models import AdGroup
+from shared.models import Campaign
+from shared.models import SearchTerm
+from shared.models import DataGeneration
+
+
+class RoasIndex:
+    """
+
+    Top search terms of each campaign structure_value and adgroup alias,
+    held in columns arrays shared by both rankings.
+    Keys map to the (start, end) range of their search terms.
+    """
+
+    dimensions = (
+        ("structure_value", Campaign),
+        ("alias", AdGroup),
+    )
+
+    def __init__(self, generation: int = 0, limit: int = 0) -> None:
+        self.generation = generation
+        self.limit = limit
+
+        self.keys: t.Dict[str, t.Dict[str, t.Tuple[int, int]]] = {
+            by: {} for by, _ in self.dimensions
+        }
+
+        self.date = array.array("l")
+        self.ad_group_id = array.array("q")
+        self.campaign_id = array.array("q")
+        self.clicks = array.array("q")
+        self.conversions = array.array("q")
+        self.cost: t.List[t.Any] = []
+        self.conversion_value: t.List[t.Any] = []
+        self.search_term: t.List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.search_term)
+
+    @classmethod
+    def from_database(cls, database: Database, limit: int) -> "RoasIndex":
+        """
+
+        Build index of the top limit search terms of the data generation.
+        Keys without search terms are indexed empty, unknown keys are not found.
+        """
+        generation = DataGeneration.manager(database).get_generation()
+        index = cls(generation=generation, limit=limit)
+        manager = SearchTerm.manager(database)
+
+        for by, model in cls.dimensions:
+            keys = index.keys[by]
+
+            for row in manager.get_top_roas(by, limit):
+                start, _ = keys.get(row["key"], (len(index), None))
+                index.append(row)
+                keys[row["key"]] = (start, len(index))
+
+            for (key,) in model.manager(database).values_list(by):
+                keys.setdefault(key, (0, 0))
+
+        return index
+
+    def append(self, row: t.Dict[str, t.Any]) -> None:
+        self.date.append(row["date"].toordinal())
+        self.ad_group_id.append(row["ad_group_id"])
+        self.campaign_id.append(row["campaign_id"])
+        self.clicks.append(row["clicks"])
+        self.conversions.append(row["conversions"])
+        self.cost.append(row["cost"])
+        self.conversion_value.append(row["conversion_value"])
+        self.search_term.append(sys.intern(row["search_term"]))
+
+    def search(
+        self,
+        by: str,
+        value: str,
+        limit: int,
+    ) -> t.Optional[t.List[SearchTerm]]:
+        """
+
+        Get top limit search terms of value, None if value is unknown.
+        """
+        if limit > self.limit:
+            raise ValueError(f"limit exceeds index limit {self.limit}.")
+
+        try:
+            start, end = self.keys[by][value]
+        except KeyError:
+            return None
+
+        return [
+            SearchTerm(
+                date=datetime.date.fromordinal(self.date[_]),
+                ad_group_id=self.ad_group_id[_],
+                campaign_id=self.campaign_id[_],
+                clicks=self.clicks[_],
+                cost=self.cost[_],
+                conversion_value=self.conversion_value[_],
+                conversions=self.conversions[_],
+                search_term=self.search_term[_],
+            )
+            for _ in range(start, min(end, start + limit))
+        ]
+
+
+class RoasServer:
+    """
+
+    Serve a RoasIndex, rebuilt in a background thread
+    when the data generation changes and swapped in whole.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        limit: int,
+        poll_interval: float = 30,
+    ) -> None:
+        self.database = database
+        self.limit = limit
+        self.poll_interval = poll_interval
+
+        self.index = RoasIndex.from_database(database, limit)
+
+        self._pid = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """
+
+        Start polling the data generation, in the current process.
+        Threads do not survive a fork, forked workers restart it on search.
+        """
+        self._pid = os.getpid()
+
+        thread = threading.Thread(target=self._poll, daemon=True)
+        thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logging.exception("ROAS index refresh failed")
+
+    def refresh(self) -> bool:
+        """
+
+        Rebuild index if the data generation changed, returns if rebuilt.
+        """
+        generation = DataGeneration.manager(self.database).get_generation()
+        if generation == self.index.generation:
+            return False
+
+        index = RoasIndex.from_database(self.database, self.limit)
+        # readers hold the previous index until they are done with it.
+        self.index = index
+
+        logging.info(
+            "ROAS index generation %s, %s search terms",
+            index.generation,
+            len(index),
+        )
+
+        return True
+
+    def search(
+        self,
+        by: str,
+        value: str,
+        limit: int,
+    ) -> t.Optional[t.List[SearchTerm]]:
+        if self._pid != os.getpid():
+            self.start()
+
+        return self.index.search(by, value, limit)
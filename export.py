@@ -0,0 +1,64 @@
+import typing as t
+
+import logging
+import argparse
+
+from loader import dataloader
+from shared import models
+from shared import snapshot
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+
+
+def main(path: str, limit: int = models.ROAS_RANKING_TOP_K) -> None:
+    """
+
+    Export top limit search terms of each campaign structure_value
+    and adgroup alias to a snapshot file at path.
+    """
+    database = dataloader.init_db()
+    manager = models.SearchTerm.manager(database)
+    generation = models.DataGeneration.manager(database).get_generation()
+
+    rankings: t.Dict[str, t.Dict[str, t.List[t.Dict[str, t.Any]]]] = {}
+
+    for by, model in (
+        ("structure_value", models.Campaign),
+        ("alias", models.AdGroup),
+    ):
+        # keys without search terms are exported empty.
+        keys = model.manager(database).values_list(by)
+        ranking = {key: [] for (key,) in keys}
+        for row in manager.get_top_roas(by, limit):
+            ranking.setdefault(row["key"], []).append(row)
+
+        rankings[by] = ranking
+
+    snapshot.write_snapshot(path, rankings, generation=generation, limit=limit)
+
+    logging.info("Exported data generation %s to %s", generation, path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export ROAS snapshot file.")
+    parser.add_argument(
+        "path",
+        help="snapshot file, replaced atomically",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=models.ROAS_RANKING_TOP_K,
+        help="search terms exported per key (default: %(default)s)",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.path, limit=args.limit)
@@ -1,9 +1,12 @@
 import typing as t
 
+import json
 import logging
-import concurrent.futures
+import argparse
 
 from loader import dataloader
+from loader import progress
+from loader import scheduler
 
 
 logging.basicConfig(
@@ -12,43 +15,200 @@ logging.basicConfig(
 )
 
 
-loader_mapping = {
-    "data/campaigns.csv": dataloader.CampaignLoader,
-    "data/search_terms.csv": dataloader.SearchTerm,
-    "data/adgroups.csv": dataloader.AdGroupLoader,
-}
+def main(
+    sources: t.Iterable[str] = ("data",),
+    manifest: t.Optional[str] = None,
+    full_reload: bool = False,
+    chunk_size: int = scheduler.CHUNK_SIZE,
+    ordered: bool = True,
+    max_workers: t.Optional[int] = None,
+    denormalize: bool = False,
+    rankings: bool = True,
+    rollup: bool = True,
+    drop_before: t.Optional[str] = None,
+    bulk_rows: t.Optional[int] = dataloader.BULK_LOAD_ROWS,
+    progress_interval: float = progress.REPORT_INTERVAL,
+    summary: t.Optional[str] = None,
+) -> t.Generator[t.Tuple[scheduler.Chunk, t.Dict[str, t.Any]], None, None]:
+    """
 
+    full_reload loads into staging tables swapped in once all are loaded.
+    denormalize sets campaign structure_value and adgroup alias
+    on search terms, requires ordered. Reloaded campaigns and adgroups
+    values are refreshed on denormalized search terms.
+    rankings refreshes ROAS ranking of loaded campaigns and adgroups.
+    rollup refreshes daily search terms rollup of loaded campaigns.
+    drop_before drops search terms partitions dated before, for retention.
+    bulk_rows is the estimated rows of a model load from which its
+    secondary indexes are rebuilt after loading, None to keep them.
+    progress_interval is the seconds between progress logs of loaded files.
+    summary is a JSON file written with the progress of each loaded file.
+    """
+    if denormalize and not ordered:
+        raise ValueError("denormalize requires an ordered load")
 
-def load_data(
-    *,
-    data_source: str,
-    data_loader: t.Type[dataloader.DataLoader],
-) -> None:
-    logging.info("Loading %s with %s", data_source, data_loader)
-    data_loader(data_source).load()
+    files = scheduler.find_files(sources, manifest)
+    chunks = scheduler.plan(files, chunk_size)
 
+    loader_models = list(dict.fromkeys(_.loader.model for _ in chunks))
 
-def main() -> None:
     dataloader.init_loader()
+    if full_reload:
+        dataloader.init_staging(loader_models)
 
-    with concurrent.futures.ProcessPoolExecutor(
-        max_workers=len(loader_mapping),
-    ) as executor:
-        futures = {
-            executor.submit(
-                load_data,
-                data_source=data_source,
-                data_loader=data_loader,
-            )
-            for data_source, data_loader in loader_mapping.items()
-        }
+    bulk_models = []
+    if bulk_rows is not None and not full_reload:
+        bulk_models = [
+            model
+            for model, rows in scheduler.estimate_rows(chunks).items()
+            if rows >= bulk_rows
+        ]
+        dataloader.init_bulk(bulk_models)
 
-        for future in concurrent.futures.as_completed(futures):
-            yield future.result()
+    touched = {}
+    tracker = progress.Tracker(progress_interval)
+
+    try:
+        for chunk, report in scheduler.run(
+            chunks,
+            ordered=ordered,
+            max_workers=max_workers,
+            tracker=tracker,
+            staging=full_reload,
+            denormalize=denormalize,
+        ):
+            for field, keys in report["touched"].items():
+                if keys is None or field in touched and touched[field] is None:
+                    touched[field] = None
+                else:
+                    touched.setdefault(field, set()).update(keys)
+
+            yield chunk, report
+    finally:
+        dataloader.finish_bulk(bulk_models)
+
+    files_summary = tracker.get_summary()
+    for file_summary in files_summary:
+        logging.info("Loaded %s", json.dumps(file_summary))
+
+    if summary:
+        with open(summary, "w") as file:
+            json.dump(files_summary, file, indent=2)
+
+    if full_reload:
+        dataloader.swap_staging(loader_models)
+    elif any(_.loader.dimension for _ in chunks):
+        dataloader.refresh_denormalized()
+
+    if drop_before and dataloader.drop_partitions(drop_before):
+        # dropped search terms are in rankings of unknown keys.
+        full_reload = True
+
+    if rankings:
+        dataloader.refresh_rankings(None if full_reload else touched)
+
+    if rollup:
+        dataloader.refresh_rollup(None if full_reload else touched)
+
+    dataloader.bump_generation()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load CSV data into database.",
+    )
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        help="directories, glob patterns or files to load (default: data)",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="JSON manifest listing files to load",
+    )
+    parser.add_argument(
+        "--full-reload",
+        action="store_true",
+        help="load into unlogged staging tables and swap them in when done",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=scheduler.CHUNK_SIZE,
+        help="split files larger than this many bytes into chunks",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of loader processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="do not wait for campaigns and adgroups before search terms",
+    )
+    parser.add_argument(
+        "--no-rankings",
+        action="store_true",
+        help="do not refresh ROAS ranking of loaded search terms",
+    )
+    parser.add_argument(
+        "--no-rollup",
+        action="store_true",
+        help="do not refresh daily rollup of loaded search terms",
+    )
+    parser.add_argument(
+        "--drop-before",
+        metavar="YYYY-MM-DD",
+        help="drop search terms partitions dated before, for retention",
+    )
+    parser.add_argument(
+        "--bulk-rows",
+        type=int,
+        default=dataloader.BULK_LOAD_ROWS,
+        help="estimated rows of a table load from which its secondary indexes "
+        "are dropped and rebuilt after loading (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--denormalize",
+        action="store_true",
+        help="set structure_value and alias on search terms",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=progress.REPORT_INTERVAL,
+        help="seconds between progress logs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--summary",
+        help="JSON file written with rows, stages timings and peak memory "
+        "of each loaded file",
+    )
+
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    [r for r in main()]
+    args = parse_args()
+    [
+        r
+        for r in main(
+            args.sources or ([] if args.manifest else ["data"]),
+            manifest=args.manifest,
+            full_reload=args.full_reload,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered,
+            max_workers=args.workers,
+            denormalize=args.denormalize,
+            rankings=not args.no_rankings,
+            rollup=not args.no_rollup,
+            drop_before=args.drop_before,
+            bulk_rows=args.bulk_rows,
+            progress_interval=args.progress_interval,
+            summary=args.summary,
+        )
+    ]
 
     retry_size = dataloader.RETRY_QUEUE.qsize()
     if retry_size:
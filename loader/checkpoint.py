@@ -0,0 +1,133 @@
+import typing as t
+
+import os
+import hashlib
+import operator
+
+from core import database as db
+
+# number of bytes at the start of a file hashed to identify it.
+FINGERPRINT_SIZE = 1024 * 1024
+
+
+class CheckpointManager(db.Manager):
+    def get_checkpoint(
+        self,
+        source: str,
+        target: str,
+        start_offset: int = 0,
+    ) -> t.Optional["LoadCheckpoint"]:
+        """
+
+        Get last committed checkpoint of source chunk loaded into target table.
+        """
+        checkpoint = self.get(
+            source=source,
+            target=target,
+            start_offset=start_offset,
+        )
+
+        return checkpoint or None
+
+    def commit(
+        self,
+        checkpoint: "LoadCheckpoint",
+        cursor: t.Optional[db.cursor] = None,
+    ) -> "LoadCheckpoint":
+        """
+
+        Save checkpoint, in the transaction of cursor if given.
+        """
+        if getattr(checkpoint, "id", None) is None:
+            return self.save(checkpoint, cursor=cursor)
+
+        return self.update(checkpoint, cursor=cursor)
+
+
+class LoadCheckpoint(db.Model):
+    """
+
+    Watermark of a file load.
+
+    byte_offset and row_count are the position right after the last
+    row committed, file_size, file_mtime and file_hash identify the file.
+    start_offset and end_offset delimit the loaded chunk of the file.
+    Offsets of compressed files are in the decompressed data,
+    offsets of columnar files are row numbers.
+    """
+
+    source: str
+    target: str
+    file_size: int
+    file_mtime: float
+    file_hash: str
+    start_offset: int = 0
+    end_offset: int = 0
+    byte_offset: int = 0
+    row_count: int = 0
+    completed: bool = False
+
+    class Meta(db.Model.Meta):
+        table_name = "loadcheckpoint"
+        manager = CheckpointManager
+        natural_key = ("source", "target", "start_offset")
+        fields_database_types = {
+            "source": ("text",),
+            "file_size": ("bigint",),
+            "file_mtime": ("double precision",),
+            "start_offset": ("bigint",),
+            "end_offset": ("bigint",),
+            "byte_offset": ("bigint",),
+            "row_count": ("bigint",),
+        }
+
+    def same_file(self, other: "LoadCheckpoint") -> bool:
+        """
+
+        Check other is a checkpoint of the same file chunk.
+        """
+        identity = operator.attrgetter(
+            "file_size",
+            "file_mtime",
+            "file_hash",
+            "end_offset",
+        )
+
+        return identity(self) == identity(other)
+
+    def advance(self, byte_offset: int, rows: int) -> None:
+        self.byte_offset = byte_offset
+        self.row_count += rows
+
+
+def file_checkpoint(
+    source: str,
+    target: str,
+    start: int = 0,
+    end: t.Optional[int] = None,
+) -> t.Optional[LoadCheckpoint]:
+    """
+
+    Create a fresh checkpoint identifying source file chunk,
+    the whole file if end is not given.
+    Returns None if source is not a regular file.
+    """
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+
+    fingerprint = hashlib.sha1()
+    with open(source, "rb") as file:
+        fingerprint.update(file.read(FINGERPRINT_SIZE))
+
+    return LoadCheckpoint(
+        source=os.path.abspath(source),
+        target=target,
+        file_size=stat.st_size,
+        file_mtime=stat.st_mtime,
+        file_hash=fingerprint.hexdigest(),
+        start_offset=start,
+        end_offset=stat.st_size if end is None else end,
+        byte_offset=start,
+    )
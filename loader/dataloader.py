@@ -2,6 +2,8 @@ import typing as t
 
 import os
 import logging
+import datetime
+import itertools
 
 from queue import Queue
 
@@ -9,75 +11,422 @@ from psycopg2.errors import OperationalError
 
 from core import database as db
 from core import dataframe
+from core import metrics
 from shared import models
 
+from loader import progress
+from loader.checkpoint import LoadCheckpoint
+from loader.checkpoint import file_checkpoint
 
 RETRY_QUEUE = Queue(maxsize=100)
 
+# dimension lookups used to denormalize rows, built once per process.
+DIMENSION_MAPS = {}
+
+STAGING_SUFFIX = "_staging"
+
+# estimated rows of a model load from which its secondary indexes
+# are dropped before loading and rebuilt after, see init_bulk.
+BULK_LOAD_ROWS = 1_000_000
+
 
 class DataLoader:
-    def __init__(self, data_source: str) -> None:
+    model: t.Optional[t.Type[db.Model]] = None
+
+    # dimension loaders are loaded before fact loaders.
+    dimension = False
+
+    # fields whose loaded values are reported as touched keys,
+    # dates of date fields, ints of others.
+    touched_fields: t.Tuple[str, ...] = ()
+
+    # rows committed per transaction, a checkpoint is saved with each.
+    batch_size = 10_000
+
+    # fields set from dimensions if denormalize, kept on upserted rows if not.
+    denormalized_fields: t.Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        data_source: str,
+        staging: bool = False,
+        start: int = 0,
+        end: t.Optional[int] = None,
+        denormalize: bool = False,
+    ) -> None:
+        """
+
+        staging loads data_source into the model staging table,
+        see init_staging and swap_staging.
+        start and end limit loading to a chunk of data_source rows,
+        see core.dataframe.split.
+        denormalize enriches rows with fields of loaded dimensions,
+        see SearchTerm loader.
+        """
         self.data_source = data_source
+        self.staging = staging
+        self.start = start
+        self.end = end
+        self.denormalize = denormalize
+
+        # loaded values of touched_fields, None if unknown.
+        self.touched: t.Dict[str, t.Optional[t.Set[int]]] = {
+            _: set() for _ in self.touched_fields
+        }
+
+        # progress of the ongoing load.
+        self.progress: t.Optional[progress.Progress] = None
 
     def get_database(self) -> db.Database:
         return init_db()
 
-    def get_data(self) -> t.Generator[t.Any, None, None]:
-        df = dataframe.CSVFrame(self.data_source)
+    def get_data_manager(self) -> db.Manager:
+        table_name = staging_table_name(self.model) if self.staging else None
+
+        manager = db.Manager(
+            self.get_database(),
+            self.model,
+            table_name=table_name,
+        )
+
+        return manager
+
+    def get_columns(self) -> t.Optional[t.List[str]]:
+        if self.model is None:
+            return None
+
+        return list(self.model.__dataclass_fields__)
+
+    def get_dataframe(
+        self,
+        offset: t.Optional[int] = None,
+    ) -> t.Union[dataframe.CSVFrame, dataframe.ColumnarFrame]:
+        return dataframe.open_frame(
+            self.data_source,
+            offset=self.start if offset is None else offset,
+            end=self.end,
+            columns=self.get_columns(),
+        )
+
+    def get_data(
+        self,
+        df: t.Union[dataframe.CSVFrame, dataframe.ColumnarFrame, None] = None,
+    ) -> t.Generator[t.Any, None, None]:
+        df = df or self.get_dataframe()
 
         headers = df.headers
         for data in df:
             yield dict(zip(headers, data))
 
-    def save_data(self) -> None:
-        model_manager = self.get_data_manager()
+    def get_progress(self) -> progress.Progress:
+        return progress.Progress(self.data_source, start=self.start, end=self.end)
+
+    def get_checkpoint(
+        self,
+        model_manager: db.Manager,
+    ) -> t.Optional[LoadCheckpoint]:
+        """
+
+        Get checkpoint to resume load from.
+        A committed checkpoint is only resumed if the file is unchanged.
+        """
+        checkpoint = file_checkpoint(
+            self.data_source,
+            model_manager.get_table_name(),
+            start=self.start,
+            end=self.end,
+        )
+        if checkpoint is None:
+            return None
+
+        database = model_manager.database
+        db.create_table(database, LoadCheckpoint)
+
+        committed = LoadCheckpoint.manager(database).get_checkpoint(
+            checkpoint.source,
+            checkpoint.target,
+            checkpoint.start_offset,
+        )
+        if committed is None:
+            return checkpoint
+
+        if not committed.same_file(checkpoint):
+            logging.warning("%s changed, loading from start.", self.data_source)
+            checkpoint.id = committed.id
+            return checkpoint
+
+        return committed
+
+    def retry(self, data: t.Dict[str, t.Any], ex: Exception) -> None:
+        logging.error(
+            "Error:%s for Loader:%s , Data: %s",
+            repr(ex),
+            self.__class__,
+            data,
+        )
+        if self.progress is not None:
+            self.progress.reject()
+        if not RETRY_QUEUE.full():
+            RETRY_QUEUE.put_nowait((self.__class__, data, ex))
+
+    def save_row(
+        self,
+        model_manager: db.Manager,
+        data: t.Dict[str, t.Any],
+        cursor: db.cursor,
+    ) -> None:
+        try:
+            model = model_manager.model(**data)
+            with db.savepoint(cursor):
+                model_manager.save(model, cursor=cursor)
+        except OperationalError as ex:
+            self.retry(data, ex)
+
+    def get_batches(
+        self,
+        df: t.Union[dataframe.CSVFrame, dataframe.ColumnarFrame],
+    ) -> t.Iterator[t.Any]:
+        """
 
-        for data in self.get_data():
+        Iterate data in batches of rows as dicts.
+        Columnar files loaded into staging are batches of record batches
+        copied as is.
+        """
+        if self.staging and isinstance(df, dataframe.ColumnarFrame):
+            yield from df.batches(self.batch_size)
+            return
+
+        data = self.get_data(df)
+        while True:
+            batch = list(itertools.islice(data, self.batch_size))
+            if not batch:
+                break
+
+            yield batch
+
+    def save_batch(
+        self,
+        model_manager: db.Manager,
+        batch: t.Any,
+        cursor: db.cursor,
+    ) -> None:
+        """
+
+        Upsert batch by the model natural key,
+        models without one are inserted row by row.
+        Rows failing with an OperationalError are rolled back to a savepoint
+        and queued for retry, the rest of the transaction is committed.
+        Staging tables have no indexes to upsert on, batch is copied,
+        into unlogged partitions if the model is partitioned.
+        """
+        partition_by = model_manager.get_partition_by()
+        if self.staging and partition_by:
+            field, _ = partition_by
+            if isinstance(batch, list):
+                values = [data[field] for data in batch]
+            else:
+                values = batch.column(field).to_pylist()
+
+            model_manager.create_partitions(values, unlogged=True)
+
+        if self.staging and not isinstance(batch, list):
             try:
-                model = model_manager.model(**data)
-                model_manager.save(model)
+                with db.savepoint(cursor):
+                    model_manager.copy_from(
+                        dataframe.ColumnarFrame.to_csv(batch),
+                        batch.schema.names,
+                        cursor=cursor,
+                    )
             except OperationalError as ex:
-                logging.error(
-                    "Error:%s for Loader:%s , Data: %s",
-                    repr(ex),
-                    self.__class__,
-                    data,
+                for data in batch.to_pylist():
+                    self.retry(data, ex)
+            return
+
+        if self.staging:
+            try:
+                models = [model_manager.model(**data) for data in batch]
+                with db.savepoint(cursor):
+                    model_manager.copy_many(models, cursor=cursor)
+            except OperationalError as ex:
+                for data in batch:
+                    self.retry(data, ex)
+            return
+
+        if not model_manager.get_natural_key():
+            for data in batch:
+                self.save_row(model_manager, data, cursor)
+            return
+
+        keep = () if self.denormalize else self.denormalized_fields
+        try:
+            models = [model_manager.model(**data) for data in batch]
+            with db.savepoint(cursor):
+                model_manager.upsert_many(models, cursor=cursor, keep=keep)
+        except OperationalError as ex:
+            for data in batch:
+                self.retry(data, ex)
+
+    def touch(self, batch: t.Any) -> None:
+        for field, keys in self.touched.items():
+            if keys is None:
+                continue
+            if isinstance(batch, list):
+                coerce = (
+                    db.to_date
+                    if self.model.__dataclass_fields__[field].type is datetime.date
+                    else int
                 )
-                if not RETRY_QUEUE.full():
-                    RETRY_QUEUE.put_nowait((self.__class__, data, ex))
+                keys.update(coerce(_[field]) for _ in batch)
+            else:
+                keys.update(batch.column(field).to_pylist())
 
-    def load(self) -> None:
-        self.save_data()
+    def save_data(self) -> None:
+        model_manager = self.get_data_manager()
+        checkpoint = self.get_checkpoint(model_manager)
 
+        if checkpoint is None:
+            df = self.get_dataframe()
+        elif checkpoint.completed:
+            logging.info("%s already loaded.", self.data_source)
+            return
+        else:
+            if checkpoint.row_count:
+                logging.info(
+                    "Resuming %s after row %s.",
+                    self.data_source,
+                    checkpoint.row_count,
+                )
+                # keys loaded before the interruption are unknown.
+                self.touched = dict.fromkeys(self.touched_fields)
+            df = self.get_dataframe(offset=checkpoint.byte_offset)
 
-class CampaignLoader(DataLoader):
-    def get_data_manager(self) -> db.Manager:
-        manager = db.Manager(
-            self.get_database(),
-            models.Campaign,
-        )
+        checkpoints = LoadCheckpoint.manager(model_manager.database)
 
-        return manager
+        if self.progress is None:
+            self.progress = self.get_progress()
 
+        batches = self.get_batches(df)
+        while True:
+            with metrics.timed("read"):
+                batch = next(batches, None)
+            if batch is None:
+                break
 
-class AdGroupLoader(DataLoader):
-    def get_data_manager(self) -> db.Manager:
-        manager = db.Manager(
-            self.get_database(),
-            models.AdGroup,
-        )
+            self.progress.read(len(batch), df.position)
+            rejected = self.progress.rows_rejected
 
-        return manager
+            with model_manager.database.transact() as cursor:
+                with metrics.timed("write"):
+                    self.save_batch(model_manager, batch, cursor)
+                self.touch(batch)
+
+                if checkpoint is not None:
+                    checkpoint.advance(df.position, len(batch))
+                    checkpoints.commit(checkpoint, cursor=cursor)
+
+            self.progress.write(len(batch) - (self.progress.rows_rejected - rejected))
+            self.progress.report()
+
+        if checkpoint is not None:
+            checkpoint.completed = True
+            checkpoints.commit(checkpoint)
+
+    def load(self) -> t.Dict[str, t.Any]:
+        """
+
+        Load data, returns a report of the load:
+        touched keys and the final progress report,
+        with seconds spent reading, writing and in database transactions.
+        """
+        self.progress = self.get_progress()
+
+        token = metrics.TIMINGS.set(self.progress.timings)
+        try:
+            self.save_data()
+        finally:
+            metrics.TIMINGS.reset(token)
+
+        return {"touched": self.touched, "progress": self.progress.finish()}
+
+
+class CampaignLoader(DataLoader):
+    model = models.Campaign
+    dimension = True
+
+
+class AdGroupLoader(DataLoader):
+    model = models.AdGroup
+    dimension = True
 
 
 class SearchTerm(DataLoader):
-    def get_data_manager(self) -> db.Manager:
-        manager = db.Manager(
-            self.get_database(),
-            models.SearchTerm,
+    model = models.SearchTerm
+    touched_fields = (*models.RoasRankingManager.ranked_fields, "date")
+    denormalized_fields = ("structure_value", "alias")
+
+    def get_dimension_maps(
+        self,
+    ) -> t.Tuple[t.Dict[int, str], t.Dict[int, str]]:
+        """
+
+        Get campaign_id to structure_value and ad_group_id to alias maps
+        from the loaded campaigns and adgroups.
+        """
+        dimensions = (
+            (models.Campaign, "campaign_id", "structure_value"),
+            (models.AdGroup, "ad_group_id", "alias"),
         )
+        maps = []
 
-        return manager
+        for model, key, value in dimensions:
+            table_name = staging_table_name(model) if self.staging else None
+            manager = db.Manager(self.get_database(), model, table_name=table_name)
+
+            cache_key = (manager.get_table_name(), key, value)
+            if cache_key not in DIMENSION_MAPS:
+                DIMENSION_MAPS[cache_key] = dict(manager.values_list(key, value))
+
+            maps.append(DIMENSION_MAPS[cache_key])
+
+        return tuple(maps)
+
+    def get_batches(
+        self,
+        df: t.Union[dataframe.CSVFrame, dataframe.ColumnarFrame],
+    ) -> t.Iterator[t.Any]:
+        """
+
+        Iterate batches, with structure_value and alias
+        of each search term set if denormalize.
+        """
+        if not self.denormalize:
+            yield from super().get_batches(df)
+            return
+
+        campaigns, adgroups = self.get_dimension_maps()
+
+        for batch in super().get_batches(df):
+            if isinstance(batch, list):
+                for data in batch:
+                    data["structure_value"] = campaigns.get(int(data["campaign_id"]))
+                    data["alias"] = adgroups.get(int(data["ad_group_id"]))
+
+                yield batch
+                continue
+
+            columns = {
+                _: batch.column(_)
+                for _ in batch.schema.names
+                if _ not in ("structure_value", "alias")
+            }
+            columns["structure_value"] = [
+                campaigns.get(_) for _ in batch.column("campaign_id").to_pylist()
+            ]
+            columns["alias"] = [
+                adgroups.get(_) for _ in batch.column("ad_group_id").to_pylist()
+            ]
+
+            yield dataframe.import_pyarrow().RecordBatch.from_pydict(columns)
 
 
 def init_db() -> db.Database:
@@ -96,3 +445,175 @@ def init_loader() -> None:
     db.create_table(database, models.Campaign)
     db.create_table(database, models.AdGroup)
     db.create_table(database, models.SearchTerm)
+    db.create_table(database, models.RoasRanking)
+    db.create_table(database, models.CampaignRollup)
+    db.create_table(database, models.DataGeneration)
+    db.create_table(database, LoadCheckpoint)
+
+
+def staging_table_name(model: t.Type[db.Model]) -> str:
+    return db.Manager(None, model).get_table_name() + STAGING_SUFFIX
+
+
+def init_staging(loader_models: t.Iterable[t.Type[db.Model]]) -> None:
+    """
+
+    Create UNLOGGED staging tables, without indexes, for a full reload.
+    Existing staging tables are kept so an interrupted reload resumes.
+    """
+    database = init_db()
+
+    for model in loader_models:
+        db.create_table(
+            database,
+            model,
+            table_name=staging_table_name(model),
+            unlogged=True,
+            indexes=False,
+        )
+
+
+def swap_staging(loader_models: t.Iterable[t.Type[db.Model]]) -> None:
+    """
+
+    Index and analyze staging tables of a full reload,
+    then swap them in place of the live tables in one transaction.
+    """
+    database = init_db()
+    tables = {}
+
+    for model in loader_models:
+        table_name = staging_table_name(model)
+
+        logging.info("Indexing %s", table_name)
+        manager = db.Manager(database, model, table_name=table_name)
+        manager.delete_duplicates()
+        for name in [table_name, *(manager.get_partitions() or ())]:
+            database.execute(f"ALTER TABLE {name} SET LOGGED")
+        db.create_indexes(database, model, table_name=table_name)
+        database.execute(f"ANALYZE {table_name}")
+
+        tables[db.Manager(database, model).get_table_name()] = table_name
+
+    with database.transact() as cursor:
+        # staging tables are consumed, next reload starts over.
+        cursor.execute(
+            f"DELETE FROM {LoadCheckpoint.manager().get_table_name()} "
+            "WHERE target IN %s",
+            (tuple(tables.values()),),
+        )
+        db.swap_tables(database, tables, cursor=cursor)
+
+
+def init_bulk(loader_models: t.Iterable[t.Type[db.Model]]) -> None:
+    """
+
+    Drop secondary indexes of a bulk load, rebuilt by finish_bulk.
+    An interrupted bulk load gets them back with init_loader.
+    """
+    database = init_db()
+
+    for model in loader_models:
+        for name in db.drop_indexes(database, model):
+            logging.info("Dropped index %s", name)
+
+
+def finish_bulk(loader_models: t.Iterable[t.Type[db.Model]]) -> None:
+    """
+
+    Rebuild indexes dropped by init_bulk without blocking readers
+    and writers, then analyze the loaded tables.
+    """
+    database = init_db()
+
+    for model in loader_models:
+        table_name = db.Manager(database, model).get_table_name()
+
+        logging.info("Indexing %s", table_name)
+        db.create_indexes(database, model, concurrently=True)
+        database.execute(f"ANALYZE {table_name}")
+
+
+def refresh_rankings(
+    touched: t.Optional[t.Dict[str, t.Optional[t.Set[int]]]] = None,
+) -> None:
+    """
+
+    Refresh ROAS ranking of touched keys by field, all keys if not given,
+    in a single transaction.
+    """
+    database = init_db()
+    manager = models.RoasRanking.manager(database)
+
+    with database.transact() as cursor:
+        for field in manager.ranked_fields:
+            keys = None if touched is None else touched.get(field)
+            if keys is not None and not keys:
+                continue
+
+            logging.info("Ranking search terms by %s", field)
+            manager.refresh(field, keys, cursor=cursor)
+
+
+def refresh_rollup(
+    touched: t.Optional[t.Dict[str, t.Optional[t.Set[t.Any]]]] = None,
+) -> None:
+    """
+
+    Refresh daily rollup of touched campaigns and dates, all if not given.
+    """
+    database = init_db()
+    manager = models.CampaignRollup.manager(database)
+
+    keys = dates = None
+    if touched is not None:
+        # missing if no search terms were loaded.
+        keys = touched.get("campaign_id", set())
+        dates = touched.get("date", set())
+
+    if keys is not None and not keys or dates is not None and not dates:
+        return
+
+    logging.info("Rolling up search terms by campaign and day")
+    manager.refresh(keys, dates)
+
+
+def refresh_denormalized() -> None:
+    """
+
+    Refresh campaigns and adgroups values denormalized on search terms,
+    eg: after they are reloaded.
+    """
+    # dimension lookups of later loads are rebuilt.
+    DIMENSION_MAPS.clear()
+
+    logging.info("Refreshing denormalized search terms")
+    models.SearchTerm.manager(init_db()).refresh_denormalized()
+
+
+def drop_partitions(before: t.Any) -> t.List[str]:
+    """
+
+    Drop search terms and rollup partitions dated before, for retention.
+    Returns dropped partitions names.
+    """
+    database = init_db()
+    dropped = []
+
+    for model in (models.SearchTerm, models.CampaignRollup):
+        for name in model.manager(database).drop_partitions(before):
+            logging.info("Dropped partition %s", name)
+            dropped.append(name)
+
+    return dropped
+
+
+def bump_generation() -> int:
+    """
+
+    Bump data generation so readers caching data refresh it.
+    """
+    generation = models.DataGeneration.manager(init_db()).bump()
+    logging.info("Data generation %s", generation)
+
+    return generation
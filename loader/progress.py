@@ -0,0 +1,353 @@
+import typing as t
+
+import os
+import time
+import queue
+import logging
+import resource
+import threading
+import multiprocessing
+
+from core import dataframe
+from core import metrics
+
+# seconds between progress reports, set by init_worker in workers.
+REPORT_INTERVAL = 10.0
+
+# reports sender of a worker process, see init_worker,
+# reports are logged in the process without it.
+REPORTER: t.Optional[t.Callable[[t.Dict[str, t.Any]], None]] = None
+
+
+def init_worker(reports: t.Any, interval: float = REPORT_INTERVAL) -> None:
+    """
+
+    Send progress reports of a pool worker to the parent queue reports,
+    every interval seconds.
+    """
+    global REPORTER, REPORT_INTERVAL
+
+    REPORTER = reports.put
+    REPORT_INTERVAL = interval
+
+
+def get_peak_rss() -> int:
+    """
+
+    Get peak resident memory of the process in bytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_file_size(filename: str) -> int:
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def format_duration(seconds: t.Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+def format_report(report: t.Dict[str, t.Any]) -> str:
+    return (
+        "{name}: {rows_read} rows read, {rows_written} written, "
+        "{rows_rejected} rejected, {mb:.1f}/{size_mb:.1f} MB ({percent:.1f}%), "
+        "{rate:.0f} rows/s (average {average_rate:.0f}), ETA {eta}"
+    ).format(
+        **{
+            **report,
+            "name": os.path.basename(report["source"]),
+            "mb": report["bytes"] / 1e6,
+            "size_mb": report["size"] / 1e6,
+            "percent": 100 * report["bytes"] / report["size"]
+            if report["size"]
+            else 100,
+            "eta": format_duration(report.get("eta")),
+        }
+    )
+
+
+class Progress:
+    """
+
+    Progress of a loader chunk, reported every interval seconds.
+
+    Bytes of plain CSV files are their read position, other files
+    are read from decompressed data or in rows and are prorated
+    from the rows read over the estimated rows.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        start: int = 0,
+        end: t.Optional[int] = None,
+        interval: t.Optional[float] = None,
+    ) -> None:
+        self.source = source
+        self.start = start
+        self.end = end
+        self.interval = REPORT_INTERVAL if interval is None else interval
+
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.position = start
+        self.done = False
+
+        # by byte position, else by rows read.
+        self.by_position = not (
+            dataframe.get_compression(source) or dataframe.get_columnar_format(source)
+        )
+        self.size = self.get_size()
+        self.estimated_rows = 0
+        if not self.by_position:
+            self.estimated_rows = dataframe.estimate_rows(source, start, end)
+
+        # seconds by stage, db time is added by database transactions.
+        self.timings = metrics.Timings()
+        self.started = time.time()
+
+        self._reported = time.perf_counter()
+        self._reported_rows = 0
+
+    def get_size(self) -> int:
+        """
+
+        Get bytes of the chunk, 0 if unknown.
+        """
+        size = get_file_size(self.source)
+        if not size:
+            return 0
+
+        if dataframe.get_columnar_format(self.source):
+            rows = dataframe.estimate_rows(self.source)
+            end = rows if self.end is None else self.end
+            return size * (end - self.start) // rows if rows else size
+
+        if dataframe.get_compression(self.source):
+            return size
+
+        return (size if self.end is None else self.end) - self.start
+
+    def get_bytes(self) -> int:
+        if self.done:
+            return self.size
+
+        if self.by_position:
+            return min(self.position - self.start, self.size)
+
+        if not self.estimated_rows:
+            return 0
+
+        return min(self.size * self.rows_read // self.estimated_rows, self.size)
+
+    def read(self, rows: int, position: int) -> None:
+        self.rows_read += rows
+        self.position = position
+
+    def write(self, rows: int) -> None:
+        self.rows_written += rows
+
+    def reject(self, rows: int = 1) -> None:
+        self.rows_rejected += rows
+
+    def get_report(self) -> t.Dict[str, t.Any]:
+        now = time.perf_counter()
+        elapsed = self.timings.get_elapsed()
+        size, consumed = self.size, self.get_bytes()
+
+        interval = now - self._reported
+        rate = (self.rows_written - self._reported_rows) / interval if interval else 0.0
+
+        eta = None
+        if consumed:
+            eta = elapsed * (size - consumed) / consumed
+
+        return {
+            "source": self.source,
+            "start": self.start,
+            "end": self.end,
+            "size": size,
+            "bytes": consumed,
+            "rows_read": self.rows_read,
+            "rows_written": self.rows_written,
+            "rows_rejected": self.rows_rejected,
+            "started": self.started,
+            "elapsed": elapsed,
+            "rate": rate,
+            "average_rate": self.rows_written / elapsed if elapsed else 0.0,
+            "eta": eta,
+            "stages": dict(self.timings.phases),
+            "peak_rss": get_peak_rss(),
+            "pid": os.getpid(),
+            "done": self.done,
+        }
+
+    def report(self, force: bool = False) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+
+        Report progress if interval seconds passed since the last report.
+        """
+        if not force and time.perf_counter() - self._reported < self.interval:
+            return None
+
+        report = self.get_report()
+        self._reported = time.perf_counter()
+        self._reported_rows = self.rows_written
+
+        if REPORTER is not None:
+            REPORTER(report)
+        elif not self.done:
+            logging.info(format_report(report))
+
+        return report
+
+    def finish(self) -> t.Dict[str, t.Any]:
+        self.done = True
+
+        return self.report(force=True)
+
+
+class Tracker:
+    """
+
+    Aggregate progress reports of chunks loaded by pool workers,
+    sent through the queue reports, and log them by file
+    every interval seconds.
+    """
+
+    def __init__(self, interval: float = REPORT_INTERVAL) -> None:
+        self.interval = interval
+        self.reports: t.Any = multiprocessing.Queue()
+
+        # last report by file and chunk start.
+        self.chunks: t.Dict[str, t.Dict[int, t.Dict[str, t.Any]]] = {}
+        self._lock = threading.Lock()
+        self._thread: t.Optional[threading.Thread] = None
+
+        # rows written of files and when, at the last log.
+        self._logged: t.Dict[str, t.Tuple[float, int]] = {}
+
+    def update(self, report: t.Dict[str, t.Any]) -> None:
+        with self._lock:
+            chunks = self.chunks.setdefault(report["source"], {})
+
+            current = chunks.get(report["start"])
+            # reports of done chunks may arrive after their final report.
+            if current is None or not current["done"]:
+                chunks[report["start"]] = report
+
+    def get_file(self, source: str) -> t.Dict[str, t.Any]:
+        """
+
+        Get progress of a file, summed over its reported chunks.
+        Stages seconds are summed over workers, peak memory is the maximum
+        of the workers, and elapsed seconds span from the first chunk start.
+        """
+        with self._lock:
+            reports = list(self.chunks[source].values())
+
+        summed = ("size", "bytes", "rows_read", "rows_written", "rows_rejected")
+        result = {
+            "source": source,
+            "chunks": len(reports),
+            **{key: sum(_[key] for _ in reports) for key in summed},
+            "stages": {},
+            "peak_rss": max(_["peak_rss"] for _ in reports),
+            "done": all(_["done"] for _ in reports),
+        }
+        for report in reports:
+            for stage, seconds in report["stages"].items():
+                result["stages"][stage] = result["stages"].get(stage, 0.0) + seconds
+
+        # chunks not yet reported are unknown, file size bounds the size.
+        if not dataframe.get_columnar_format(source):
+            result["size"] = max(result["size"], get_file_size(source))
+
+        started = min(_["started"] for _ in reports)
+        finished = max(_["started"] + _["elapsed"] for _ in reports)
+        elapsed = (finished if result["done"] else time.time()) - started
+
+        if result["done"]:
+            result["bytes"] = result["size"]
+
+        result["elapsed"] = elapsed
+        result["average_rate"] = result["rows_written"] / elapsed if elapsed else 0.0
+        result["eta"] = None
+        if result["bytes"]:
+            result["eta"] = (
+                elapsed * (result["size"] - result["bytes"]) / result["bytes"]
+            )
+
+        return result
+
+    def log(self) -> None:
+        now = time.perf_counter()
+
+        for source in list(self.chunks):
+            result = self.get_file(source)
+            if result["done"]:
+                continue
+
+            result["rate"] = result["average_rate"]
+            if source in self._logged:
+                logged, rows = self._logged[source]
+                result["rate"] = (result["rows_written"] - rows) / (now - logged)
+            self._logged[source] = (now, result["rows_written"])
+
+            logging.info(format_report(result))
+
+    def _consume(self) -> None:
+        logged = time.perf_counter()
+
+        while True:
+            timeout = max(0.0, logged + self.interval - time.perf_counter())
+            try:
+                report = self.reports.get(timeout=timeout)
+            except queue.Empty:
+                report = False
+
+            if report is None:
+                return
+
+            if report:
+                self.update(report)
+
+            if time.perf_counter() - logged >= self.interval:
+                self.log()
+                logged = time.perf_counter()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self.reports.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def get_summary(self) -> t.List[t.Dict[str, t.Any]]:
+        """
+
+        Get progress of files, eg: once loaded.
+        """
+        summary = []
+
+        for source in list(self.chunks):
+            result = self.get_file(source)
+            for key in ("eta", "done"):
+                result.pop(key)
+
+            summary.append(result)
+
+        return summary
@@ -0,0 +1,236 @@
+import typing as t
+
+import os
+import glob
+import json
+import fnmatch
+import logging
+import concurrent.futures
+
+from dataclasses import dataclass
+
+from core import dataframe
+from loader import dataloader
+from loader import progress
+
+
+# file name patterns mapped to loaders, first match wins,
+# matching csv, compressed csv and columnar files.
+LOADER_PATTERNS = (
+    ("*campaign*", dataloader.CampaignLoader),
+    ("*adgroup*", dataloader.AdGroupLoader),
+    ("*search_term*", dataloader.SearchTerm),
+)
+
+# files larger than this are split into chunks of about this size.
+CHUNK_SIZE = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+
+    Byte range of a file to be loaded by loader.
+    """
+
+    data_source: str
+    loader: t.Type[dataloader.DataLoader]
+    start: int = 0
+    end: t.Optional[int] = None
+    size: int = 0
+
+
+def get_loader(path: str) -> t.Optional[t.Type[dataloader.DataLoader]]:
+    name = os.path.basename(path).lower()
+
+    for pattern, loader in LOADER_PATTERNS:
+        if fnmatch.fnmatch(name, pattern):
+            return loader
+
+    return None
+
+
+def read_manifest(
+    manifest: str,
+) -> t.List[t.Tuple[str, t.Optional[t.Type[dataloader.DataLoader]]]]:
+    """
+
+    Read a JSON manifest listing files to load.
+    Entries are a path or {"path": ..., "loader": ...}
+    where loader is a loader class name in loader.dataloader.
+    Relative paths are relative to the manifest.
+    """
+    with open(manifest) as file:
+        entries = json.load(file)
+
+    root = os.path.dirname(manifest)
+    files = []
+
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+
+        path = os.path.join(root, entry["path"])
+        loader = entry.get("loader")
+        files.append((path, loader and getattr(dataloader, loader)))
+
+    return files
+
+
+def find_files(
+    sources: t.Iterable[str],
+    manifest: t.Optional[str] = None,
+) -> t.List[t.Tuple[str, t.Type[dataloader.DataLoader]]]:
+    """
+
+    Resolve directories, glob patterns, files and manifest
+    into files paired with their loader.
+    Files not matching any loader pattern are skipped.
+    """
+    candidates = read_manifest(manifest) if manifest else []
+
+    for source in sources:
+        paths = sorted(glob.glob(source)) if glob.has_magic(source) else [source]
+
+        for path in paths:
+            if os.path.isdir(path):
+                candidates.extend(
+                    (os.path.join(path, _), None)
+                    for _ in sorted(os.listdir(path))
+                    if os.path.isfile(os.path.join(path, _))
+                )
+            else:
+                candidates.append((path, None))
+
+    files = []
+    for path, loader in candidates:
+        loader = loader or get_loader(path)
+        if loader is None:
+            logging.warning("No loader for %s, skipping.", path)
+            continue
+
+        files.append((path, loader))
+
+    return files
+
+
+def plan(
+    files: t.Iterable[t.Tuple[str, t.Type[dataloader.DataLoader]]],
+    chunk_size: int = CHUNK_SIZE,
+) -> t.List[Chunk]:
+    """
+
+    Split files into chunks, largest first.
+    Compressed files can not be split and are a single chunk.
+    """
+    chunks = []
+
+    for path, loader in files:
+        size = os.path.getsize(path)
+
+        if size <= chunk_size or dataframe.get_compression(path):
+            chunks.append(Chunk(path, loader, size=size))
+            continue
+
+        ranges = dataframe.split(path, chunk_size)
+        # ranges are rows for columnar files, size is prorated.
+        total = ranges[-1][1] - ranges[0][0]
+
+        for start, end in ranges:
+            chunks.append(
+                Chunk(path, loader, start, end, size * (end - start) // total)
+            )
+
+    return sorted(chunks, key=lambda _: _.size, reverse=True)
+
+
+def estimate_rows(chunks: t.Iterable[Chunk]) -> t.Dict[t.Type[t.Any], int]:
+    """
+
+    Estimate rows to be loaded per model.
+    """
+    rows = {}
+
+    for chunk in chunks:
+        estimate = dataframe.estimate_rows(chunk.data_source, chunk.start, chunk.end)
+        rows[chunk.loader.model] = rows.get(chunk.loader.model, 0) + estimate
+
+    return rows
+
+
+def load_chunk(chunk: Chunk, **options) -> t.Tuple[Chunk, t.Dict[str, t.Any]]:
+    """
+
+    Load chunk, options are passed to the chunk loader.
+    Returns chunk and the loader report.
+    """
+    logging.info(
+        "Loading %s [%s:%s] with %s",
+        chunk.data_source,
+        chunk.start,
+        chunk.end if chunk.end is not None else "",
+        chunk.loader,
+    )
+    report = chunk.loader(
+        chunk.data_source,
+        start=chunk.start,
+        end=chunk.end,
+        **options,
+    ).load()
+
+    return chunk, report
+
+
+def run(
+    chunks: t.List[Chunk],
+    ordered: bool = True,
+    max_workers: t.Optional[int] = None,
+    tracker: t.Optional[progress.Tracker] = None,
+    **options,
+) -> t.Generator[t.Tuple[Chunk, t.Dict[str, t.Any]], None, None]:
+    """
+
+    Load chunks on a process pool capped at the CPU count,
+    yields loaded chunks with their loader report.
+    options are passed to the chunk loaders.
+    Idle workers pick the next largest pending chunk.
+    If ordered, dimension chunks are all loaded before fact chunks.
+    Workers progress reports are aggregated by tracker if given.
+    """
+    if not chunks:
+        return
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+
+    if ordered:
+        phases = [
+            [_ for _ in chunks if _.loader.dimension],
+            [_ for _ in chunks if not _.loader.dimension],
+        ]
+    else:
+        phases = [chunks]
+
+    initializer, initargs = None, ()
+    if tracker is not None:
+        initializer = progress.init_worker
+        initargs = (tracker.reports, tracker.interval)
+        tracker.start()
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=initializer,
+            initargs=initargs,
+        ) as executor:
+            for phase in phases:
+                futures = [executor.submit(load_chunk, _, **options) for _ in phase]
+
+                for future in concurrent.futures.as_completed(futures):
+                    chunk, report = future.result()
+                    if tracker is not None:
+                        tracker.update(report["progress"])
+
+                    yield chunk, report
+    finally:
+        if tracker is not None:
+            tracker.stop()
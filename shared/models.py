@@ -6,6 +6,30 @@ import decimal
 from core import database
 
 
+def get_data_generation(db: database.Database) -> int:
+    return DataGeneration.manager(db).get_generation()
+
+
+def get_dates_clause(
+    date_from: t.Optional[datetime.date] = None,
+    date_to: t.Optional[datetime.date] = None,
+) -> t.Tuple[str, t.Tuple[datetime.date, ...]]:
+    """
+
+    Get AND clause and args of dates between date_from and date_to, inclusive.
+    """
+    dates_clause = ""
+    dates_args: t.Tuple[datetime.date, ...] = ()
+    if date_from is not None:
+        dates_clause += " AND date >= %s"
+        dates_args += (date_from,)
+    if date_to is not None:
+        dates_clause += " AND date <= %s"
+        dates_args += (date_to,)
+
+    return dates_clause, dates_args
+
+
 class AdGroup(database.Model):
     ad_group_id: int
     campaign_id: int
@@ -13,6 +37,9 @@ class AdGroup(database.Model):
     status: str
 
     class Meta(database.Model.Meta):
+        natural_key = ("ad_group_id",)
+        indexes = (("alias",),)
+        cache = database.Cache(lookups=("alias",), generation=get_data_generation)
         fields_database_types = {
             "ad_group_id": ("bigint",),
             "campaign_id": ("bigint",),
@@ -25,6 +52,12 @@ class Campaign(database.Model):
     status: str
 
     class Meta(database.Model.Meta):
+        natural_key = ("campaign_id",)
+        indexes = (("structure_value",),)
+        cache = database.Cache(
+            lookups=("structure_value",),
+            generation=get_data_generation,
+        )
         fields_database_types = {
             "campaign_id": ("bigint",),
         }
@@ -67,18 +100,156 @@ class SearchTermManager(database.Manager):
 
         return search_terms
 
+    def _get_denormalized_roas(self, field: str, value: str, limit=1):
+        """
+
+        Get ROAS by a campaign or adgroup field denormalized on search terms.
+        """
+        query = (
+            f"SELECT * FROM {self.get_table_name()} "
+            f"WHERE {field} = %s AND conversion_value > 0 AND cost > 0 "
+            "ORDER BY conversion_value / cost DESC LIMIT %s"
+        )
+
+        return self.query(query, (value, limit))
+
+    def refresh_denormalized(self, cursor: t.Optional[database.cursor] = None) -> None:
+        """
+
+        Set structure_value and alias of search terms to the current ones
+        of their campaign and adgroup, only on denormalized search terms.
+        """
+        table_name = self.get_table_name()
+        dimensions = (
+            (Campaign, "campaign_id", "structure_value"),
+            (AdGroup, "ad_group_id", "alias"),
+        )
+
+        with self._transact(cursor) as cursor:
+            for model, key, field in dimensions:
+                cursor.execute(
+                    f"UPDATE {table_name} s SET {field} = d.{field} "
+                    f"FROM {model.manager().get_table_name()} d "
+                    f"WHERE s.{key} = d.{key} AND s.{field} IS NOT NULL "
+                    f"AND s.{field} IS DISTINCT FROM d.{field}"
+                )
+
+    def get_roas_by_structure_value(
+        self,
+        structure_value: str,
+        limit,
+    ):
+        return self._get_denormalized_roas("structure_value", structure_value, limit)
+
+    def get_roas_by_alias(
+        self,
+        alias: str,
+        limit,
+    ):
+        return self._get_denormalized_roas("alias", alias, limit)
+
+    def get_top_roas(self, by: str, limit) -> t.List[t.Dict[str, t.Any]]:
+        """
+
+        Get top search terms of each campaign structure_value or adgroup alias,
+        as rows with the structure_value or alias as key, ordered by key.
+        """
+        if by == "structure_value":
+            dimension_table_name = Campaign.manager().get_table_name()
+            dimension_key = "campaign_id"
+        elif by == "alias":
+            dimension_table_name = AdGroup.manager().get_table_name()
+            dimension_key = "ad_group_id"
+        else:
+            raise ValueError(f"Unexpected value {by}.")
+
+        query = (
+            "SELECT * FROM ("
+            f"SELECT d.{by} AS key, s.*, row_number() OVER ("
+            f"PARTITION BY d.{by} ORDER BY s.conversion_value / s.cost DESC"
+            ") AS rank "
+            f"FROM {self.get_table_name()} s JOIN {dimension_table_name} d "
+            f"ON s.{dimension_key} = d.{dimension_key} "
+            "WHERE s.conversion_value > 0 AND s.cost > 0"
+            ") ranked WHERE rank <= %s ORDER BY key, rank"
+        )
+
+        return self.query_rows(query, (limit,))
+
+    def _get_dated_roas(
+        self,
+        field: str,
+        keys: t.Tuple[int, ...],
+        *,
+        date_from: t.Optional[datetime.date] = None,
+        date_to: t.Optional[datetime.date] = None,
+        group: t.Optional[str] = None,
+        limit=1,
+    ):
+        """
+
+        Get ROAS of search terms between dates, inclusive,
+        monthly partitions out of the dates are not scanned.
+        group=search_term ranks search terms totals over the dates,
+        totals have no date.
+        """
+        if group not in (None, "search_term"):
+            raise ValueError(f"Unexpected group {group}.")
+
+        dates_clause, dates_args = get_dates_clause(date_from, date_to)
+
+        if group is None:
+            query = (
+                f"SELECT * FROM {self.get_table_name()} "
+                f"WHERE {field} = ANY(%s) {dates_clause} "
+                "AND conversion_value > 0 AND cost > 0 "
+                "ORDER BY conversion_value / cost DESC LIMIT %s"
+            )
+        else:
+            query = (
+                "SELECT NULL::date AS date, campaign_id, ad_group_id, search_term, "
+                "SUM(clicks) AS clicks, SUM(cost) AS cost, "
+                "SUM(conversion_value) AS conversion_value, "
+                "SUM(conversions) AS conversions "
+                f"FROM {self.get_table_name()} "
+                f"WHERE {field} = ANY(%s) {dates_clause} "
+                "GROUP BY campaign_id, ad_group_id, search_term "
+                "HAVING SUM(conversion_value) > 0 AND SUM(cost) > 0 "
+                "ORDER BY SUM(conversion_value) / SUM(cost) DESC LIMIT %s"
+            )
+
+        return self.query(query, (list(keys), *dates_args, limit))
+
     def get_roas_by_adgroup(
         self,
         adgroups: t.List[AdGroup],
         limit,
+        **kwargs,
     ):
+        """
+
+        kwargs are dates and group of _get_dated_roas.
+        """
+        if kwargs:
+            keys = tuple(_.ad_group_id for _ in adgroups)
+            return self._get_dated_roas("ad_group_id", keys, limit=limit, **kwargs)
+
         return self._get_roas(adgroups=adgroups, limit=limit)
 
     def get_roas_by_campaign(
         self,
         campaigns: t.List[Campaign],
         limit,
+        **kwargs,
     ):
+        """
+
+        kwargs are dates and group of _get_dated_roas.
+        """
+        if kwargs:
+            keys = tuple(_.campaign_id for _ in campaigns)
+            return self._get_dated_roas("campaign_id", keys, limit=limit, **kwargs)
+
         return self._get_roas(campaigns=campaigns, limit=limit)
 
 
@@ -91,10 +262,292 @@ class SearchTerm(database.Model):
     conversion_value: decimal.Decimal
     conversions: int
     search_term: str
+    # denormalized from Campaign and AdGroup by the loader.
+    structure_value: str = None
+    alias: str = None
 
     class Meta(database.Model.Meta):
         manager = SearchTermManager
+        natural_key = ("date", "ad_group_id", "search_term")
+        indexes = (
+            ("campaign_id",),
+            ("ad_group_id",),
+            ("structure_value",),
+            ("alias",),
+        )
+        partition_by = ("date", "month")
         fields_database_types = {
             "ad_group_id": ("bigint",),
             "campaign_id": ("bigint",),
         }
+
+
+# search terms ranked per campaign and adgroup in RoasRanking.
+ROAS_RANKING_TOP_K = 100
+
+
+class RoasRankingManager(database.Manager):
+    ranked_fields = ("campaign_id", "ad_group_id")
+
+    def refresh(
+        self,
+        field: str,
+        keys: t.Optional[t.Iterable[int]] = None,
+        cursor: t.Optional[database.cursor] = None,
+    ) -> None:
+        """
+
+        Rank top search terms of field keys, all keys if not given.
+        Readers see previous ranking until the transaction is committed.
+        """
+        if field not in self.ranked_fields:
+            raise ValueError(f"Unexpected field {field}.")
+
+        table_name = self.get_table_name()
+        search_term_table_name = SearchTerm.manager().get_table_name()
+        search_term_fields = (
+            "date",
+            "ad_group_id",
+            "campaign_id",
+            "clicks",
+            "cost",
+            "conversion_value",
+            "conversions",
+            "search_term",
+        )
+
+        if keys is None:
+            delete_clause = search_clause = ""
+            keys_args = ()
+        else:
+            delete_clause = "AND key_value = ANY(%s)"
+            search_clause = f"AND {field} = ANY(%s)"
+            keys_args = (list(keys),)
+
+        delete_query = f"DELETE FROM {table_name} WHERE key_field = %s {delete_clause}"
+        insert_query = (
+            f"INSERT INTO {table_name} "
+            f"(key_field, key_value, rank, roas, {', '.join(search_term_fields)}) "
+            f"SELECT %s, {field}, rank, roas, {', '.join(search_term_fields)} "
+            "FROM ("
+            "SELECT *, conversion_value / cost AS roas, row_number() OVER ("
+            f"PARTITION BY {field} ORDER BY conversion_value / cost DESC"
+            ") AS rank "
+            f"FROM {search_term_table_name} "
+            f"WHERE conversion_value > 0 AND cost > 0 {search_clause}"
+            ") ranked WHERE rank <= %s"
+        )
+
+        with self._transact(cursor) as cursor:
+            cursor.execute(delete_query, (field, *keys_args))
+            cursor.execute(insert_query, (field, *keys_args, ROAS_RANKING_TOP_K))
+
+    def _get_roas(self, field: str, keys: t.Tuple[int, ...], limit=1):
+        """
+
+        Get ROAS from ranking, limit must not exceed ROAS_RANKING_TOP_K.
+        """
+        query = (
+            f"SELECT * FROM {self.get_table_name()} "
+            "WHERE key_field = %s AND key_value = ANY(%s) "
+            "ORDER BY roas DESC LIMIT %s"
+        )
+
+        return self.query(query, (field, list(keys), limit))
+
+    def get_roas_by_adgroup(
+        self,
+        adgroups: t.List[AdGroup],
+        limit,
+    ):
+        keys = tuple(_.ad_group_id for _ in adgroups)
+        return self._get_roas("ad_group_id", keys, limit=limit)
+
+    def get_roas_by_campaign(
+        self,
+        campaigns: t.List[Campaign],
+        limit,
+    ):
+        keys = tuple(_.campaign_id for _ in campaigns)
+        return self._get_roas("campaign_id", keys, limit=limit)
+
+
+class RoasRanking(database.Model):
+    key_field: str
+    key_value: int
+    rank: int
+    roas: decimal.Decimal
+    date: datetime.date
+    ad_group_id: int
+    campaign_id: int
+    clicks: int
+    cost: decimal.Decimal
+    conversion_value: decimal.Decimal
+    conversions: int
+    search_term: str
+
+    class Meta(database.Model.Meta):
+        manager = RoasRankingManager
+        natural_key = ("key_field", "key_value", "rank")
+        fields_database_types = {
+            "key_value": ("bigint",),
+            "ad_group_id": ("bigint",),
+            "campaign_id": ("bigint",),
+        }
+
+
+class CampaignRollupManager(database.Manager):
+    def refresh(
+        self,
+        keys: t.Optional[t.Iterable[int]] = None,
+        dates: t.Optional[t.Iterable[datetime.date]] = None,
+        cursor: t.Optional[database.cursor] = None,
+    ) -> None:
+        """
+
+        Roll search terms of campaign_id keys up per campaign and day,
+        all campaigns if not given, of dates only if given, eg: loaded ones.
+        Readers see previous rollup until the transaction is committed.
+        Missing partitions are created first, outside of cursor transaction.
+        """
+        table_name = self.get_table_name()
+        search_term_table_name = SearchTerm.manager().get_table_name()
+
+        clauses = []
+        where_args: t.Tuple[t.Any, ...] = ()
+        if keys is not None:
+            clauses.append("campaign_id = ANY(%s)")
+            where_args += (list(keys),)
+        if dates is not None:
+            dates = sorted(set(dates))
+            clauses.append("date = ANY(%s)")
+            where_args += (dates,)
+        where_clause = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        if dates is None:
+            with self.database.transact() as months_cursor:
+                months_cursor.execute(
+                    "SELECT DISTINCT date_trunc('month', date)::date AS month "
+                    f"FROM {search_term_table_name} {where_clause}",
+                    where_args,
+                )
+                dates = [_["month"] for _ in months_cursor.fetchall()]
+
+        self.create_partitions(dates)
+
+        delete_query = f"DELETE FROM {table_name} {where_clause}"
+        insert_query = (
+            f"INSERT INTO {table_name} "
+            "(date, campaign_id, clicks, cost, conversion_value, conversions) "
+            "SELECT date, campaign_id, "
+            "SUM(clicks), SUM(cost), SUM(conversion_value), SUM(conversions) "
+            f"FROM {search_term_table_name} {where_clause} "
+            "GROUP BY date, campaign_id"
+        )
+
+        with self._transact(cursor) as cursor:
+            cursor.execute(delete_query, where_args)
+            cursor.execute(insert_query, where_args)
+
+    def get_roas_by_campaign(
+        self,
+        campaigns: t.List[Campaign],
+        limit,
+        *,
+        date_from: t.Optional[datetime.date] = None,
+        date_to: t.Optional[datetime.date] = None,
+    ):
+        """
+
+        Get campaigns totals between dates, inclusive, ranked by ROAS,
+        totals have no date.
+        """
+        dates_clause, dates_args = get_dates_clause(date_from, date_to)
+
+        query = (
+            "SELECT NULL::date AS date, campaign_id, "
+            "SUM(clicks) AS clicks, SUM(cost) AS cost, "
+            "SUM(conversion_value) AS conversion_value, "
+            "SUM(conversions) AS conversions "
+            f"FROM {self.get_table_name()} "
+            f"WHERE campaign_id = ANY(%s) {dates_clause} "
+            "GROUP BY campaign_id "
+            "HAVING SUM(conversion_value) > 0 AND SUM(cost) > 0 "
+            "ORDER BY SUM(conversion_value) / SUM(cost) DESC LIMIT %s"
+        )
+        keys = [_.campaign_id for _ in campaigns]
+
+        return self.query(query, (keys, *dates_args, limit))
+
+
+class CampaignRollup(database.Model):
+    """
+
+    Search terms totals per campaign and day, maintained by the loader.
+    """
+
+    date: datetime.date
+    campaign_id: int
+    clicks: int
+    cost: decimal.Decimal
+    conversion_value: decimal.Decimal
+    conversions: int
+
+    class Meta(database.Model.Meta):
+        manager = CampaignRollupManager
+        natural_key = ("campaign_id", "date")
+        indexes = (("date",),)
+        partition_by = ("date", "month")
+        fields_database_types = {
+            "campaign_id": ("bigint",),
+        }
+
+
+class DataGenerationManager(database.Manager):
+    def get_generation(self, name: str = "search") -> int:
+        """
+
+        Get data generation, 0 before any load.
+        """
+        generation = self.get(name=name)
+
+        return generation.generation if generation else 0
+
+    def bump(
+        self,
+        name: str = "search",
+        cursor: t.Optional[database.cursor] = None,
+    ) -> int:
+        """
+
+        Increment data generation, returns the new generation.
+        """
+        table_name = self.get_table_name()
+        query = (
+            f"INSERT INTO {table_name} (name, generation) VALUES (%s, 1) "
+            f"ON CONFLICT (name) DO UPDATE SET generation = {table_name}.generation + 1 "
+            "RETURNING generation"
+        )
+
+        with self._transact(cursor) as cursor:
+            cursor.execute(query, (name,))
+
+            return cursor.fetchone()["generation"]
+
+
+class DataGeneration(database.Model):
+    """
+
+    Counter bumped by the loader each time data is loaded,
+    for readers caching data to know when to refresh.
+    """
+
+    name: str
+    generation: int
+
+    class Meta(database.Model.Meta):
+        manager = DataGenerationManager
+        natural_key = ("name",)
+        fields_database_types = {
+            "generation": ("bigint",),
+        }
@@ -0,0 +1,291 @@
+import typing as t
+
+import os
+import mmap
+import time
+import struct
+import hashlib
+import datetime
+import tempfile
+
+from shared.models import SearchTerm
+
+# snapshot files start with MAGIC then FORMAT_VERSION,
+# readers reject other versions.
+MAGIC = b"ROASSNAP"
+FORMAT_VERSION = 1
+
+# magic, version, generation, limit, records count, slots count,
+# slots offset, records offset, strings offset.
+HEADER = struct.Struct("<8sIQIIIQQQ")
+
+# key hash, key string offset and length, first record and records count.
+SLOT = struct.Struct("<QIIII")
+EMPTY_SLOT = SLOT.pack(0, 0, 0, 0, 0)
+
+# date ordinal, ad_group_id, campaign_id, clicks, conversions,
+# then cost, conversion_value and search_term string offsets and lengths.
+RECORD = struct.Struct("<iqqqqIIIIII")
+
+# seconds between checks for a renamed in snapshot file.
+CHECK_INTERVAL = 1.0
+
+
+def key_hash(by: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{by}\0{value}".encode(), digest_size=8).digest()
+
+    # 0 marks empty slots.
+    return int.from_bytes(digest, "little") or 1
+
+
+class StringTable:
+    """
+
+    Deduplicated utf-8 strings, addressed by offset and length.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.offsets: t.Dict[str, t.Tuple[int, int]] = {}
+
+    def add(self, value: t.Any) -> t.Tuple[int, int]:
+        value = str(value)
+
+        if value not in self.offsets:
+            encoded = value.encode()
+            self.offsets[value] = (len(self.buffer), len(encoded))
+            self.buffer.extend(encoded)
+
+        return self.offsets[value]
+
+
+def write_snapshot(
+    path: str,
+    rankings: t.Dict[str, t.Dict[str, t.List[t.Dict[str, t.Any]]]],
+    *,
+    generation: int,
+    limit: int,
+) -> None:
+    """
+
+    Write rankings, search terms rows by key by searched field,
+    to a snapshot file replacing path atomically.
+    """
+    strings = StringTable()
+    records = bytearray()
+    keys = []
+
+    for by, ranking in rankings.items():
+        for value, rows in ranking.items():
+            keys.append((by, value, len(records) // RECORD.size, len(rows)))
+
+            for row in rows:
+                records.extend(
+                    RECORD.pack(
+                        row["date"].toordinal(),
+                        row["ad_group_id"],
+                        row["campaign_id"],
+                        row["clicks"],
+                        row["conversions"],
+                        *strings.add(row["cost"]),
+                        *strings.add(row["conversion_value"]),
+                        *strings.add(row["search_term"]),
+                    )
+                )
+
+    slots_count = 1
+    while slots_count < 2 * len(keys):
+        slots_count *= 2
+
+    slots = [EMPTY_SLOT] * slots_count
+    for by, value, start, count in keys:
+        hash = key_hash(by, value)
+        index = hash & (slots_count - 1)
+        while slots[index] != EMPTY_SLOT:
+            index = (index + 1) & (slots_count - 1)
+
+        slots[index] = SLOT.pack(hash, *strings.add(f"{by}\0{value}"), start, count)
+
+    slots_offset = HEADER.size
+    records_offset = slots_offset + slots_count * SLOT.size
+    strings_offset = records_offset + len(records)
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        generation,
+        limit,
+        len(records) // RECORD.size,
+        slots_count,
+        slots_offset,
+        records_offset,
+        strings_offset,
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        try:
+            file.write(header)
+            file.write(b"".join(slots))
+            file.write(records)
+            file.write(strings.buffer)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            os.unlink(file.name)
+            raise
+
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+class Snapshot:
+    """
+
+    Read only memory map of a snapshot file,
+    shared with other processes through the page cache.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            self.version,
+            self.generation,
+            self.limit,
+            self.records_count,
+            self.slots_count,
+            self.slots_offset,
+            self.records_offset,
+            self.strings_offset,
+        ) = HEADER.unpack_from(self.buffer)
+
+        if magic != MAGIC or self.version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot {path}.")
+
+    def get_string(self, offset: int, length: int) -> str:
+        start = self.strings_offset + offset
+
+        return self.buffer[start : start + length].decode()
+
+    def search(
+        self,
+        by: str,
+        value: str,
+        limit: int,
+    ) -> t.Optional[t.List[SearchTerm]]:
+        """
+
+        Get top limit search terms of value,
+        None if value is unknown or limit exceeds the snapshot limit.
+        """
+        if limit > self.limit:
+            return None
+
+        hash = key_hash(by, value)
+        key = f"{by}\0{value}"
+        index = hash & (self.slots_count - 1)
+
+        while True:
+            slot_hash, key_offset, key_length, start, count = SLOT.unpack_from(
+                self.buffer,
+                self.slots_offset + index * SLOT.size,
+            )
+            if slot_hash == 0:
+                return None
+
+            if slot_hash == hash and self.get_string(key_offset, key_length) == key:
+                break
+
+            index = (index + 1) & (self.slots_count - 1)
+
+        search_terms = []
+        for position in range(start, start + min(count, limit)):
+            (
+                date,
+                ad_group_id,
+                campaign_id,
+                clicks,
+                conversions,
+                *strings,
+            ) = RECORD.unpack_from(
+                self.buffer,
+                self.records_offset + position * RECORD.size,
+            )
+            cost, conversion_value, search_term = (
+                self.get_string(*strings[_ : _ + 2]) for _ in range(0, 6, 2)
+            )
+
+            search_terms.append(
+                SearchTerm(
+                    date=datetime.date.fromordinal(date),
+                    ad_group_id=ad_group_id,
+                    campaign_id=campaign_id,
+                    clicks=clicks,
+                    cost=cost,
+                    conversion_value=conversion_value,
+                    conversions=conversions,
+                    search_term=search_term,
+                )
+            )
+
+        return search_terms
+
+
+class SnapshotFile:
+    """
+
+    Snapshot of path, reopened when a new snapshot is renamed in.
+    Missing or unsupported files are not found.
+    """
+
+    def __init__(self, path: str, check_interval: float = CHECK_INTERVAL) -> None:
+        self.path = path
+        self.check_interval = check_interval
+
+        self.snapshot: t.Optional[Snapshot] = None
+        self._checked_at = None
+
+    def get_snapshot(self) -> t.Optional[Snapshot]:
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return self.snapshot
+
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.snapshot = None
+            return None
+
+        current = self.snapshot
+        if current is None or (stat.st_ino, stat.st_mtime_ns) != (
+            current.stat.st_ino,
+            current.stat.st_mtime_ns,
+        ):
+            try:
+                # searches holding the previous map keep it until done.
+                self.snapshot = Snapshot(self.path)
+            except (OSError, ValueError, struct.error):
+                self.snapshot = None
+
+        return self.snapshot
+
+    def search(
+        self,
+        by: str,
+        value: str,
+        limit: int,
+    ) -> t.Optional[t.List[SearchTerm]]:
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return None
+
+        return snapshot.search(by, value, limit)
@@ -47,6 +47,9 @@ def testclient(monkeysession, testdatabase):
         database.create_table(testdatabase, models.AdGroup)
         database.create_table(testdatabase, models.Campaign)
         database.create_table(testdatabase, models.SearchTerm)
+        database.create_table(testdatabase, models.RoasRanking)
+        database.create_table(testdatabase, models.CampaignRollup)
+        database.create_table(testdatabase, models.DataGeneration)
 
         app.database = testdatabase
 
@@ -61,6 +64,8 @@ def testclient(monkeysession, testdatabase):
 
         yield client
 
+    testdatabase.limiter = None
+
 
 @pytest.fixture
 def testqueue(monkeysession):
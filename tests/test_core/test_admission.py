@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from core import admission
+from core import database
+from core.exceptions import OverloadedException
+
+
+def test_limiter():
+    limiter = admission.Limiter(1, max_queue=1, timeout=5, retry_after=3)
+
+    acquired = threading.Event()
+    release = threading.Event()
+    admitted = []
+
+    def hold():
+        with limiter.acquire():
+            acquired.set()
+            release.wait(5)
+
+    def wait():
+        with limiter.acquire():
+            admitted.append(True)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait(5)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while not limiter.waiting:
+        pass
+
+    # the queue is full.
+    with pytest.raises(OverloadedException) as info:
+        with limiter.acquire():
+            ...
+    assert info.value.retry_after == 3
+
+    release.set()
+    holder.join()
+    waiter.join()
+
+    assert admitted == [True]
+    assert limiter.get_stats() == {
+        "in_flight": 0,
+        "waiting": 0,
+        "admitted": 2,
+        "rejected": 1,
+        "max_concurrency": 1,
+        "max_queue": 1,
+    }
+
+
+def test_limiter_timeout():
+    limiter = admission.Limiter(1, max_queue=1, timeout=0.01)
+
+    with limiter.acquire():
+        rejected = admission.ADMISSION_WAIT.get_values().get(("rejected",))
+
+        with pytest.raises(OverloadedException):
+            with limiter.acquire():
+                ...
+
+    # rejected waits are observed.
+    values = admission.ADMISSION_WAIT.get_values()[("rejected",)]
+    assert values[-1] == (rejected[-1] if rejected else 0) + 1
+    assert limiter.in_flight == 0
+
+
+def test_database_limiter(testdatabase, droptable):
+    droptable("author")
+
+    class Author(database.Model):
+        name: str
+
+        class Meta(database.Model.Meta):
+            cache = database.Cache(lookups=("name",))
+
+    database.create_table(testdatabase, Author)
+    manager = database.Manager(testdatabase, Author)
+    manager.save(Author(name="Ken"))
+    assert len(manager.find(name="Ken")) == 1
+
+    testdatabase.limiter = admission.Limiter(1)
+    with testdatabase.limiter.acquire():
+        with pytest.raises(OverloadedException):
+            testdatabase.execute("SELECT 1")
+
+        # cached finds are not limited.
+        assert len(manager.find(name="Ken")) == 1
+
+    testdatabase.execute("SELECT 1")
+    assert testdatabase.limiter.get_stats()["admitted"] == 2
+    testdatabase.limiter = None
+
+    droptable("author")
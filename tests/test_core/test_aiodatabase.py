@@ -0,0 +1,153 @@
+import time
+import asyncio
+
+import psycopg2
+import pytest
+
+from core import database
+from core.aiodatabase import AsyncDatabase
+from core.aiodatabase import async_manager
+from core.exceptions import TimeoutException
+
+
+@pytest.fixture
+def testaiodatabase(testdatabase):
+    aiodatabase = AsyncDatabase(max_size=2, **testdatabase.kwargs)
+
+    yield aiodatabase
+
+    aiodatabase.close()
+
+
+def test_transact(testaiodatabase, droptable):
+    droptable("author")
+
+    async def run():
+        await testaiodatabase.execute("CREATE TABLE author (name text)")
+        await testaiodatabase.execute("INSERT INTO author VALUES (%s)", ("Ken",))
+
+        with pytest.raises(psycopg2.errors.UniqueViolation):
+            async with testaiodatabase.transact() as cursor:
+                await cursor.execute("INSERT INTO author VALUES ('Sam')")
+                await cursor.execute("CREATE UNIQUE INDEX ON author (name)")
+                await cursor.execute("INSERT INTO author VALUES ('Ken')")
+
+        with pytest.raises(psycopg2.errors.ReadOnlySqlTransaction):
+            async with testaiodatabase.transact(read_only=True) as cursor:
+                await cursor.execute("INSERT INTO author VALUES ('Sam')")
+
+        async with testaiodatabase.transact() as cursor:
+            await cursor.execute("SELECT name FROM author")
+            return cursor.fetchall()
+
+    # failed transactions are rolled back, their connection reused.
+    assert asyncio.run(run()) == [{"name": "Ken"}]
+    assert testaiodatabase.pool.get_stats()["size"] == 1
+
+    droptable("author")
+
+
+def test_pool(testaiodatabase):
+    async def sleep():
+        async with testaiodatabase.transact() as cursor:
+            await cursor.execute("SELECT pg_sleep(0.2)")
+
+    async def run():
+        await asyncio.gather(*(sleep() for _ in range(4)))
+
+        # interrupted queries close their connection.
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sleep(), 0.05)
+
+    asyncio.run(run())
+
+    assert testaiodatabase.pool.get_stats() == {
+        "size": 1,
+        "idle": 1,
+        "in_use": 0,
+        "waiting": 0,
+        "max_size": 2,
+    }
+
+
+def test_async_manager(testdatabase, testaiodatabase, droptable):
+    droptable("author")
+
+    class AuthorManager(database.Manager):
+        def get_oldest(self):
+            return self.query(
+                f"SELECT * FROM {self.get_table_name()} ORDER BY age DESC"
+            )
+
+        def get_ages(self):
+            return self.query_rows(
+                f"SELECT age, count(*) FROM {self.get_table_name()} "
+                "GROUP BY age ORDER BY age"
+            )
+
+    class Author(database.Model):
+        name: str
+        age: int = 23
+
+        class Meta(database.Model.Meta):
+            manager = AuthorManager
+
+    class CachedAuthor(Author):
+        class Meta(Author.Meta):
+            cache = database.Cache(lookups=("name",))
+
+    database.create_table(testdatabase, Author)
+    manager = Author.manager(testdatabase)
+    manager.save(Author(name="Ken"))
+    manager.save(Author(name="Sam", age=30))
+
+    async def run():
+        manager = async_manager(Author, testaiodatabase)
+        cached_manager = async_manager(CachedAuthor, testaiodatabase, "author")
+
+        return (
+            [_.name for _ in await manager.get_oldest()],
+            await manager.get_ages(),
+            (await manager.get(name="Ken")).age,
+            await manager.values_list("name", age=30),
+            [_.age for _ in await cached_manager.find(name="Sam")],
+            [_.age for _ in await cached_manager.find(name="Sam")],
+        )
+
+    assert asyncio.run(run()) == (
+        ["Sam", "Ken"],
+        [{"age": 23, "count": 1}, {"age": 30, "count": 1}],
+        23,
+        [("Sam",)],
+        [30],
+        [30],
+    )
+    assert manager.get_ages() == [{"age": 23, "count": 1}, {"age": 30, "count": 1}]
+    assert (
+        async_manager(CachedAuthor, testaiodatabase, "author").get_cache_stats()["hits"]
+        == 1
+    )
+
+    manager = async_manager(Author, testaiodatabase)
+    assert not hasattr(manager, "save")
+    with pytest.raises(AttributeError, match="AsyncAuthorManager is read only"):
+        manager.save(Author(name="Bob"))
+
+    droptable("author")
+
+
+def test_transact_deadline(testaiodatabase):
+    async def run():
+        with pytest.raises(TimeoutException):
+            async with testaiodatabase.transact(
+                deadline=time.monotonic() + 0.2
+            ) as cursor:
+                await cursor.execute("SELECT pg_sleep(5)")
+
+        async with testaiodatabase.transact() as cursor:
+            await cursor.execute("SELECT 1 AS one")
+            return cursor.fetchone()
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == {"one": 1}
+    assert time.monotonic() - started < 2
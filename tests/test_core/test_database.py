@@ -1,11 +1,16 @@
 from unittest import mock
 from dataclasses import Field
+from concurrent.futures import ThreadPoolExecutor
 
+import time
 import datetime
+import threading
 
 import pytest
 
 from core import database
+from core import deadline as core_deadline
+from core.exceptions import TimeoutException
 
 
 @pytest.mark.skip
@@ -166,3 +171,583 @@ def test_create_table(testdatabase, droptable):
     assert testdatabase.table_exist("author")
 
     droptable("author")
+
+
+def test_create_table_duplicates(testdatabase, droptable):
+    droptable("author")
+
+    class Author(database.Model):
+        name: str
+        age: int = 23
+
+    # a table loaded repeatedly before the natural key was declared.
+    database.create_table(testdatabase, Author)
+    manager = database.Manager(testdatabase, Author)
+    manager.save(Author(name="Ken"))
+    manager.save(Author(name="Ken", age=40))
+    manager.save(Author(name="Sam", age=30))
+
+    Author.Meta = type("Meta", (database.Model.Meta,), {"natural_key": ("name",)})
+    database.create_table(testdatabase, Author)
+
+    authors = {_.name: _.age for _ in manager.find()}
+    assert authors == {"Ken": 40, "Sam": 30}
+
+    with testdatabase.transact() as cursor:
+        assert database.get_index_validity(cursor, "author_name_key") is True
+
+    droptable("author")
+
+
+def test_manager_upsert_many(testdatabase, droptable):
+    droptable("author")
+
+    class Author(database.Model):
+        name: str
+        age: int = 23
+
+        class Meta(database.Model.Meta):
+            natural_key = ("name",)
+
+    database.create_table(testdatabase, Author)
+    manager = database.Manager(testdatabase, Author)
+
+    manager.upsert_many([Author(name="Ken"), Author(name="Sam", age=30)])
+    manager.upsert_many([Author(name="Ken", age=40), Author(name="Ken", age=50)])
+
+    authors = {_.name: _.age for _ in manager.find()}
+
+    assert authors == {"Ken": 50, "Sam": 30}
+
+    droptable("author")
+
+
+def test_create_table_shadow(testdatabase, droptable):
+    droptable("author_shadow")
+
+    class Author(database.Model):
+        name: str
+
+        class Meta(database.Model.Meta):
+            indexes = (("name",),)
+
+    database.create_table(
+        testdatabase,
+        Author,
+        table_name="author_shadow",
+        unlogged=True,
+        indexes=False,
+    )
+
+    with testdatabase.transact() as cursor:
+        cursor.execute(
+            "SELECT relpersistence FROM pg_class WHERE relname = %s",
+            ("author_shadow",),
+        )
+        persistence = cursor.fetchone()["relpersistence"]
+
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+            ("author_shadow",),
+        )
+        index_names = [_["indexname"] for _ in cursor.fetchall()]
+
+    assert persistence == "u"
+    assert index_names == ["author_shadow_pkey"]
+
+    droptable("author_shadow")
+
+
+def test_swap_tables(testdatabase, droptable):
+    droptable("author")
+    droptable("author_shadow")
+
+    class Author(database.Model):
+        name: str
+
+        class Meta(database.Model.Meta):
+            natural_key = ("name",)
+
+    database.create_table(testdatabase, Author)
+    database.create_table(testdatabase, Author, table_name="author_shadow")
+
+    database.Manager(testdatabase, Author).save(Author(name="Ken"))
+    database.Manager(testdatabase, Author, table_name="author_shadow").save(
+        Author(name="Sam")
+    )
+
+    database.swap_tables(testdatabase, {"author": "author_shadow"})
+
+    assert not testdatabase.table_exist("author_shadow")
+    assert [_.name for _ in database.Manager(testdatabase, Author).find()] == ["Sam"]
+
+    with testdatabase.transact() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s "
+            "ORDER BY indexname",
+            ("author",),
+        )
+        index_names = [_["indexname"] for _ in cursor.fetchall()]
+
+    assert index_names == ["author_name_key", "author_pkey"]
+
+    # shadow table names are free again.
+    database.create_table(testdatabase, Author, table_name="author_shadow")
+
+    droptable("author")
+    droptable("author_shadow")
+
+
+def test_partitioned_table(testdatabase, droptable):
+    droptable("post")
+    droptable("post_shadow")
+
+    class Post(database.Model):
+        date: datetime.date
+        title: str
+
+        class Meta(database.Model.Meta):
+            natural_key = ("date", "title")
+            indexes = (("title",),)
+            partition_by = ("date", "month")
+
+    database.create_table(testdatabase, Post)
+    manager = database.Manager(testdatabase, Post)
+
+    manager.upsert_many(
+        [
+            Post(date="2021-01-31", title="January"),
+            Post(date=datetime.date(2021, 2, 1), title="February"),
+        ]
+    )
+    manager.save(Post(date="2021-12-01", title="December"))
+
+    assert manager.get_partitions() == {
+        "post_202101": datetime.date(2021, 1, 1),
+        "post_202102": datetime.date(2021, 2, 1),
+        "post_202112": datetime.date(2021, 12, 1),
+    }
+
+    with testdatabase.transact() as cursor:
+        cursor.execute(
+            "EXPLAIN SELECT * FROM post WHERE date >= %s",
+            (datetime.date(2021, 12, 1),),
+        )
+        plan = " ".join(_["QUERY PLAN"] for _ in cursor.fetchall())
+
+    assert "post_202112" in plan
+    assert "post_202101" not in plan
+
+    # shadow partitions and their indexes are renamed after the live table.
+    database.create_table(testdatabase, Post, table_name="post_shadow")
+    database.Manager(testdatabase, Post, table_name="post_shadow").copy_many(
+        [Post(date="2021-01-01", title="New Year")]
+    )
+    database.swap_tables(testdatabase, {"post": "post_shadow"})
+
+    assert manager.get_partitions() == {"post_202101": datetime.date(2021, 1, 1)}
+    with testdatabase.transact() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s "
+            "ORDER BY indexname",
+            ("post_202101",),
+        )
+        index_names = [_["indexname"] for _ in cursor.fetchall()]
+
+    assert all(_.startswith("post_202101_") for _ in index_names)
+
+    manager = database.Manager(testdatabase, Post)
+    manager.save(Post(date="2021-02-15", title="Valentine"))
+
+    assert manager.drop_partitions("2021-02-01") == ["post_202101"]
+    assert [_.title for _ in manager.find()] == ["Valentine"]
+
+    droptable("post")
+
+
+def test_unpartitioned_table(testdatabase, droptable, caplog):
+    droptable("post")
+
+    class Post(database.Model):
+        date: datetime.date
+        title: str
+
+        class Meta(database.Model.Meta):
+            natural_key = ("date", "title")
+
+    # a table created before partitioning was declared.
+    database.create_table(testdatabase, Post)
+    Post.Meta.partition_by = ("date", "month")
+
+    with mock.patch.object(
+        database.Manager,
+        "get_partitions",
+        autospec=True,
+        side_effect=database.Manager.get_partitions,
+    ) as get_partitions:
+        for title in ("January", "February"):
+            manager = database.Manager(testdatabase, Post)
+            manager.upsert_many([Post(date="2021-01-31", title=title)])
+
+    assert get_partitions.call_count == 1
+    assert database.Manager.known_partitions["post"] is None
+    assert caplog.text.count("post is not partitioned") == 1
+    assert len(database.Manager(testdatabase, Post).find()) == 2
+
+    droptable("post")
+
+
+@pytest.mark.parametrize("partition_by", [None, ("date", "year")])
+def test_create_indexes_concurrently(testdatabase, droptable, partition_by):
+    droptable("post")
+
+    class Post(database.Model):
+        date: datetime.date
+        title: str
+
+        class Meta(database.Model.Meta):
+            natural_key = ("date", "title")
+            indexes = (("title",),)
+
+    Post.Meta.partition_by = partition_by
+
+    database.create_table(testdatabase, Post)
+    manager = database.Manager(testdatabase, Post)
+    manager.upsert_many(
+        [
+            Post(date="2020-01-01", title="Old"),
+            Post(date="2021-01-01", title="New"),
+        ]
+    )
+
+    def get_indexes():
+        with testdatabase.transact() as cursor:
+            cursor.execute(
+                "SELECT indexrelid::regclass::text AS name, indisvalid "
+                "FROM pg_index WHERE indrelid = to_regclass('post')"
+            )
+            return {_["name"]: _["indisvalid"] for _ in cursor.fetchall()}
+
+    assert database.drop_indexes(testdatabase, Post) == ["post_title_idx"]
+    assert "post_title_idx" not in get_indexes()
+
+    database.create_indexes(testdatabase, Post, concurrently=True)
+    # already built indexes are skipped.
+    database.create_indexes(testdatabase, Post, concurrently=True)
+
+    assert get_indexes()["post_title_idx"] is True
+    assert get_indexes()["post_date_title_key"] is True
+
+    if partition_by:
+        with testdatabase.transact() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'post_2020'"
+            )
+            index_names = sorted(_["indexname"] for _ in cursor.fetchall())
+
+        assert index_names == ["post_2020_date_title_idx", "post_2020_title_idx"]
+
+    droptable("post")
+
+
+def test_manager_cache(testdatabase, droptable):
+    droptable("author")
+    generation = [1]
+
+    class Author(database.Model):
+        name: str
+        age: int = 23
+
+        class Meta(database.Model.Meta):
+            cache = database.Cache(
+                lookups=("name",),
+                generation=lambda _: generation[0],
+                check_interval=0,
+            )
+
+    database.create_table(testdatabase, Author)
+    manager = database.Manager(testdatabase, Author)
+    manager.save(Author(name="Ken"))
+    manager.save(Author(name="Sam", age=30))
+
+    assert [_.age for _ in manager.find(name="Sam")] == [30]
+    assert [_.name for _ in manager.find(age=23)] == ["Ken"]
+    assert manager.find(name="Bob") == []
+    # lookups are compared as the database would, eg: of query args.
+    assert [_.name for _ in manager.find(age="23")] == ["Ken"]
+    assert manager.get_cache_stats() == {
+        "rows": 2,
+        "hits": 3,
+        "misses": 1,
+        "hit_rate": 3 / 4,
+    }
+
+    # changes by other processes are seen on the next generation.
+    testdatabase.execute("UPDATE author SET age = 40 WHERE name = 'Sam'")
+    assert [_.age for _ in manager.find(name="Sam")] == [30]
+
+    generation[0] = 2
+    assert [_.age for _ in manager.find(name="Sam")] == [40]
+
+    # writes through the manager reload the table.
+    manager.save(Author(name="Bob"))
+    assert len(manager.find(name="Bob")) == 1
+
+    # once their transaction is committed.
+    with testdatabase.transact() as cursor:
+        manager.save(Author(name="Tom"), cursor=cursor)
+        assert manager.find(name="Tom") == []
+    assert len(manager.find(name="Tom")) == 1
+
+    # and not if it is rolled back.
+    loaded_at = testdatabase.caches["author"].loaded_at
+    with pytest.raises(ZeroDivisionError):
+        with testdatabase.transact() as cursor:
+            manager.save(Author(name="Eve"), cursor=cursor)
+            1 / 0
+    assert testdatabase.caches["author"].loaded_at == loaded_at
+
+    droptable("author")
+
+
+def test_manager_cache_concurrent(testdatabase, droptable):
+    droptable("author")
+
+    class Author(database.Model):
+        name: str
+
+        class Meta(database.Model.Meta):
+            cache = database.Cache(lookups=("name",))
+
+    database.create_table(testdatabase, Author)
+    manager = database.Manager(testdatabase, Author)
+    manager.save(Author(name="Ken"))
+    testdatabase.caches.pop("author", None)
+
+    barrier = threading.Barrier(4)
+    load_table_cache = database.Manager._load_table_cache
+
+    def slow_load(self, table_cache):
+        time.sleep(0.1)
+        load_table_cache(self, table_cache)
+
+    def find():
+        barrier.wait()
+        return manager.find(name="Ken")
+
+    with mock.patch.object(
+        database.Manager,
+        "_load_table_cache",
+        autospec=True,
+        side_effect=slow_load,
+    ) as load:
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(lambda _: find(), range(4)))
+
+    # first readers wait for a single load.
+    assert load.call_count == 1
+    assert [len(_) for _ in results] == [1, 1, 1, 1]
+
+    droptable("author")
+
+
+def test_schema_version(testdatabase, droptable):
+    droptable(database.SCHEMA_VERSION_TABLE)
+
+    class Author(database.Model):
+        name: str
+        age: "int" = 23
+
+    class Book(database.Model):
+        title: str
+
+        class Meta(database.Model.Meta):
+            indexes = (("title",),)
+
+    version = database.get_schema_version([Author, Book])
+    assert database.get_model_columns(Author) == (
+        "name varchar(255) NOT NULL",
+        "age integer DEFAULT 23",
+    )
+
+    class Book(database.Model):
+        title: str
+
+    assert database.get_schema_version([Author, Book]) != version
+
+    assert database.read_schema_version(testdatabase) is None
+    database.write_schema_version(testdatabase, version)
+    database.write_schema_version(testdatabase, version)
+    assert database.read_schema_version(testdatabase) == version
+
+    droptable(database.SCHEMA_VERSION_TABLE)
+
+
+def test_validate_schema(testdatabase, droptable):
+    droptable("author")
+    droptable("book")
+
+    class Author(database.Model):
+        name: str
+
+    class Book(database.Model):
+        title: str
+
+    database.create_table(testdatabase, Author)
+    assert database.validate_schema(testdatabase, [Author, Book]) == ["book"]
+
+    class Author(database.Model):
+        name: str
+        age: int = 23
+
+    assert database.validate_schema(testdatabase, [Author]) == ["author.age"]
+
+    database.create_table(testdatabase, Author)
+    assert database.validate_schema(testdatabase, [Author]) == []
+
+    droptable("author")
+
+
+def test_transact_deadline(testdatabase):
+    # statements time out at the deadline.
+    started = time.monotonic()
+    with pytest.raises(TimeoutException):
+        with testdatabase.transact(deadline=time.monotonic() + 0.2) as cursor:
+            cursor.execute("SELECT pg_sleep(5)")
+    assert time.monotonic() - started < 2
+
+    # statements each within their timeout are cancelled at the deadline.
+    started = time.monotonic()
+    with pytest.raises(TimeoutException):
+        with testdatabase.transact(deadline=time.monotonic() + 0.5) as cursor:
+            for _ in range(5):
+                cursor.execute("SELECT pg_sleep(0.3)")
+    assert time.monotonic() - started < 2
+
+    with pytest.raises(TimeoutException):
+        with testdatabase.transact(deadline=time.monotonic() - 1):
+            ...
+
+    # the ongoing deadline by default.
+    token = core_deadline.DEADLINE.set(time.monotonic() + 0.2)
+    try:
+        with pytest.raises(TimeoutException):
+            testdatabase.execute("SELECT pg_sleep(5)")
+    finally:
+        core_deadline.DEADLINE.reset(token)
+
+    with testdatabase.transact(deadline=time.monotonic() + 5) as cursor:
+        cursor.execute("SELECT 1 AS one")
+        assert cursor.fetchone() == {"one": 1}
+
+
+def get_application_name(db, **kwargs):
+    with db.transact(**kwargs) as cursor:
+        cursor.execute("SELECT current_setting('application_name') AS name")
+
+        return cursor.fetchone()["name"]
+
+
+def test_replicas(testdatabase):
+    # replicas of the local server, told apart by their application_name.
+    replicated = database.Database(
+        **testdatabase.kwargs,
+        replicas=[{"application_name": "replica0"}, {"application_name": "replica1"}],
+    )
+
+    assert get_application_name(replicated) == ""
+    assert [get_application_name(replicated, read_only=True) for _ in range(4)] == [
+        "replica0",
+        "replica1",
+        "replica0",
+        "replica1",
+    ]
+
+    # least busy replica.
+    replicated.balancing = "least_busy"
+    replicated.replicas[0].in_use = 1
+    assert get_application_name(replicated, read_only=True) == "replica1"
+    replicated.replicas[0].in_use = 0
+
+    stats = replicated.get_stats()
+    assert stats["primary"]["transactions"] == 1
+    assert [_["transactions"] for _ in stats["replicas"]] == [2, 3]
+
+    with pytest.raises(ValueError):
+        database.Database(balancing="fastest")
+
+
+def test_replicas_ejected(testdatabase):
+    # lagging replicas are ejected until a check passes.
+    replicated = database.Database(
+        **testdatabase.kwargs,
+        replicas=[{"application_name": "replica0"}],
+        max_lag=-1,
+        lag_check_interval=0,
+    )
+    assert get_application_name(replicated, read_only=True) == ""
+    assert replicated.replicas[0].ejected
+    assert replicated.replicas[0].lag == 0
+
+    replicated.max_lag = 1
+    assert get_application_name(replicated, read_only=True) == "replica0"
+    assert not replicated.replicas[0].ejected
+
+    # unreachable replicas too, reads fall back to the primary.
+    unreachable = database.Database(
+        **testdatabase.kwargs,
+        replicas=[{"port": 1}],
+        lag_check_interval=60,
+    )
+    assert get_application_name(unreachable, read_only=True) == ""
+    assert unreachable.replicas[0].ejected
+    assert unreachable.replicas[0].lag is None
+
+
+def test_read_your_writes(testdatabase):
+    replicated = database.Database(
+        **testdatabase.kwargs,
+        replicas=[{"application_name": "replica0"}],
+        read_your_writes=60,
+    )
+    token = database.LAST_WRITE.set(None)
+    try:
+        assert get_application_name(replicated, read_only=True) == "replica0"
+
+        # reads after a write of the context go to the primary.
+        get_application_name(replicated)
+        assert get_application_name(replicated, read_only=True) == ""
+
+        replicated.read_your_writes = 0.01
+        time.sleep(0.02)
+        assert get_application_name(replicated, read_only=True) == "replica0"
+    finally:
+        database.LAST_WRITE.reset(token)
+
+
+def test_pool(testdatabase):
+    pooled = database.Database(**testdatabase.kwargs, pool_size=1)
+
+    def get_pid():
+        with pooled.transact() as cursor:
+            cursor.execute("SELECT pg_backend_pid() AS pid")
+            return cursor.fetchone()["pid"]
+
+    pid = get_pid()
+    assert get_pid() == pid
+
+    # failed transactions are rolled back, their connection reused.
+    with pytest.raises(ZeroDivisionError):
+        with pooled.transact() as cursor:
+            cursor.execute("SELECT 1")
+            1 / 0
+    assert get_pid() == pid
+
+    # acquirers wait up to their deadline for a connection.
+    with pooled.transact():
+        with pytest.raises(TimeoutException):
+            pooled.primary.acquire(timeout=0.01)
+
+    assert pooled.primary.pool.get_stats()["idle"] == 1
+    pooled.close()
+    assert pooled.primary.pool.get_stats()["size"] == 0
@@ -1,4 +1,8 @@
 from unittest import mock
+import bz2
+import gzip
+import lzma
+
 import pytest
 
 from core import dataframe
@@ -50,3 +54,128 @@ def test_csv_frame(*args):
 
     with pytest.raises(StopIteration):
         next(cf)
+
+
+def test_csv_frame_position(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("name,age\nSam Jay,20\nFan Bill,25\n")
+
+    cf = dataframe.CSVFrame(str(csv_file))
+
+    assert cf.position == len("name,age\n")
+    assert next(cf) == ["Sam Jay", "20"]
+    assert cf.position == len("name,age\nSam Jay,20\n")
+
+
+def test_csv_frame_offset(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("name,age\nSam Jay,20\nFan Bill,25\n")
+
+    cf = dataframe.CSVFrame(str(csv_file), offset=len("name,age\nSam Jay,20\n"))
+
+    assert cf.headers == ["name", "age"]
+    assert next(cf) == ["Fan Bill", "25"]
+    assert cf.position == csv_file.stat().st_size
+
+    with pytest.raises(StopIteration):
+        next(cf)
+
+
+def test_split(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("name,age\n" + "".join(f"Sam {_},{_}\n" for _ in range(100)))
+
+    ranges = dataframe.split(str(csv_file), 100)
+
+    assert ranges[0][0] == len("name,age\n")
+    assert ranges[-1][1] == csv_file.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    rows = []
+    for start, end in ranges:
+        rows.extend(dataframe.CSVFrame(str(csv_file), offset=start, end=end))
+
+    assert rows == [[f"Sam {_}", f"{_}"] for _ in range(100)]
+
+
+@pytest.mark.parametrize(
+    "extension,compress",
+    [
+        (".csv", lambda _: _),
+        (".csv.gz", gzip.compress),
+        (".csv.bz2", bz2.compress),
+        (".csv.xz", lzma.compress),
+    ],
+)
+def test_estimate_rows(tmp_path, extension, compress):
+    csv_file = tmp_path / f"data{extension}"
+    csv_file.write_bytes(
+        compress(b"name,age\n" + b"".join(b"Sam %03d,20\n" % _ for _ in range(100)))
+    )
+
+    assert dataframe.estimate_rows(str(csv_file)) == 100
+
+
+@pytest.mark.parametrize(
+    "extension,compress",
+    [
+        (".csv.gz", gzip.compress),
+        (".csv.bz2", bz2.compress),
+        (".csv.xz", lzma.compress),
+        (".export", gzip.compress),
+    ],
+)
+def test_csv_frame_compressed(tmp_path, extension, compress):
+    csv_file = tmp_path / f"data{extension}"
+    csv_file.write_bytes(compress(b"name,age\nSam Jay,20\nFan Bill,25\n"))
+
+    cf = dataframe.CSVFrame(str(csv_file), offset=len("name,age\nSam Jay,20\n"))
+
+    assert cf.headers == ["name", "age"]
+    assert list(cf) == [["Fan Bill", "25"]]
+
+
+def test_csv_frame_zstd(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+
+    csv_file = tmp_path / "data.csv.zst"
+    csv_file.write_bytes(
+        zstandard.ZstdCompressor().compress(b"name,age\nSam Jay,20\nFan Bill,25\n")
+    )
+
+    cf = dataframe.CSVFrame(str(csv_file), offset=len("name,age\nSam Jay,20\n"))
+
+    assert dataframe.get_compression(str(csv_file)) == "zstd"
+    assert cf.headers == ["name", "age"]
+    assert list(cf) == [["Fan Bill", "25"]]
+
+
+def test_columnar_frame(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    table = pyarrow.table(
+        {
+            "name": [f"Sam {_}" for _ in range(10)],
+            "age": list(range(10)),
+            "height": [180] * 10,
+        }
+    )
+    parquet_file = tmp_path / "data.parquet"
+    pyarrow.parquet.write_table(table, parquet_file, row_group_size=3)
+
+    cf = dataframe.open_frame(str(parquet_file), columns=["age", "name"])
+
+    assert cf.headers == ["age", "name"]
+    assert next(cf) == [0, "Sam 0"]
+    assert cf.position == 1
+
+    ranges = dataframe.split(str(parquet_file), 1)
+    assert ranges == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+    cf = dataframe.open_frame(str(parquet_file), offset=4, end=6, columns=["age"])
+    assert list(cf) == [[4], [5]]
+    assert cf.position == 6
+
+    batch = next(dataframe.ColumnarFrame(str(parquet_file), columns=["age"]).batches())
+    assert dataframe.ColumnarFrame.to_csv(batch).read() == b"0\n1\n2\n"
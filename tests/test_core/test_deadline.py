@@ -0,0 +1,56 @@
+import time
+import threading
+
+from core import deadline
+
+
+def test_get_remaining():
+    assert deadline.get_remaining() is None
+    assert 0 < deadline.get_remaining(time.monotonic() + 1) <= 1
+
+    token = deadline.DEADLINE.set(time.monotonic() - 1)
+    try:
+        assert deadline.get_remaining() < 0
+    finally:
+        deadline.DEADLINE.reset(token)
+
+
+def test_watchdog():
+    watchdog = deadline.Watchdog()
+    called = []
+    done = threading.Event()
+
+    def callback(name):
+        def _callback():
+            called.append(name)
+            if name == "last":
+                done.set()
+
+        return _callback
+
+    now = time.monotonic()
+    watchdog.arm(now + 0.1, callback("last"))
+    watchdog.arm(now + 0.02, callback("first"))
+    entry = watchdog.arm(now + 0.05, callback("disarmed"))
+    watchdog.disarm(entry)
+
+    assert done.wait(2)
+    assert called == ["first", "last"]
+
+
+def test_watchdog_disarm_running():
+    watchdog = deadline.Watchdog()
+    started = threading.Event()
+    finished = []
+
+    def callback():
+        started.set()
+        time.sleep(0.1)
+        finished.append(True)
+
+    entry = watchdog.arm(time.monotonic(), callback)
+    assert started.wait(2)
+
+    # disarm returns once the running callback is done.
+    watchdog.disarm(entry)
+    assert finished == [True]
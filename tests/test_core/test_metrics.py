@@ -0,0 +1,86 @@
+import os
+import json
+
+import pytest
+
+from core import metrics
+
+
+def test_registry_render():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests.", ["route"])
+    in_use = registry.gauge("in_use", "In use.")
+    duration = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1))
+
+    requests.inc(route="/search")
+    requests.inc(2, route='/a"b')
+    registry.add_collector("in_use", lambda: in_use.set(3))
+    duration.observe(0.05)
+    duration.observe(0.5)
+    duration.observe(5)
+
+    with pytest.raises(ValueError):
+        requests.inc()
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 2.0',
+        'requests_total{route="/search"} 1.0',
+        "# HELP in_use In use.",
+        "# TYPE in_use gauge",
+        "in_use 3.0",
+        "# HELP duration_seconds Duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{le="0.1"} 1.0',
+        'duration_seconds_bucket{le="1.0"} 2.0',
+        'duration_seconds_bucket{le="+Inf"} 3.0',
+        "duration_seconds_sum 5.55",
+        "duration_seconds_count 3.0",
+    ]
+
+
+def test_registry_directory(tmp_path):
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests.")
+    in_use = registry.gauge("in_use", "In use.")
+    duration = registry.histogram("duration_seconds", "Duration.", buckets=(1,))
+
+    registry.configure(str(tmp_path), flush_interval=60)
+    requests.inc()
+    in_use.set(1)
+    duration.observe(0.5)
+
+    # an exited process: its counters are kept, its gauges dropped.
+    pid = 2**22 + 1
+    with open(registry.get_path(pid), "w") as file:
+        json.dump(
+            {
+                "requests_total": [[[], 2]],
+                "in_use": [[[], 5]],
+                "duration_seconds": [[[], [0, 1, 2.0, 1]]],
+            },
+            file,
+        )
+
+    values = registry.collect_all()
+    assert values["requests_total"] == {(): 3}
+    assert values["in_use"] == {(): 1}
+    assert values["duration_seconds"] == {(): [1, 1, 2.5, 2]}
+    assert os.path.exists(registry.get_path(os.getpid()))
+
+
+def test_timed():
+    with metrics.timed("db"):
+        pass
+
+    timings = metrics.Timings()
+    token = metrics.TIMINGS.set(timings)
+    try:
+        with metrics.timed("db"):
+            pass
+        metrics.add_timing("db", 1)
+    finally:
+        metrics.TIMINGS.reset(token)
+
+    assert 1 < timings.phases["db"] < 2
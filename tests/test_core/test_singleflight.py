@@ -0,0 +1,252 @@
+import os
+import time
+import fcntl
+import asyncio
+import threading
+
+from core import deadline
+from core.aiosingleflight import AsyncSingleFlight
+from core.singleflight import FileLockBackend
+from core.singleflight import SingleFlight
+
+
+def run_threads(count, target):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(target())) for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        release.wait()
+        return [{"search_term": "nike"}]
+
+    def request():
+        return flight.do(("search", "nike"), search)
+
+    threading.Timer(0.2, release.set).start()
+    results = run_threads(5, request)
+
+    assert len(calls) == 1
+    assert results == [[{"search_term": "nike"}]] * 5
+    assert flight.get_stats() == {
+        "requests": 5,
+        "calls": 1,
+        "coalesced": 4,
+        "shared_coalesced": 0,
+    }
+
+    # keys are released once called.
+    request()
+    assert len(calls) == 2
+
+
+def test_single_flight_exception():
+    flight = SingleFlight()
+
+    def search():
+        time.sleep(0.1)
+        raise ValueError("failed")
+
+    def request():
+        try:
+            flight.do("key", search)
+        except ValueError as ex:
+            return ex
+
+    results = run_threads(3, request)
+
+    assert all(isinstance(_, ValueError) for _ in results)
+    assert flight.get_stats()["calls"] == 1
+
+
+def test_single_flight_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def hang():
+        release.wait()
+        return "leader"
+
+    leader = threading.Thread(target=lambda: flight.do("key", hang))
+    leader.start()
+    time.sleep(0.05)
+
+    # followers call themselves once their deadline is reached.
+    token = deadline.DEADLINE.set(time.monotonic() + 0.1)
+    try:
+        assert flight.do("key", lambda: "follower") == "follower"
+    finally:
+        deadline.DEADLINE.reset(token)
+
+    release.set()
+    leader.join()
+
+    assert flight.get_stats()["calls"] == 2
+
+
+def test_file_lock_backend(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        release.wait()
+        return ["nike"]
+
+    # two workers sharing a directory.
+    flights = [SingleFlight(FileLockBackend(str(tmp_path))) for _ in range(2)]
+
+    leader = threading.Thread(target=lambda: flights[0].do("key", search))
+    leader.start()
+    time.sleep(0.1)
+
+    follower = []
+    thread = threading.Thread(
+        target=lambda: follower.append(flights[1].do("key", search))
+    )
+    thread.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    thread.join()
+
+    assert follower == [["nike"]]
+    assert len(calls) == 1
+    assert flights[1].get_stats()["shared_coalesced"] == 1
+
+    # results of past calls are not shared.
+    assert flights[1].do("key", lambda: ["puma"]) == ["puma"]
+
+
+def test_file_lock_backend_deadline(tmp_path):
+    backend = FileLockBackend(str(tmp_path))
+
+    # a call of another process holding the lock.
+    with open(backend.get_path("key") + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        token = deadline.DEADLINE.set(time.monotonic() + 0.1)
+        try:
+            assert backend.do("key", lambda: ["nike"]) == (["nike"], False)
+        finally:
+            deadline.DEADLINE.reset(token)
+
+
+def test_file_lock_backend_failed(tmp_path):
+    backends = [FileLockBackend(str(tmp_path)) for _ in range(3)]
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        release.wait()
+        raise ValueError("failed")
+
+    def search():
+        calls.append(1)
+        time.sleep(0.1)
+        return ["nike"]
+
+    def call(function, backend=backends[0]):
+        try:
+            return backend.do("key", function)
+        except ValueError as ex:
+            return ex
+
+    leader = threading.Thread(target=lambda: call(fail))
+    leader.start()
+    time.sleep(0.1)
+
+    # waiters of a failed call call again, concurrently.
+    followers = []
+    threads = [
+        threading.Thread(target=lambda _=_: followers.append(call(search, _)))
+        for _ in backends[1:]
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    release.set()
+    for thread in threads + [leader]:
+        thread.join()
+
+    assert followers == [(["nike"], False)] * 2
+    assert len(calls) == 2
+    assert time.monotonic() - started < 0.19
+
+
+def test_file_lock_backend_sweep(tmp_path):
+    backend = FileLockBackend(str(tmp_path), ttl=60)
+    backend.do("key", lambda: ["nike"])
+    backend.do("other", lambda: ["puma"])
+    assert len(os.listdir(tmp_path)) == 4
+
+    # files of keys not called for ttl seconds are removed.
+    path = backend.get_path("key")
+    for suffix in (".lock", ".json"):
+        os.utime(path + suffix, (0, 0))
+
+    backend.sweep()
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(backend.get_path("other")) + _ for _ in (".json", ".lock")
+    )
+
+
+def test_async_single_flight(tmp_path):
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return [{"search_term": "nike"}]
+
+    async def run(flight):
+        return await asyncio.gather(
+            *(flight.do(("search", "nike"), search) for _ in range(5))
+        )
+
+    flight = AsyncSingleFlight()
+    assert asyncio.run(run(flight)) == [[{"search_term": "nike"}]] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()["coalesced"] == 4
+
+    # followers call themselves once their deadline is reached.
+    async def run_deadline(flight):
+        async def hang():
+            await asyncio.sleep(1)
+
+        async def follow():
+            await asyncio.sleep(0.05)
+            deadline.DEADLINE.set(time.monotonic() + 0.1)
+            return await flight.do(("search", "nike"), search)
+
+        leader = asyncio.ensure_future(flight.do(("search", "nike"), hang))
+        result = await follow()
+        leader.cancel()
+
+        return result
+
+    flight = AsyncSingleFlight()
+    assert asyncio.run(run_deadline(flight)) == [{"search_term": "nike"}]
+    assert len(calls) == 2
+    assert flight.get_stats()["calls"] == 2
+
+    # shared calls are run in a thread, on the event loop.
+    flight = AsyncSingleFlight(FileLockBackend(str(tmp_path)))
+    assert asyncio.run(run(flight)) == [[{"search_term": "nike"}]] * 5
+    assert len(calls) == 3
+    assert flight.get_stats()["calls"] == 1
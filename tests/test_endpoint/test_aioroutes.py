@@ -0,0 +1,130 @@
+import asyncio
+
+from datetime import date
+
+from unittest import mock
+
+import pytest
+
+from core.exceptions import TimeoutException
+
+from shared.models import SearchTerm
+
+pytest.importorskip("quart")
+
+
+@pytest.fixture
+def testaioclient(monkeysession, testclient):
+    import aioapp
+
+    def init_db(app):
+        # tables are created by testclient.
+        database = aioapp.AsyncDatabase(
+            max_size=2, **testclient.testapp.database.kwargs
+        )
+        app.database = database
+
+        return database
+
+    monkeysession.setattr("aioapp.init_db", init_db)
+
+    app = aioapp.create_app()
+    client = app.test_client()
+    client.testapp = app
+
+    yield client
+
+    app.database.close()
+
+
+def get(client, path):
+    async def _get():
+        response = await client.get(path)
+
+        return response.status_code, await response.get_json()
+
+    return asyncio.run(_get())
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+@mock.patch("endpoint.aiocrud.async_manager")
+def test_search_by_campaign(mock_manager, mock_get_campaigns, testaioclient):
+    search_terms = [
+        SearchTerm(
+            date=date(2020, 11, 9),
+            ad_group_id=61228310066,
+            campaign_id=1578411800,
+            clicks=2,
+            cost=0.28,
+            conversion_value=2,
+            conversions=0,
+            search_term="nike kawa infant slide",
+        ),
+    ]
+    mock_get_campaigns.return_value = ["campaign"]
+    mock_manager.return_value.get_roas_by_campaign = mock.AsyncMock(
+        return_value=search_terms,
+    )
+
+    status_code, response_data = get(
+        testaioclient,
+        "/search?term=structure_value&value=nike",
+    )
+
+    assert status_code == 200
+    assert mock_manager.return_value.get_roas_by_campaign.call_args == mock.call(
+        ["campaign"],
+        limit=testaioclient.testapp.config["ROAS_SEARCH_LIMIT"],
+    )
+    assert response_data["results"][0]["search_term"] == "nike kawa infant slide"
+    assert response_data["results"][0]["cost"] == "0.28"
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+@mock.patch("endpoint.aiocrud.async_manager")
+def test_search_timeout(mock_manager, mock_get_campaigns, testaioclient):
+    mock_get_campaigns.return_value = ["campaign"]
+    mock_manager.return_value.get_roas_by_campaign = mock.AsyncMock(
+        side_effect=TimeoutException("Timed out"),
+    )
+
+    assert get(testaioclient, "/search?term=structure_value&value=nike") == (
+        504,
+        {"error": {"code": 5004, "message": "Timed out"}},
+    )
+
+
+def test_search_errors(testaioclient):
+    assert get(testaioclient, "/search?term=structure_value&value=unknown") == (
+        404,
+        {"error": {"code": 4004, "message": "Not Found"}},
+    )
+    assert get(testaioclient, "/search?term=structure_value") == (
+        400,
+        {"error": {"code": 4000, "message": "term and value are required."}},
+    )
+    assert get(testaioclient, "/search?term=foo&value=bar") == (
+        500,
+        {"error": {"code": 5000, "message": "Unexpected value foo."}},
+    )
+
+
+def test_metrics(testaioclient):
+    import aioapp
+
+    aioapp.init_metrics(testaioclient.testapp)
+
+    get(testaioclient, "/search?term=structure_value")
+
+    async def _get():
+        response = await testaioclient.get("/metrics")
+
+        return (await response.get_data(as_text=True)).splitlines()
+
+    lines = asyncio.run(_get())
+
+    assert 'db_pool_connections{state="max_size"} 2.0' in lines
+    assert any(
+        _.startswith('http_requests_total{route="/search",method="GET",status="400"}')
+        for _ in lines
+    )
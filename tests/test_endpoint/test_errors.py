@@ -1,5 +1,9 @@
 from unittest import mock
 
+from app import init_deadline
+from core import deadline
+from core.exceptions import OverloadedException
+from core.exceptions import TimeoutException
 from core.exceptions import ValidationException
 
 
@@ -30,3 +34,45 @@ def validation_error(testclient):
     assert response.status_code == 400
     assert response_data["error"]["code"] == 4000
     assert response_data["error"]["message"] == "Invalid Error"
+
+
+@mock.patch("endpoint.crud.search", side_effect=TimeoutException("Timed out"))
+def test_timeout_error(mocksearch, testclient):
+    response = testclient.get("/search?term=foo&value=bar")
+    response_data = response.get_json()
+
+    assert response.status_code == 504
+    assert response_data["error"]["code"] == 5004
+    assert response_data["error"]["message"] == "Timed out"
+
+
+def test_request_deadline(testclient):
+    budget = 5.0
+    testclient.testapp.config["REQUEST_DEADLINE"] = budget
+    init_deadline(testclient.testapp)
+
+    remaining = []
+
+    def search(*args, **kwargs):
+        remaining.append(deadline.get_remaining())
+        return []
+
+    with mock.patch("endpoint.crud.search", side_effect=search):
+        testclient.get("/search?term=foo&value=bar")
+
+    assert 0 < remaining[0] <= budget
+    assert deadline.DEADLINE.get() is None
+
+
+@mock.patch(
+    "endpoint.crud.search",
+    side_effect=OverloadedException("Saturated", retry_after=2),
+)
+def test_overloaded_error(mocksearch, testclient):
+    response = testclient.get("/search?term=foo&value=bar")
+    response_data = response.get_json()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert response_data["error"]["code"] == 5003
+    assert response_data["error"]["message"] == "Saturated"
@@ -0,0 +1,23 @@
+from app import init_metrics
+
+
+def test_metrics(testclient):
+    init_metrics(testclient.testapp)
+
+    testclient.get("/search?term=structure_value")
+    testclient.get("/unknown")
+
+    response = testclient.get("/metrics")
+    lines = response.get_data(as_text=True).splitlines()
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+
+    def value(prefix):
+        return next(float(_.split()[-1]) for _ in lines if _.startswith(prefix))
+
+    assert value('http_requests_total{route="/search",method="GET",status="400"}') >= 1
+    assert value('http_errors_total{handler="validation_error",status="400"}') >= 1
+    assert value('http_errors_total{handler="handler404",status="404"}') >= 1
+    assert value('http_request_duration_seconds_count{route="/search"}') >= 1
+    assert value("db_transaction_duration_seconds_count") >= 1
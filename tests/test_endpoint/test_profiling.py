@@ -0,0 +1,41 @@
+import os
+import json
+import pstats
+
+from unittest import mock
+
+from app import init_profiling
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+def test_profiling(mock_get_campaigns, testclient, tmp_path):
+    mock_get_campaigns.return_value = [mock.Mock(campaign_id=1578411800)]
+
+    app = testclient.testapp
+    app.config.update(PROFILING_DIR=str(tmp_path), PROFILING_SAMPLE_RATE=0.0)
+    init_profiling(app)
+
+    testclient.get("/search?term=structure_value&value=nike")
+    assert os.listdir(tmp_path) == []
+
+    response = testclient.get(
+        "/search?term=structure_value&value=nike",
+        headers={"X-Profile": "1"},
+    )
+    assert response.status_code == 200
+
+    names = sorted(os.listdir(tmp_path))
+    assert [os.path.splitext(_)[1] for _ in names] == [".json", ".prof"]
+
+    with open(tmp_path / names[0]) as file:
+        profile = json.load(file)
+
+    assert profile["route"] == "/search"
+    assert profile["status"] == 200
+    assert profile["profiled"] is True
+    assert {"validate", "rank", "serialize", "jsonify", "db"} <= set(profile["phases"])
+    assert profile["duration"] >= sum(
+        profile["phases"][_] for _ in ("validate", "rank", "serialize", "jsonify")
+    )
+
+    assert pstats.Stats(str(tmp_path / names[1])).total_calls > 0
@@ -2,8 +2,12 @@ from datetime import date
 
 from unittest import mock
 
-from shared.models import Campaign
+from app import init_admission
+from app import init_search_flight
+
 from shared.models import SearchTerm
+from shared.models import RoasRanking
+from shared.models import CampaignRollup
 
 
 @mock.patch("endpoint.crud.get_campaigns")
@@ -104,3 +108,197 @@ def test_search_by_adgroup(mock_manager, mock_get_adgroups, testclient):
     assert response_results[0]["conversion_value"] == "2"
     assert response_results[0]["date"] == "2020-11-09"
     assert response_results[0]["search_term"] == "nike kawa infant slide"
+
+
+@mock.patch.object(SearchTerm, "manager")
+def test_search_denormalized(mock_manager, testclient):
+    class Manager:
+        get_roas_by_structure_value = mock.Mock(
+            return_value=[
+                SearchTerm(
+                    date=date(2020, 11, 9),
+                    ad_group_id=61228310066,
+                    campaign_id=1578411800,
+                    clicks=2,
+                    cost=0.28,
+                    conversion_value=2,
+                    conversions=0,
+                    search_term="nike kawa infant slide",
+                    structure_value="nike",
+                ),
+            ]
+        )
+
+    mock_manager.return_value = Manager
+    testclient.testapp.config["ROAS_DENORMALIZED"] = True
+
+    response = testclient.get("/search?term=structure_value&value=nike")
+    response_results = response.get_json()["results"]
+
+    assert Manager.get_roas_by_structure_value.call_args.args == ("nike",)
+    assert response_results[0]["search_term"] == "nike kawa infant slide"
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+@mock.patch.object(RoasRanking, "manager")
+def test_search_ranking(mock_manager, mock_get_campaigns, testclient):
+    class Manager:
+        get_roas_by_campaign = mock.Mock(return_value=[])
+
+    mock_manager.return_value = Manager
+    testclient.testapp.config["ROAS_RANKING"] = True
+
+    response = testclient.get("/search?term=structure_value&value=nike")
+
+    assert response.status_code == 200
+    assert Manager.get_roas_by_campaign.called
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+@mock.patch.object(SearchTerm, "manager")
+def test_search_dated(mock_manager, mock_get_campaigns, testclient):
+    class Manager:
+        get_roas_by_campaign = mock.Mock(
+            return_value=[
+                SearchTerm(
+                    date=None,
+                    campaign_id=1578411800,
+                    ad_group_id=61228310066,
+                    search_term="nike kawa infant slide",
+                    clicks=4,
+                    cost=0.56,
+                    conversion_value=4,
+                    conversions=0,
+                ),
+            ]
+        )
+
+    mock_manager.return_value = Manager
+
+    response = testclient.get(
+        "/search?term=structure_value&value=nike"
+        "&from=2020-11-01&to=2020-11-30&group=search_term"
+    )
+    response_results = response.get_json()["results"]
+
+    assert Manager.get_roas_by_campaign.call_args.kwargs == {
+        "date_from": date(2020, 11, 1),
+        "date_to": date(2020, 11, 30),
+        "group": "search_term",
+    }
+    assert response_results == [
+        {
+            "ad_group": 61228310066,
+            "campaign": 1578411800,
+            "clicks": 4,
+            "conversion_value": "4",
+            "cost": "0.56",
+            "search_term": "nike kawa infant slide",
+        }
+    ]
+
+
+@mock.patch("endpoint.crud.get_campaigns")
+@mock.patch.object(CampaignRollup, "manager")
+def test_search_rollup(mock_manager, mock_get_campaigns, testclient):
+    class Manager:
+        get_roas_by_campaign = mock.Mock(
+            return_value=[
+                CampaignRollup(
+                    date=None,
+                    campaign_id=1578411800,
+                    clicks=4,
+                    cost=0.56,
+                    conversion_value=4,
+                    conversions=0,
+                ),
+            ]
+        )
+
+    mock_manager.return_value = Manager
+
+    response = testclient.get(
+        "/search?term=structure_value&value=nike&from=2020-11-01&group=campaign"
+    )
+
+    assert Manager.get_roas_by_campaign.call_args.kwargs == {
+        "date_from": date(2020, 11, 1),
+        "date_to": None,
+    }
+    assert response.get_json()["results"] == [
+        {
+            "campaign": 1578411800,
+            "clicks": 4,
+            "conversion_value": "4",
+            "cost": "0.56",
+        }
+    ]
+
+
+def test_search_rollup_validation(testclient):
+    for query in (
+        "&from=2020-13-01",
+        "&from=2020-11-30&to=2020-11-01",
+        "&group=date",
+    ):
+        response = testclient.get("/search?term=structure_value&value=nike" + query)
+
+        assert response.status_code == 400
+
+    # campaigns totals are searched by structure_value.
+    response = testclient.get("/search?term=alias&value=nike&group=campaign")
+    assert response.status_code == 400
+
+
+@mock.patch.object(SearchTerm, "manager")
+def test_search_snapshot(mock_manager, testclient):
+    testclient.testapp.config["ROAS_SNAPSHOT"] = "roas.snapshot"
+    testclient.testapp.roas_snapshot = mock.Mock()
+    testclient.testapp.roas_snapshot.search.return_value = [
+        SearchTerm(
+            date=date(2020, 11, 9),
+            ad_group_id=61228310066,
+            campaign_id=1578411800,
+            clicks=2,
+            cost="0.28",
+            conversion_value="2",
+            conversions=0,
+            search_term="nike kawa infant slide",
+        )
+    ]
+
+    response = testclient.get("/search?term=alias&value=nike")
+
+    assert response.get_json()["results"][0]["cost"] == "0.28"
+    assert not mock_manager.called
+
+    # keys missing from the snapshot are searched in the database.
+    testclient.testapp.roas_snapshot.search.return_value = None
+    mock_manager.return_value.get_roas_by_adgroup.return_value = []
+    with mock.patch("endpoint.crud.get_adgroups"):
+        response = testclient.get("/search?term=alias&value=nike")
+
+    assert response.status_code == 200
+
+    assert mock_manager.return_value.get_roas_by_adgroup.called
+
+
+def test_stats(testclient):
+    response = testclient.get("/stats")
+    assert response.get_json()["search"] is None
+    assert response.get_json()["admission"] is None
+
+    testclient.testapp.config["SEARCH_COALESCING"] = True
+    testclient.testapp.config["DATABASE_MAX_CONCURRENCY"] = 10
+    init_search_flight(testclient.testapp)
+    init_admission(testclient.testapp)
+
+    response = testclient.get("/stats")
+    assert response.get_json()["search"] == {
+        "requests": 0,
+        "calls": 0,
+        "coalesced": 0,
+        "shared_coalesced": 0,
+    }
+    assert response.get_json()["admission"]["max_concurrency"] == 10
+    assert set(response.get_json()["cache"]) == {"Campaign", "AdGroup"}
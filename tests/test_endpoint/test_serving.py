@@ -0,0 +1,104 @@
+from datetime import date
+
+from unittest import mock
+
+from core.database import Manager
+from core.database import create_table
+
+from shared.models import AdGroup
+from shared.models import Campaign
+from shared.models import SearchTerm
+from shared.models import DataGeneration
+
+from endpoint.serving import RoasIndex
+from endpoint.serving import RoasServer
+
+
+def load(testdatabase, cost):
+    Manager(testdatabase, Campaign).upsert_many(
+        [
+            Campaign(campaign_id=1, structure_value="nike", status="ENABLED"),
+            Campaign(campaign_id=2, structure_value="puma", status="ENABLED"),
+        ]
+    )
+    Manager(testdatabase, AdGroup).upsert_many(
+        [AdGroup(ad_group_id=10, campaign_id=1, alias="shoes", status="ENABLED")]
+    )
+    Manager(testdatabase, SearchTerm).upsert_many(
+        [
+            SearchTerm(
+                date=date(2021, 1, 1),
+                ad_group_id=10,
+                campaign_id=1,
+                clicks=1,
+                cost=cost,
+                conversion_value=3,
+                conversions=1,
+                search_term=search_term,
+            )
+            for search_term, cost in (("nike air", cost), ("nike run", 2))
+        ]
+    )
+    DataGeneration.manager(testdatabase).bump()
+
+
+def test_roas_server(testdatabase, droptable):
+    for table in ("campaign", "adgroup", "searchterm", "datageneration"):
+        droptable(table)
+    for model in (Campaign, AdGroup, SearchTerm, DataGeneration):
+        create_table(testdatabase, model)
+
+    load(testdatabase, cost=1)
+
+    server = RoasServer(testdatabase, limit=2, poll_interval=60)
+
+    assert server.index.generation == 1
+    assert [_.search_term for _ in server.search("structure_value", "nike", 2)] == [
+        "nike air",
+        "nike run",
+    ]
+    assert [_.search_term for _ in server.search("alias", "shoes", 1)] == ["nike air"]
+    assert server.search("structure_value", "puma", 2) == []
+    assert server.search("structure_value", "adidas", 2) is None
+
+    assert server.refresh() is False
+
+    load(testdatabase, cost=6)
+    assert server.refresh() is True
+    assert server.index.generation == 2
+    assert [_.search_term for _ in server.search("alias", "shoes", 2)] == [
+        "nike run",
+        "nike air",
+    ]
+
+    server.stop()
+    for table in ("campaign", "adgroup", "searchterm", "datageneration"):
+        droptable(table)
+
+
+def test_search_serving(testclient):
+    index = RoasIndex(generation=1, limit=10)
+    index.append(
+        {
+            "date": date(2020, 11, 9),
+            "ad_group_id": 61228310066,
+            "campaign_id": 1578411800,
+            "clicks": 2,
+            "cost": 0.28,
+            "conversion_value": 2,
+            "conversions": 0,
+            "search_term": "nike kawa infant slide",
+        }
+    )
+    index.keys["structure_value"]["nike"] = (0, 1)
+
+    testclient.testapp.roas_server = mock.Mock(search=index.search)
+    testclient.testapp.config["ROAS_SERVING"] = True
+
+    response = testclient.get("/search?term=structure_value&value=nike")
+    assert response.get_json()["results"][0]["search_term"] == (
+        "nike kawa infant slide"
+    )
+
+    response = testclient.get("/search?term=structure_value&value=adidas")
+    assert response.status_code == 404
@@ -0,0 +1,86 @@
+import os
+
+from core.database import Manager
+from core.database import create_table
+
+from shared.models import Campaign
+
+from loader.checkpoint import LoadCheckpoint
+from loader.checkpoint import file_checkpoint
+from loader.dataloader import DataLoader
+
+test_campaign_data = (
+    "campaign_id,structure_value,status\n"
+    "1578451881,venum,ENABLED\n"
+    "1578451584,ellesse,ENABLED\n"
+    "1578451386,converse,ENABLED\n"
+)
+
+
+def test_file_checkpoint(tmp_path):
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    checkpoint = file_checkpoint(str(csv_file), "campaign")
+
+    assert checkpoint.source == os.path.abspath(csv_file)
+    assert checkpoint.target == "campaign"
+    assert checkpoint.file_size == len(test_campaign_data)
+    assert checkpoint.byte_offset == 0
+    assert not checkpoint.completed
+    assert checkpoint.same_file(file_checkpoint(str(csv_file), "campaign"))
+
+    csv_file.write_text(test_campaign_data.replace("venum", "VENUM"))
+    assert not checkpoint.same_file(file_checkpoint(str(csv_file), "campaign"))
+
+
+def test_file_checkpoint_missing_file(tmp_path):
+    assert file_checkpoint(str(tmp_path / "missing.csv"), "campaign") is None
+
+
+def test_resume_load(tmp_path, testdatabase, droptable):
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
+
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    class TestCampaign(Campaign):
+        ...
+
+    class TestCampaignLoader(DataLoader):
+        batch_size = 2
+
+        def get_data_manager(self):
+            return Manager(testdatabase, TestCampaign)
+
+    create_table(testdatabase, TestCampaign)
+
+    # simulate a load interrupted after the first batch.
+    checkpoint = file_checkpoint(str(csv_file), "testcampaign")
+    checkpoint.advance(
+        len("campaign_id,structure_value,status\n1578451881,venum,ENABLED\n"),
+        1,
+    )
+    create_table(testdatabase, LoadCheckpoint)
+    LoadCheckpoint.manager(testdatabase).commit(checkpoint)
+
+    loader = TestCampaignLoader(str(csv_file))
+    loader.save_data()
+
+    loaded_data = loader.get_data_manager().find()
+    assert [_.campaign_id for _ in loaded_data] == [1578451584, 1578451386]
+
+    committed = LoadCheckpoint.manager(testdatabase).get_checkpoint(
+        checkpoint.source,
+        "testcampaign",
+    )
+    assert committed.completed
+    assert committed.row_count == 3
+
+    # a completed load is not repeated.
+    loader.save_data()
+    assert len(loader.get_data_manager().find()) == 2
+
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
@@ -1,16 +1,33 @@
 from unittest import mock
+from queue import Queue
+
+import os
+import datetime
+
+import pytest
 
 from psycopg2.errors import OperationalError
+from psycopg2.errors import QueryCanceled
 
 from core.database import Manager
 from core.database import create_table
 
+from shared.models import AdGroup
 from shared.models import Campaign
+from shared.models import SearchTerm
+from shared.models import RoasRanking
+from shared.models import CampaignRollup
 
+from loader.checkpoint import LoadCheckpoint
 from loader.dataloader import DataLoader
+from loader.dataloader import SearchTerm as SearchTermLoader
+from loader.dataloader import init_loader
+from loader.dataloader import init_staging
+from loader.dataloader import refresh_rankings
+from loader.dataloader import refresh_rollup
+from loader.dataloader import swap_staging
 from loader.dataloader import RETRY_QUEUE
 
-
 test_campaign_data = (
     "campaign_id,structure_value,status\n"
     "1578451881,venum,ENABLED\n"
@@ -53,9 +70,19 @@ def test_save_data(mock_open, testdatabase, droptable):
     db_manager = loader.get_data_manager()
     loaded_data = db_manager.find()
 
-    assert loaded_data[0].campaign_id == 1578451881
-    assert loaded_data[1].campaign_id == 1578451584
-    assert loaded_data[-1].campaign_id == 1578451386
+    # duplicated campaigns are upserted on campaign_id.
+    assert sorted(_.campaign_id for _ in loaded_data) == [
+        1578412457,
+        1578451386,
+        1578451584,
+        1578451623,
+        1578451881,
+        9872103720,
+    ]
+
+    # loading again does not duplicate rows.
+    loader.save_data()
+    assert len(db_manager.find()) == len(loaded_data)
 
 
 @mock.patch(
@@ -63,7 +90,7 @@ def test_save_data(mock_open, testdatabase, droptable):
     new_callable=mock.mock_open,
     read_data=test_campaign_data,
 )
-@mock.patch.object(Manager, "save", side_effect=OperationalError(""))
+@mock.patch.object(Manager, "upsert_many", side_effect=OperationalError(""))
 def test_save_data_error(mock_save, mock_open, testdatabase, droptable, testqueue):
     droptable("testcampaign")
 
@@ -100,3 +127,444 @@ def test_save_data_error(mock_save, mock_open, testdatabase, droptable, testqueu
         "status": "ENABLED",
     }
     assert isinstance(first_fail[2], OperationalError)
+
+
+def test_save_data_aborted(tmp_path, testdatabase, droptable, monkeypatch):
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
+
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    retry_queue = Queue()
+    monkeypatch.setattr("loader.dataloader.RETRY_QUEUE", retry_queue)
+
+    class TestCampaign(Campaign):
+        class Meta(Campaign.Meta):
+            cache = None
+
+    class TimeoutManager(Manager):
+        # rows of ellesse time out, aborting the transaction.
+        def time_out(self, models, cursor):
+            if any(_.structure_value == "ellesse" for _ in models):
+                cursor.execute("SET LOCAL statement_timeout = 10")
+                cursor.execute("SELECT pg_sleep(1)")
+
+        def upsert_many(self, models, cursor=None, **kwargs):
+            self.time_out(models, cursor)
+            super().upsert_many(models, cursor=cursor, **kwargs)
+
+        def save(self, model, cursor=None):
+            self.time_out([model], cursor)
+            return super().save(model, cursor=cursor)
+
+    class TestCampaignLoader(DataLoader):
+        batch_size = 2
+
+        def get_data_manager(self):
+            return TimeoutManager(testdatabase, TestCampaign)
+
+    create_table(testdatabase, TestCampaign)
+
+    loader = TestCampaignLoader(str(csv_file))
+    loader.save_data()
+
+    # the failed batch is retried, the others and checkpoints committed.
+    manager = loader.get_data_manager()
+    assert len(manager.find()) == 4
+    assert retry_queue.qsize() == 2
+    assert isinstance(retry_queue.get_nowait()[2], QueryCanceled)
+
+    checkpoint = LoadCheckpoint.manager(testdatabase).get_checkpoint(
+        os.path.abspath(csv_file),
+        "testcampaign",
+    )
+    assert checkpoint.completed
+    assert checkpoint.row_count == 9
+
+    # rows inserted one by one, only the failed row is retried.
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
+    TestCampaign.Meta.natural_key = ()
+    create_table(testdatabase, TestCampaign)
+
+    TestCampaignLoader(str(csv_file)).save_data()
+    assert len(manager.find()) == 8
+    assert retry_queue.qsize() == 2
+
+
+def test_staging_reload(tmp_path, testdatabase, droptable):
+    droptable("testcampaign")
+    droptable("testcampaign_staging")
+
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    class TestCampaign(Campaign):
+        class Meta(Campaign.Meta):
+            cache = None
+
+    class TestCampaignLoader(DataLoader):
+        model = TestCampaign
+
+    create_table(testdatabase, TestCampaign)
+    Manager(testdatabase, TestCampaign).save(
+        TestCampaign(campaign_id=1, structure_value="stale", status="PAUSED")
+    )
+
+    init_loader()
+    init_staging([TestCampaign])
+    TestCampaignLoader(str(csv_file), staging=True).load()
+
+    # live table is untouched until swapped.
+    assert len(Manager(testdatabase, TestCampaign).find()) == 1
+
+    swap_staging([TestCampaign])
+
+    loaded_data = Manager(testdatabase, TestCampaign).find()
+    assert sorted(_.campaign_id for _ in loaded_data) == [
+        1578412457,
+        1578451386,
+        1578451584,
+        1578451623,
+        1578451881,
+        9872103720,
+    ]
+    assert not testdatabase.table_exist("testcampaign_staging")
+
+    droptable("testcampaign")
+
+
+def test_staging_columnar(tmp_path, testdatabase, droptable):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    droptable("testcampaign_staging")
+
+    parquet_file = tmp_path / "campaigns.parquet"
+    pyarrow.parquet.write_table(
+        pyarrow.table(
+            {
+                "status": ["ENABLED", "PAUSED"],
+                "campaign_id": [1578451881, 1578451584],
+                "structure_value": ["venum", "ellesse"],
+                "ignored": [1, 2],
+            }
+        ),
+        parquet_file,
+    )
+
+    class TestCampaign(Campaign):
+        ...
+
+    class TestCampaignLoader(DataLoader):
+        model = TestCampaign
+
+        def get_database(self):
+            return testdatabase
+
+    init_staging([TestCampaign])
+    TestCampaignLoader(str(parquet_file), staging=True).load()
+
+    loaded_data = Manager(
+        testdatabase,
+        TestCampaign,
+        table_name="testcampaign_staging",
+    ).find()
+
+    assert [(_.campaign_id, _.structure_value, _.status) for _ in loaded_data] == [
+        (1578451881, "venum", "ENABLED"),
+        (1578451584, "ellesse", "PAUSED"),
+    ]
+
+    droptable("testcampaign_staging")
+    droptable("loadcheckpoint")
+
+
+def test_denormalize(tmp_path, testdatabase, droptable, monkeypatch):
+    for table in ("campaign", "adgroup", "testsearchterm"):
+        droptable(table)
+
+    monkeypatch.setattr("loader.dataloader.DIMENSION_MAPS", {})
+
+    csv_file = tmp_path / "search_terms.csv"
+    csv_file.write_text(
+        "date,ad_group_id,campaign_id,clicks,cost,conversion_value,"
+        "conversions,search_term\n"
+        "2021-01-01,10,1,2,0.5,3,1,venum gloves\n"
+        "2021-01-01,99,1,2,0.5,3,1,unknown adgroup\n"
+    )
+
+    class TestSearchTerm(SearchTerm):
+        ...
+
+    class TestSearchTermLoader(SearchTermLoader):
+        model = TestSearchTerm
+
+    init_loader()
+    create_table(testdatabase, TestSearchTerm)
+    Manager(testdatabase, Campaign).save(
+        Campaign(campaign_id=1, structure_value="venum", status="ENABLED")
+    )
+    Manager(testdatabase, AdGroup).save(
+        AdGroup(ad_group_id=10, campaign_id=1, alias="venum - gb", status="ENABLED")
+    )
+
+    touched = TestSearchTermLoader(str(csv_file), denormalize=True).load()["touched"]
+    assert touched == {
+        "campaign_id": {1},
+        "ad_group_id": {10, 99},
+        "date": {datetime.date(2021, 1, 1)},
+    }
+
+    search_terms = Manager(testdatabase, TestSearchTerm).find()
+    assert [(_.structure_value, _.alias) for _ in search_terms] == [
+        ("venum", "venum - gb"),
+        ("venum", None),
+    ]
+
+    manager = TestSearchTerm.manager(testdatabase)
+    assert [_.search_term for _ in manager.get_roas_by_alias("venum - gb", 10)] == [
+        "venum gloves"
+    ]
+
+    for table in ("campaign", "adgroup", "testsearchterm", "loadcheckpoint"):
+        droptable(table)
+
+
+def test_denormalize_reload(tmp_path, testdatabase, droptable, monkeypatch):
+    for table in ("campaign", "adgroup", "testsearchterm"):
+        droptable(table)
+
+    monkeypatch.setattr("loader.dataloader.DIMENSION_MAPS", {})
+
+    class TestSearchTerm(SearchTerm):
+        ...
+
+    class TestSearchTermLoader(SearchTermLoader):
+        model = TestSearchTerm
+
+    init_loader()
+    create_table(testdatabase, TestSearchTerm)
+    campaigns = Manager(testdatabase, Campaign)
+    campaign = campaigns.save(
+        Campaign(campaign_id=1, structure_value="venum", status="ENABLED")
+    )
+    Manager(testdatabase, AdGroup).save(
+        AdGroup(ad_group_id=10, campaign_id=1, alias="venum - gb", status="ENABLED")
+    )
+
+    header = (
+        "date,ad_group_id,campaign_id,clicks,cost,conversion_value,"
+        "conversions,search_term\n"
+    )
+    for name, cost, denormalize in (("first.csv", 0.5, True), ("next.csv", 1, False)):
+        csv_file = tmp_path / name
+        csv_file.write_text(header + f"2021-01-01,10,1,2,{cost},3,1,venum gloves\n")
+        TestSearchTermLoader(str(csv_file), denormalize=denormalize).load()
+
+    manager = TestSearchTerm.manager(testdatabase)
+    assert [(_.cost, _.structure_value, _.alias) for _ in manager.find()] == [
+        (1, "venum", "venum - gb")
+    ]
+
+    campaign.structure_value = "venum fight"
+    campaigns.update(campaign)
+    manager.refresh_denormalized()
+
+    assert [
+        _.search_term for _ in manager.get_roas_by_structure_value("venum fight", 10)
+    ] == ["venum gloves"]
+
+    for table in ("campaign", "adgroup", "testsearchterm", "loadcheckpoint"):
+        droptable(table)
+
+
+def test_refresh_rankings(testdatabase, droptable, monkeypatch):
+    droptable("searchterm")
+    droptable("roasranking")
+
+    monkeypatch.setattr("shared.models.ROAS_RANKING_TOP_K", 2)
+
+    init_loader()
+    search_term_manager = Manager(testdatabase, SearchTerm)
+    for campaign_id, ad_group_id, cost, search_term in (
+        (1, 10, 1, "roas 3"),
+        (1, 10, 0.5, "roas 6"),
+        (1, 11, 2, "roas 1.5"),
+        (1, 11, 0, "no cost"),
+        (2, 20, 1, "other campaign"),
+    ):
+        search_term_manager.save(
+            SearchTerm(
+                date="2021-01-01",
+                ad_group_id=ad_group_id,
+                campaign_id=campaign_id,
+                clicks=1,
+                cost=cost,
+                conversion_value=3,
+                conversions=1,
+                search_term=search_term,
+            )
+        )
+
+    refresh_rankings()
+
+    manager = RoasRanking.manager(testdatabase)
+    rankings = manager.get_roas_by_campaign(
+        [Campaign(campaign_id=1, structure_value="nike", status="ENABLED")],
+        limit=10,
+    )
+    assert [(_.search_term, _.rank) for _ in rankings] == [
+        ("roas 6", 1),
+        ("roas 3", 2),
+    ]
+
+    testdatabase.execute(
+        "UPDATE searchterm SET cost = 0.1 WHERE search_term = 'roas 1.5'"
+    )
+    refresh_rankings({"campaign_id": set(), "ad_group_id": {11}})
+
+    rankings = manager.get_roas_by_adgroup(
+        [AdGroup(ad_group_id=11, campaign_id=1, alias="nike", status="ENABLED")],
+        limit=10,
+    )
+    assert [_.search_term for _ in rankings] == ["roas 1.5"]
+    assert rankings[0].roas == 30
+
+    # untouched campaign ranking is unchanged.
+    rankings = manager.get_roas_by_campaign(
+        [Campaign(campaign_id=1, structure_value="nike", status="ENABLED")],
+        limit=10,
+    )
+    assert [_.search_term for _ in rankings] == ["roas 6", "roas 3"]
+
+    droptable("searchterm")
+    droptable("roasranking")
+
+
+def test_dated_roas(testdatabase, droptable):
+    droptable("searchterm")
+
+    init_loader()
+    search_term_manager = Manager(testdatabase, SearchTerm)
+    for date, ad_group_id, cost, conversion_value, search_term in (
+        ("2021-01-01", 10, 4, 1, "best total"),
+        ("2021-01-02", 10, 1, 9, "best total"),
+        ("2021-01-01", 10, 1, 5, "best day"),
+        ("2021-01-02", 11, 1, 1.5, "best total"),
+        ("2021-02-01", 10, 1, 100, "out of range"),
+    ):
+        search_term_manager.save(
+            SearchTerm(
+                date=date,
+                ad_group_id=ad_group_id,
+                campaign_id=1,
+                clicks=1,
+                cost=cost,
+                conversion_value=conversion_value,
+                conversions=1,
+                search_term=search_term,
+            )
+        )
+
+    manager = SearchTerm.manager(testdatabase)
+    campaigns = [Campaign(campaign_id=1, structure_value="nike", status="ENABLED")]
+    dates = {"date_from": "2021-01-01", "date_to": "2021-01-31"}
+
+    rankings = manager.get_roas_by_campaign(campaigns, limit=10, **dates)
+    assert [(_.search_term, _.ad_group_id) for _ in rankings] == [
+        ("best total", 10),
+        ("best day", 10),
+        ("best total", 11),
+        ("best total", 10),
+    ]
+
+    rankings = manager.get_roas_by_campaign(
+        campaigns, limit=10, group="search_term", **dates
+    )
+    assert [(_.search_term, _.ad_group_id, _.cost) for _ in rankings] == [
+        ("best day", 10, 1),
+        ("best total", 10, 5),
+        ("best total", 11, 1),
+    ]
+    assert rankings[1].conversion_value == 10
+    assert rankings[1].date is None
+
+    rankings = manager.get_roas_by_adgroup(
+        [AdGroup(ad_group_id=11, campaign_id=1, alias="nike", status="ENABLED")],
+        limit=10,
+        group="search_term",
+    )
+    assert [_.cost for _ in rankings] == [1]
+
+    droptable("searchterm")
+
+
+def test_refresh_rollup(testdatabase, droptable):
+    droptable("searchterm")
+    droptable("campaignrollup")
+
+    init_loader()
+    search_term_manager = Manager(testdatabase, SearchTerm)
+    for date, campaign_id, ad_group_id, cost, search_term in (
+        ("2021-01-01", 1, 10, 4, "a"),
+        ("2021-01-01", 1, 11, 1, "b"),
+        ("2021-01-02", 1, 10, 2, "a"),
+        ("2021-02-01", 1, 10, 8, "a"),
+        ("2021-01-01", 2, 20, 1, "a"),
+    ):
+        search_term_manager.save(
+            SearchTerm(
+                date=date,
+                ad_group_id=ad_group_id,
+                campaign_id=campaign_id,
+                clicks=1,
+                cost=cost,
+                conversion_value=10,
+                conversions=1,
+                search_term=search_term,
+            )
+        )
+
+    refresh_rollup()
+
+    manager = CampaignRollup.manager(testdatabase)
+    rollup = {(str(_.date), _.campaign_id): _.cost for _ in manager.find()}
+    # search terms of a campaign and day are summed.
+    assert rollup == {
+        ("2021-01-01", 1): 5,
+        ("2021-01-02", 1): 2,
+        ("2021-02-01", 1): 8,
+        ("2021-01-01", 2): 1,
+    }
+
+    campaigns = [
+        Campaign(campaign_id=1, structure_value="nike", status="ENABLED"),
+        Campaign(campaign_id=2, structure_value="nike", status="ENABLED"),
+    ]
+    totals = manager.get_roas_by_campaign(
+        campaigns, 10, date_from="2021-01-01", date_to="2021-01-31"
+    )
+    assert [(_.campaign_id, _.cost, _.date) for _ in totals] == [
+        (2, 1, None),
+        (1, 7, None),
+    ]
+
+    # only touched campaigns and dates are refreshed.
+    testdatabase.execute("UPDATE searchterm SET cost = cost + 1")
+    refresh_rollup({"campaign_id": {1}, "date": {datetime.date(2021, 1, 2)}})
+    rollup = {(str(_.date), _.campaign_id): _.cost for _ in manager.find()}
+    assert rollup == {
+        ("2021-01-01", 1): 5,
+        ("2021-01-02", 1): 3,
+        ("2021-02-01", 1): 8,
+        ("2021-01-01", 2): 1,
+    }
+
+    # nothing touched without search terms loaded.
+    refresh_rollup({"ad_group_id": {20}})
+    assert len(manager.find()) == 4
+
+    droptable("searchterm")
+    droptable("campaignrollup")
@@ -0,0 +1,150 @@
+import gzip
+import queue
+
+from core.database import create_table
+
+from shared.models import Campaign
+
+from loader import progress
+from loader.dataloader import DataLoader
+
+
+test_campaign_data = "campaign_id,structure_value,status\n" + "".join(
+    f"{1578451000 + _},venum,ENABLED\n" for _ in range(50)
+)
+
+
+def test_progress(tmp_path, monkeypatch):
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+    size = len(test_campaign_data)
+
+    reports = []
+    monkeypatch.setattr(progress, "REPORTER", reports.append)
+
+    chunk_progress = progress.Progress(str(csv_file), interval=60)
+    assert chunk_progress.size == size
+
+    chunk_progress.read(20, size // 2)
+    chunk_progress.write(19)
+    chunk_progress.reject()
+
+    # reported every interval.
+    assert chunk_progress.report() is None
+    report = chunk_progress.report(force=True)
+    assert reports == [report]
+
+    assert report["bytes"] == size // 2
+    assert report["rows_read"] == 20
+    assert report["rows_written"] == 19
+    assert report["rows_rejected"] == 1
+    assert report["eta"] is not None
+    assert report["peak_rss"] > 0
+    assert not report["done"]
+
+    report = chunk_progress.finish()
+    assert report["bytes"] == size
+    assert report["done"]
+
+
+def test_progress_compressed(tmp_path):
+    gz_file = tmp_path / "campaigns.csv.gz"
+    gz_file.write_bytes(gzip.compress(test_campaign_data.encode()))
+
+    chunk_progress = progress.Progress(str(gz_file))
+    assert chunk_progress.size == gz_file.stat().st_size
+    assert chunk_progress.estimated_rows == 50
+
+    # decompressed positions are ignored, bytes are prorated by rows.
+    chunk_progress.read(25, 10_000)
+    assert chunk_progress.get_report()["bytes"] == chunk_progress.size // 2
+
+
+def test_tracker(tmp_path):
+    csv_file = tmp_path / "search_terms.csv"
+    csv_file.write_text("x" * 1000)
+
+    def get_report(start, **kwargs):
+        return {
+            "source": str(csv_file),
+            "start": start,
+            "size": 500,
+            "bytes": 250,
+            "rows_read": 10,
+            "rows_written": 10,
+            "rows_rejected": 0,
+            "started": 1000.0,
+            "elapsed": 5.0,
+            "stages": {"read": 1.0, "write": 2.0},
+            "peak_rss": 100,
+            "done": False,
+            **kwargs,
+        }
+
+    tracker = progress.Tracker(interval=60)
+    tracker.update(get_report(0))
+    tracker.update(get_report(0, bytes=500, rows_written=20, done=True))
+    # late report of a done chunk.
+    tracker.update(get_report(0, bytes=400))
+    tracker.update(get_report(500, peak_rss=300, stages={"read": 1.0}))
+
+    result = tracker.get_file(str(csv_file))
+    assert result["chunks"] == 2
+    assert result["size"] == 1000
+    assert result["bytes"] == 750
+    assert result["rows_written"] == 30
+    assert result["stages"] == {"read": 2.0, "write": 2.0}
+    assert result["peak_rss"] == 300
+    assert not result["done"]
+
+    tracker.update(get_report(500, bytes=500, done=True))
+
+    summary = tracker.get_summary()
+    assert len(summary) == 1
+    assert summary[0]["bytes"] == 1000
+    assert summary[0]["elapsed"] == 5.0
+
+
+def test_tracker_reports(tmp_path, monkeypatch):
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    # restored after the test.
+    monkeypatch.setattr(progress, "REPORTER", None)
+    monkeypatch.setattr(progress, "REPORT_INTERVAL", progress.REPORT_INTERVAL)
+
+    tracker = progress.Tracker(interval=0.01)
+    tracker.reports = queue.Queue()
+    progress.init_worker(tracker.reports, 0.01)
+
+    tracker.start()
+    progress.Progress(str(csv_file)).finish()
+    tracker.stop()
+
+    assert tracker.get_summary()[0]["source"] == str(csv_file)
+
+
+def test_load_report(tmp_path, testdatabase, droptable):
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
+
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    class TestCampaign(Campaign):
+        ...
+
+    class TestCampaignLoader(DataLoader):
+        model = TestCampaign
+
+        def get_database(self):
+            return testdatabase
+
+    create_table(testdatabase, TestCampaign)
+
+    report = TestCampaignLoader(str(csv_file)).load()["progress"]
+    assert report["rows_read"] == 50
+    assert report["rows_written"] == 50
+    assert report["bytes"] == len(test_campaign_data)
+    assert report["done"]
+    assert set(report["stages"]) == {"read", "write", "db"}
@@ -0,0 +1,105 @@
+import json
+
+from core.database import Manager
+from core.database import create_table
+
+from shared.models import Campaign
+
+from loader import dataloader
+from loader import scheduler
+
+
+test_campaign_data = "campaign_id,structure_value,status\n" + "".join(
+    f"{1578451000 + _},venum,ENABLED\n" for _ in range(50)
+)
+
+
+def test_get_loader():
+    assert scheduler.get_loader("data/campaigns.csv") == dataloader.CampaignLoader
+    assert scheduler.get_loader("2021-01-01/AdGroups.csv") == (dataloader.AdGroupLoader)
+    assert scheduler.get_loader("search_terms_01.csv") == dataloader.SearchTerm
+    assert scheduler.get_loader("readme.txt") is None
+
+
+def test_find_files(tmp_path):
+    for name in ("campaigns.csv", "adgroups.csv", "search_terms_1.csv", "notes.txt"):
+        (tmp_path / name).write_text("a,b\n")
+
+    (tmp_path / "manifest.json").write_text(
+        json.dumps(
+            [
+                "search_terms_1.csv",
+                {"path": "notes.txt", "loader": "CampaignLoader"},
+            ]
+        )
+    )
+
+    files = scheduler.find_files([str(tmp_path)])
+    assert [(_[0].rsplit("/", 1)[1], _[1]) for _ in files] == [
+        ("adgroups.csv", dataloader.AdGroupLoader),
+        ("campaigns.csv", dataloader.CampaignLoader),
+        ("search_terms_1.csv", dataloader.SearchTerm),
+    ]
+
+    files = scheduler.find_files([str(tmp_path / "search_terms_*.csv")])
+    assert [_[1] for _ in files] == [dataloader.SearchTerm]
+
+    files = scheduler.find_files([], manifest=str(tmp_path / "manifest.json"))
+    assert [_[1] for _ in files] == [
+        dataloader.SearchTerm,
+        dataloader.CampaignLoader,
+    ]
+
+
+def test_plan(tmp_path):
+    small_file = tmp_path / "adgroups.csv"
+    small_file.write_text("a,b\n1,2\n")
+
+    large_file = tmp_path / "campaigns.csv"
+    large_file.write_text(test_campaign_data)
+
+    chunks = scheduler.plan(
+        [
+            (str(small_file), dataloader.AdGroupLoader),
+            (str(large_file), dataloader.CampaignLoader),
+        ],
+        chunk_size=500,
+    )
+
+    assert [_.size for _ in chunks] == sorted(
+        (_.size for _ in chunks),
+        reverse=True,
+    )
+    assert chunks[-1] == scheduler.Chunk(
+        str(small_file),
+        dataloader.AdGroupLoader,
+        size=small_file.stat().st_size,
+    )
+    assert len(chunks) > 2
+
+
+def test_load_chunks(tmp_path, testdatabase, droptable):
+    droptable("testcampaign")
+
+    csv_file = tmp_path / "campaigns.csv"
+    csv_file.write_text(test_campaign_data)
+
+    class TestCampaign(Campaign):
+        ...
+
+    class TestCampaignLoader(dataloader.DataLoader):
+        def get_data_manager(self):
+            return Manager(testdatabase, TestCampaign)
+
+    create_table(testdatabase, TestCampaign)
+
+    for chunk in scheduler.plan([(str(csv_file), TestCampaignLoader)], 500):
+        scheduler.load_chunk(chunk)
+
+    loaded_data = Manager(testdatabase, TestCampaign).find()
+    assert sorted(_.campaign_id for _ in loaded_data) == [
+        1578451000 + _ for _ in range(50)
+    ]
+
+    droptable("testcampaign")
+    droptable("loadcheckpoint")
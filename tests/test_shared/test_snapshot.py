@@ -0,0 +1,74 @@
+import struct
+from datetime import date
+from decimal import Decimal
+
+from shared import snapshot
+
+
+def search_term_row(search_term, cost="0.28"):
+    return {
+        "date": date(2020, 11, 9),
+        "ad_group_id": 61228310066,
+        "campaign_id": 1578411800,
+        "clicks": 2,
+        "cost": Decimal(cost),
+        "conversion_value": Decimal("2"),
+        "conversions": 0,
+        "search_term": search_term,
+    }
+
+
+def test_snapshot(tmp_path):
+    path = str(tmp_path / "roas.snapshot")
+    rankings = {
+        "structure_value": {
+            "nike": [search_term_row("nike air"), search_term_row("nike run")],
+            "puma": [],
+        },
+        "alias": {f"alias {_}": [search_term_row(f"term {_}")] for _ in range(50)},
+    }
+
+    snapshot.write_snapshot(path, rankings, generation=3, limit=2)
+    roas_snapshot = snapshot.Snapshot(path)
+
+    assert roas_snapshot.generation == 3
+
+    search_terms = roas_snapshot.search("structure_value", "nike", 2)
+    assert [_.search_term for _ in search_terms] == ["nike air", "nike run"]
+    assert search_terms[0].cost == "0.28"
+    assert search_terms[0].date == date(2020, 11, 9)
+
+    assert [_.search_term for _ in roas_snapshot.search("alias", "alias 42", 1)] == [
+        "term 42"
+    ]
+    assert roas_snapshot.search("structure_value", "puma", 2) == []
+    assert roas_snapshot.search("alias", "nike", 2) is None
+    assert roas_snapshot.search("structure_value", "nike", 3) is None
+
+
+def test_snapshot_file(tmp_path):
+    path = str(tmp_path / "roas.snapshot")
+    snapshot_file = snapshot.SnapshotFile(path, check_interval=0)
+
+    assert snapshot_file.search("structure_value", "nike", 1) is None
+
+    rankings = {"structure_value": {"nike": [search_term_row("nike air")]}}
+    snapshot.write_snapshot(path, rankings, generation=1, limit=1)
+    assert snapshot_file.search("structure_value", "nike", 1)[0].search_term == (
+        "nike air"
+    )
+
+    rankings = {"structure_value": {"nike": [search_term_row("nike run")]}}
+    snapshot.write_snapshot(path, rankings, generation=2, limit=1)
+    assert snapshot_file.search("structure_value", "nike", 1)[0].search_term == (
+        "nike run"
+    )
+    assert list(tmp_path.iterdir()) == [tmp_path / "roas.snapshot"]
+
+    # other format versions are not read.
+    with open(path, "r+b") as file:
+        file.seek(len(snapshot.MAGIC))
+        file.write(struct.pack("<I", snapshot.FORMAT_VERSION + 1))
+
+    snapshot_file = snapshot.SnapshotFile(path, check_interval=0)
+    assert snapshot_file.search("structure_value", "nike", 1) is None